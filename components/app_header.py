@@ -5,6 +5,7 @@ import threading
 import requests
 import flet as ft
 from theme import INK, BG
+from services import storage_codec
 
 UPLOADER_URL = os.getenv("UPLOADER_URL", "https://mindful-imagenes.onrender.com")
 
@@ -25,8 +26,8 @@ def AppHeader(page: ft.Page, active_route: str, force_mobile: bool = False):
         user = page.session.get("user")
         if user:
             return True
-        stored = page.client_storage.get("user")
-        if stored:
+        stored = storage_codec.decode(page.client_storage.get("user"))
+        if isinstance(stored, dict):
             page.session.set("user", stored)
             return True
         return False
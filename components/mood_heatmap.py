@@ -0,0 +1,113 @@
+# components/mood_heatmap.py
+"""
+Mapa de calor de un año (una celda por día) con rachas de constancia.
+
+Las celdas se crean una vez y `update_heatmap` solo cambia color/borde de las
+que cambiaron, así una entrada nueva manda un diff de una celda.
+"""
+from datetime import date, timedelta
+
+import flet as ft
+
+from theme import INK, MUTED
+
+CELL = 11
+GAP = 2
+EMPTY_COLOR = "#EEEAF6"
+NOTE_BORDER = "#4A148C"
+# ánimo 1..5 → de lavanda claro a morado intenso
+MOOD_COLORS = ["#D1C4E9", "#B39DDB", "#9575CD", "#7E57C2", "#5E35B1"]
+WEEKDAYS = ["L", "", "M", "", "V", "", ""]
+
+
+def _mood_color(mood: float | None) -> str:
+    if mood is None:
+        return "#E7E1F5"  # hubo notas pero no diagnóstico
+    i = int(round(max(1.0, min(5.0, mood)))) - 1
+    return MOOD_COLORS[i]
+
+
+def _legend() -> ft.Row:
+    return ft.Row(
+        [ft.Text("Ánimo bajo", size=10, color=MUTED)]
+        + [ft.Container(width=CELL, height=CELL, border_radius=2, bgcolor=c) for c in MOOD_COLORS]
+        + [ft.Text("alto", size=10, color=MUTED),
+           ft.Container(width=CELL, height=CELL, border_radius=2, bgcolor=EMPTY_COLOR,
+                        border=ft.border.all(1.5, NOTE_BORDER)),
+           ft.Text("con notas", size=10, color=MUTED)],
+        spacing=4,
+        wrap=True,
+    )
+
+
+def mood_heatmap_card(days: int = 365) -> ft.Column:
+    title = ft.Text("🗓️ Tu año de un vistazo", size=13, weight=ft.FontWeight.W_600, color="#4A148C")
+    streak_txt = ft.Text("", size=12, color=INK)
+    grid = ft.Row([], spacing=GAP, vertical_alignment=ft.CrossAxisAlignment.START)
+    col = ft.Column(
+        [
+            title,
+            streak_txt,
+            ft.Row([grid], scroll=ft.ScrollMode.AUTO),
+            _legend(),
+        ],
+        spacing=8,
+    )
+    col.data = {"days": days, "grid": grid, "streak": streak_txt, "cells": {}, "state": {}, "end": None}
+    return col
+
+
+def _build_grid(meta: dict, end: date):
+    start = end - timedelta(days=meta["days"] - 1)
+    start -= timedelta(days=start.weekday())  # columnas de lunes a domingo
+    cells, columns = {}, [
+        ft.Column([ft.Container(ft.Text(w, size=8, color=MUTED), width=CELL, height=CELL) for w in WEEKDAYS],
+                  spacing=GAP)
+    ]
+    cur = start
+    while cur <= end:
+        week = []
+        for _ in range(7):
+            if cur > end:
+                break
+            c = ft.Container(width=CELL, height=CELL, border_radius=2, bgcolor=EMPTY_COLOR,
+                             tooltip=cur.strftime("%d/%m/%Y"))
+            cells[cur] = c
+            week.append(c)
+            cur += timedelta(days=1)
+        columns.append(ft.Column(week, spacing=GAP))
+    meta["grid"].controls = columns
+    meta["cells"] = cells
+    meta["state"] = {}
+    meta["end"] = end
+
+
+def update_heatmap(card: ft.Column, day_cells: dict, today: date, current_streak: int, longest_streak: int) -> int:
+    """
+    Aplica {día: (notas, ánimo)} a las celdas. Devuelve cuántas celdas cambiaron.
+    La cuadrícula solo se reconstruye si cambió el día final (p. ej. pasó la medianoche).
+    """
+    meta = card.data
+    if meta["end"] != today:
+        _build_grid(meta, today)
+
+    changed = 0
+    for d, cell in meta["cells"].items():
+        notes, mood = day_cells.get(d, (0, None))
+        key = (notes, None if mood is None else round(mood, 2))
+        if meta["state"].get(d) == key:
+            continue
+        meta["state"][d] = key
+        active = bool(notes) or mood is not None
+        cell.bgcolor = _mood_color(mood) if active else EMPTY_COLOR
+        cell.border = ft.border.all(1.5, NOTE_BORDER) if notes else None
+        parts = [d.strftime("%d/%m/%Y")]
+        if notes:
+            parts.append(f"{notes} nota{'s' if notes != 1 else ''}")
+        if mood is not None:
+            parts.append(f"ánimo {mood:.1f}")
+        cell.tooltip = " · ".join(parts)
+        changed += 1
+
+    meta["streak"].value = f"🔥 Racha actual: {current_streak} días   ·   🏆 Racha más larga: {longest_streak} días"
+    return changed
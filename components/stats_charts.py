@@ -0,0 +1,186 @@
+# components/stats_charts.py
+"""
+Gráficas nativas de Flet para StatsView.
+
+Cada gráfica se crea una vez con `*_chart_card(...)` y después se actualiza con
+`update_chart(card, data)`: solo cambian los valores (rods, puntos, secciones),
+así el diff que viaja por el websocket es pequeño en lugar de una imagen PNG.
+"""
+import flet as ft
+
+from theme import INK, MUTED
+
+TITLE_COLOR = "#4A148C"
+GRID_COLOR = "#E6E0F5"
+PIE_COLORS = ["#9575CD", "#7E57C2", "#B39DDB", "#5E35B1", "#D1C4E9", "#673AB7", "#EDE7F6"]
+
+
+def _axis_label(i: int, text: str, size: int) -> ft.ChartAxisLabel:
+    return ft.ChartAxisLabel(
+        value=i,
+        label=ft.Container(
+            ft.Text(text, size=size, color=MUTED, no_wrap=True),
+            padding=ft.padding.only(top=6),
+        ),
+    )
+
+
+def _nice_max(values, floor: float = 1) -> float:
+    top = max([v for v in values if v is not None] or [0])
+    return max(floor, top * 1.15)
+
+
+def _empty_text() -> ft.Text:
+    return ft.Text("Sin datos disponibles", size=14, color=MUTED, visible=False)
+
+
+def _card(title: str, emoji: str, chart: ft.Control, kind: str, color: str, ylabel: str, height: int, legend=None):
+    title_txt = ft.Text(f"{emoji} {title}", size=13, weight=ft.FontWeight.W_600, color=TITLE_COLOR)
+    empty = _empty_text()
+    body = [title_txt, ft.Container(chart, height=height), empty]
+    if legend is not None:
+        body.append(legend)
+    col = ft.Column(body, spacing=8, horizontal_alignment=ft.CrossAxisAlignment.STRETCH)
+    # Metadatos para update_chart
+    col.data = {
+        "kind": kind, "chart": chart, "title": title_txt, "title_str": title, "emoji": emoji, "series": {},
+        "empty": empty, "color": color, "ylabel": ylabel, "legend": legend,
+    }
+    return col
+
+
+def bar_chart_card(title: str, color: str, emoji: str, ylabel: str, height: int = 220):
+    chart = ft.BarChart(
+        bar_groups=[],
+        left_axis=ft.ChartAxis(labels_size=36, title=ft.Text(ylabel, size=11, color=MUTED), title_size=18),
+        bottom_axis=ft.ChartAxis(labels=[], labels_size=32),
+        horizontal_grid_lines=ft.ChartGridLines(color=GRID_COLOR, width=1, dash_pattern=[3, 3]),
+        tooltip_bgcolor=ft.Colors.with_opacity(0.9, "#FFFFFF"),
+        interactive=True,
+        expand=True,
+    )
+    return _card(title, emoji, chart, "bar", color, ylabel, height)
+
+
+def line_chart_card(title: str, color: str, emoji: str, ylabel: str, height: int = 220):
+    chart = ft.LineChart(
+        data_series=[],
+        left_axis=ft.ChartAxis(labels_size=36, title=ft.Text(ylabel, size=11, color=MUTED), title_size=18),
+        bottom_axis=ft.ChartAxis(labels=[], labels_size=32),
+        horizontal_grid_lines=ft.ChartGridLines(color=GRID_COLOR, width=1, dash_pattern=[3, 3]),
+        tooltip_bgcolor=ft.Colors.with_opacity(0.9, "#FFFFFF"),
+        min_y=0,
+        interactive=True,
+        expand=True,
+    )
+    return _card(title, emoji, chart, "line", color, ylabel, height)
+
+
+def pie_chart_card(title: str, color: str, emoji: str, ylabel: str, height: int = 220):
+    chart = ft.PieChart(sections=[], sections_space=2, center_space_radius=36, expand=True)
+    legend = ft.Row([], wrap=True, spacing=12, run_spacing=6)
+    return _card(title, emoji, chart, "pie", color, ylabel, height, legend=legend)
+
+
+def _update_bar(chart: ft.BarChart, labels, values, color, label_size):
+    groups = chart.bar_groups
+    # Reutiliza rods existentes: solo cambia to_y/tooltip
+    while len(groups) > len(values):
+        groups.pop()
+    for i, (lbl, v) in enumerate(zip(labels, values)):
+        if i < len(groups):
+            rod = groups[i].bar_rods[0]
+            rod.to_y = v
+            rod.tooltip = f"{lbl}: {v:g}"
+            rod.color = color
+        else:
+            groups.append(ft.BarChartGroup(
+                x=i,
+                bar_rods=[ft.BarChartRod(from_y=0, to_y=v, width=18, color=color,
+                                         tooltip=f"{lbl}: {v:g}", border_radius=4)],
+            ))
+    chart.bottom_axis.labels = [_axis_label(i, lbl, label_size) for i, lbl in enumerate(labels)]
+    chart.max_y = _nice_max(values)
+
+
+def _update_line(chart: ft.LineChart, labels, values, color, label_size):
+    if not chart.data_series:
+        chart.data_series.append(ft.LineChartData(
+            data_points=[],
+            stroke_width=3,
+            color=color,
+            curved=True,
+            below_line_bgcolor=ft.Colors.with_opacity(0.2, color),
+            point=True,
+        ))
+    series = chart.data_series[0]
+    points = series.data_points
+    while len(points) > len(values):
+        points.pop()
+    for i, (lbl, v) in enumerate(zip(labels, values)):
+        if i < len(points):
+            points[i].y = v
+            points[i].tooltip = f"{lbl}: {v:.1f}"
+        else:
+            points.append(ft.LineChartDataPoint(i, v, tooltip=f"{lbl}: {v:.1f}"))
+    chart.bottom_axis.labels = [_axis_label(i, lbl, label_size) for i, lbl in enumerate(labels)]
+    chart.min_x = 0
+    chart.max_x = max(0, len(values) - 1)
+    chart.max_y = _nice_max(values, floor=5)
+
+
+def _update_pie(chart: ft.PieChart, legend: ft.Row, labels, values, label_size):
+    total = sum(values) or 1
+    sections = chart.sections
+    while len(sections) > len(values):
+        sections.pop()
+    for i, (lbl, v) in enumerate(zip(labels, values)):
+        pct = f"{v / total:.0%}"
+        if i < len(sections):
+            sections[i].value = v
+            sections[i].title = pct
+        else:
+            sections.append(ft.PieChartSection(
+                v,
+                title=pct,
+                title_style=ft.TextStyle(size=11, color="#FFFFFF", weight=ft.FontWeight.W_600),
+                color=PIE_COLORS[i % len(PIE_COLORS)],
+                radius=70,
+            ))
+    legend.controls = [
+        ft.Row(
+            [
+                ft.Container(width=10, height=10, border_radius=5, bgcolor=PIE_COLORS[i % len(PIE_COLORS)]),
+                ft.Text(f"{lbl} ({v:g})", size=label_size, color=INK),
+            ],
+            spacing=6,
+            tight=True,
+        )
+        for i, (lbl, v) in enumerate(zip(labels, values))
+    ]
+
+
+def update_chart(card: ft.Column, data: dict, title: str | None = None, compact: bool = False):
+    """Aplica `data` ({etiqueta: valor}) a una tarjeta creada con *_chart_card."""
+    meta = card.data
+    if title is not None:
+        meta["title"].value = f"{meta['emoji']} {title}"
+        meta["title_str"] = title
+    # Últimos datos aplicados (para exportar como imagen)
+    meta["series"] = dict(data)
+
+    labels = [str(k) for k in data.keys()]
+    values = [float(v or 0) for v in data.values()]
+    has_data = bool(data)
+    meta["chart"].visible = has_data
+    meta["empty"].visible = not has_data
+    if meta["legend"] is not None:
+        meta["legend"].visible = has_data
+
+    label_size = 9 if compact else 10
+    if meta["kind"] == "bar":
+        _update_bar(meta["chart"], labels, values, meta["color"], label_size)
+    elif meta["kind"] == "line":
+        _update_line(meta["chart"], labels, values, meta["color"], label_size)
+    elif meta["kind"] == "pie":
+        _update_pie(meta["chart"], meta["legend"], labels, values, label_size + 1)
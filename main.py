@@ -1,8 +1,8 @@
 # main.py
+import os
 import flet as ft
 from services.sync_offline import sync_offline_actions
-from services import offline_queue
-import json
+from services import offline_queue, storage_codec, journal_export
 from dotenv import load_dotenv
 from pages.splash_view import SplashView
 from pages.welcome_page import WelcomeView
@@ -22,6 +22,9 @@ from pages.help_page import HelpView
 
 load_dotenv()
 
+# Flet resuelve assets_dir junto al script; las descargas de exportación usan la misma ruta
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
 def main(page: ft.Page):
     page.title = "Mindful"
     page.theme_mode = ft.ThemeMode.LIGHT
@@ -34,11 +37,12 @@ def main(page: ft.Page):
     raw_user = page.client_storage.get("user")  # o "auth_user", como prefieras
     if raw_user:
         try:
-            # Puede venir ya como dict o como string JSON, soportamos ambos casos
-            if isinstance(raw_user, str):
-                user_dict = json.loads(raw_user)
-            else:
-                user_dict = raw_user
+            # Puede venir como dict, JSON (formato anterior) o codificado compacto
+            user_dict = storage_codec.decode(raw_user)
+            if not isinstance(user_dict, dict):
+                raise ValueError("user inválido en client_storage")
+            if storage_codec.is_legacy(raw_user):
+                page.client_storage.set("user", storage_codec.encode(user_dict))
 
             # IMPORTANTE: usar la API correcta de Flet para la sesión
             page.session.set("user", user_dict)
@@ -100,4 +104,5 @@ def main(page: ft.Page):
 
 
 if __name__ == "__main__":
-    ft.app(target=main, assets_dir="assets")
+    journal_export.set_assets_dir(ASSETS_DIR)
+    ft.app(target=main, assets_dir=ASSETS_DIR)
@@ -1,4 +1,5 @@
 # pages/help_page.py
+import asyncio
 import json
 import os
 import re
@@ -9,6 +10,7 @@ from typing import Dict, List, Optional, Any
 from components.app_header import AppHeader
 from theme import BG, INK, MUTED, rounded_card, primary_button, ghost_button
 from services.firebase_service import FirebaseService
+from services import directory_engine
 
 LEVEL_ABBR = {
     "Licenciatura": "Lic.",
@@ -65,6 +67,7 @@ def _load_estados() -> Dict[str, List[str]]:
 
 def HelpView(page: ft.Page):
     fb = FirebaseService()
+    directory = directory_engine.get_engine(fb)
     estados_map = _load_estados()
 
     # --------- URGENTE (solo llamar) ----------
@@ -155,23 +158,47 @@ def HelpView(page: ft.Page):
         muni_dd.options = []
         _force_rerender(state_dd)
         _force_rerender(muni_dd)
-        _fetch_and_render()
+        page.update()
+        _schedule_fetch()
 
     def _clear_muni(_=None):
         muni_dd.value = None
         _force_rerender(muni_dd)
-        _fetch_and_render()
+        page.update()
+        _schedule_fetch()
 
     def _clear_spec(_=None):
         spec_dd.value = None
         _force_rerender(spec_dd)
-        _fetch_and_render()
+        page.update()
+        _schedule_fetch()
+
+    # búsqueda difusa por nombre / especialidad / propósito (entra al mismo pipeline)
+    SEARCH_LIMIT = 40
+    search_state = {"q": ""}
+
+    def _on_search_change(e):
+        search_state["q"] = (e.control.value or "").strip()
+        _schedule_fetch()
+
+    search_field = ft.TextField(
+        hint_text="Buscar por nombre, especialidad o enfoque…",
+        prefix_icon=ft.Icons.SEARCH,
+        border_radius=12,
+        dense=True,
+        on_change=_on_search_change,
+    )
+    # aviso mientras el directorio en memoria termina su primera carga
+    SEARCH_PENDING = "Preparando la búsqueda… por ahora se muestran los resultados de los filtros."
+    search_hint = ft.Text(SEARCH_PENDING, size=12, color="#7D7AA8", visible=False)
 
     # barra de filtros
     filter_bar = rounded_card(
         ft.Column(
             [
                 ft.Text("Filtrar profesionales", size=16, weight=ft.FontWeight.W_600, color=INK),
+                search_field,
+                search_hint,
                 ft.ResponsiveRow(
                     [
                         ft.Container(
@@ -223,6 +250,8 @@ def HelpView(page: ft.Page):
     )
 
     def _clear_all():
+        search_field.value = ""
+        search_state["q"] = ""
         state_dd.value = None
         muni_dd.value = None
         spec_dd.value = None
@@ -230,7 +259,8 @@ def HelpView(page: ft.Page):
         _force_rerender(state_dd)
         _force_rerender(muni_dd)
         _force_rerender(spec_dd)
-        _fetch_and_render()
+        page.update()
+        _schedule_fetch()
 
     # --------- ACTIONS: abrir detalle, whatsapp, llamada ----------
     def _whatsapp(num10: str):
@@ -243,26 +273,9 @@ def HelpView(page: ft.Page):
             return
         page.launch_url(f"tel:+52{num10}")
 
-    def _to_dict(doc) -> Dict[str, Any]:
-        d = doc.to_dict() or {}
-        pro = d.get("professional") or {}
-        pro["_username"] = d.get("username") or d.get("email")
-        return pro
-
-    def _apply_filters(data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        s = spec_dd.value
-        st = state_dd.value
-        m = muni_dd.value
-        out = []
-        for p in data:
-            if s and (p.get("specialty") != s):
-                continue
-            if st and (p.get("state") != st):
-                continue
-            if m and (p.get("municipality") != m):
-                continue
-            out.append(p)
-        return out
+    def _to_dict(card: Dict[str, Any]) -> Dict[str, Any]:
+        # Tarjeta de `directory` → mismo formato que usan _pro_card/_open_detail
+        return {**card, "_username": card.get("username")}
 
     # --------- DETALLE DE PROFESIONAL (Dialog) ----------
     detail_dlg = ft.AlertDialog(modal=True)
@@ -358,6 +371,8 @@ def HelpView(page: ft.Page):
         state = pro.get("state")
         municipality = pro.get("municipality")
         username = pro.get("_username")
+        distance = pro.get("distanceKm")
+        same_state = pro.get("sameState")
 
         display = _compose_display_name(level, full_name, username)
         phone10 = _mx10(phone or "")
@@ -415,6 +430,21 @@ def HelpView(page: ft.Page):
             spacing=8,
             wrap=True,
         )
+        if distance is not None or same_state:
+            chips.controls.append(
+                ft.Container(
+                    padding=ft.padding.symmetric(horizontal=10, vertical=6),
+                    border_radius=9999,
+                    bgcolor="#EAF7F0",
+                    border=ft.border.all(1, "#CBEBD9"),
+                    content=ft.Row(
+                        [ft.Icon(ft.Icons.NEAR_ME_OUTLINED, size=16, color="#2E8B57"),
+                         ft.Text(f"≈ {distance:g} km" if distance is not None else "Mismo estado",
+                                 size=12, color="#2E6B4A")],
+                        spacing=6,
+                    ),
+                )
+            )
 
         base_card = rounded_card(
             ft.Row(
@@ -445,55 +475,180 @@ def HelpView(page: ft.Page):
         # Click para ver detalle en dialog
         return ft.GestureDetector(content=base_card, on_tap=lambda e, p=pro: _open_detail(p))
 
-    def _fetch_and_render(_=None):
-        list_col.controls.clear()
-        list_col.controls.append(
-            ft.Container(padding=12, content=ft.Row([ft.ProgressRing()], alignment=ft.MainAxisAlignment.CENTER))
-        )
-        page.update()
+    # --------- Carga paginada ----------
+    # Con el directorio en memoria listo se filtra localmente (cursor = offset);
+    # mientras llega la primera carga se consulta Firestore (cursor = snapshot).
+    PAGE_SIZE = 20
+    NEARBY_MIN = 5     # con menos coincidencias exactas en el municipio se sugieren cercanos
+    NEARBY_LIMIT = 10
+    paging = {"cursor": None, "local": False}
+
+    FILTER_DEBOUNCE_S = 0.25
+    READY_POLL_S = 0.25
+    # token de la consulta vigente: un resultado con token viejo se descarta
+    pipe = {"token": 0, "task": None}
+    # controles ya pintados por clave, para reutilizarlos entre resultados
+    card_controls: Dict[Any, ft.Control] = {}
+
+    empty_box = ft.Container(
+        padding=20,
+        border_radius=14,
+        bgcolor="#F8F8FF",
+        border=ft.border.all(1, "#ECEBFF"),
+        content=ft.Row(
+            [
+                ft.Icon(ft.Icons.SEARCH_OFF, color="#7D7AA8"),
+                ft.Text("No encontramos resultados con esos filtros.", color="#7D7AA8"),
+            ],
+            spacing=8,
+        ),
+    )
 
-        try:
-            q = fb.db.collection("users").where("professional.type", "==", "profesional")
-            pros = [_to_dict(doc) for doc in q.stream()]
-        except Exception:
-            pros = []
-            try:
-                for d in fb.db.collection("users").stream():
-                    dd = d.to_dict() or {}
-                    if isinstance(dd.get("professional"), dict) and dd["professional"].get("type") == "profesional":
-                        pros.append(_to_dict(d))
-            except Exception:
-                pros = []
+    nearby_text = ft.Text("", size=14, weight=ft.FontWeight.W_600, color=INK)
+    nearby_header = ft.Row(
+        [ft.Icon(ft.Icons.NEAR_ME_OUTLINED, size=18, color="#2E8B57"), nearby_text],
+        spacing=8,
+    )
 
-        pros = _apply_filters(pros)
+    loading_bar = ft.ProgressBar(visible=False, color="#6C54D8", bgcolor="#ECEBFF")
 
-        list_col.controls.clear()
-        if not pros:
-            list_col.controls.append(
-                ft.Container(
-                    padding=20,
-                    border_radius=14,
-                    bgcolor="#F8F8FF",
-                    border=ft.border.all(1, "#ECEBFF"),
-                    content=ft.Row(
-                        [
-                            ft.Icon(ft.Icons.SEARCH_OFF, color="#7D7AA8"),
-                            ft.Text("No encontramos resultados con esos filtros.", color="#7D7AA8"),
-                        ],
-                        spacing=8,
-                    ),
-                )
-            )
-        else:
-            for p in pros:
-                list_col.controls.append(_pro_card(p))
+    more_btn = ft.Container(
+        alignment=ft.alignment.center,
+        visible=False,
+        content=ghost_button("Ver más profesionales", lambda e: page.run_task(_load_more, pipe["token"])),
+    )
 
+    def _filters() -> Dict[str, Optional[str]]:
+        return dict(specialty=spec_dd.value, state=state_dd.value, municipality=muni_dd.value)
+
+    def _query_page(filters, local: bool, after=None):
+        if local:
+            return directory.query(**filters, offset=after or 0, limit=PAGE_SIZE)
+        return fb.list_directory(**filters, limit=PAGE_SIZE, after=after)
+
+    def _compute(filters, query: str, token: int):
+        """
+        Trabajo de una consulta (fuera del hilo de UI); corta si ya la reemplazó
+        otra. No toca `paging`: el llamador lo actualiza si la consulta sigue vigente.
+        """
+        local = directory.ready.is_set()
+        if query and local:
+            # resultados por relevancia: una sola página, sin cursor
+            cards, cursor = directory.search(query, SEARCH_LIMIT, **filters), None
+        else:
+            cards, cursor = _query_page(filters, local)
+        nearby = []
+        if (filters["municipality"] and cursor is None and len(cards) < NEARBY_MIN
+                and directory.ready.is_set() and token == pipe["token"]):
+            nearby = directory.nearest(
+                filters["state"], filters["municipality"], NEARBY_LIMIT,
+                exclude=directory.mask(state=filters["state"], municipality=filters["municipality"]),
+                specialty=filters["specialty"],
+            )
+        return cards, cursor, nearby, local
+
+    def _card_control(key, card: Dict[str, Any], fresh: Dict[Any, ft.Control]) -> ft.Control:
+        # misma tarjeta con los mismos datos → mismo control (Flet no lo reenvía)
+        data = _to_dict({k: v for k, v in card.items() if k != "score"})
+        ctrl = card_controls.get(key)
+        if ctrl is None or ctrl.data != data:
+            ctrl = _pro_card(data)
+            ctrl.data = data
+        fresh[key] = ctrl
+        return ctrl
+
+    def _apply_results(cards, nearby, municipality):
+        fresh: Dict[Any, ft.Control] = {}
+        controls = [_card_control(c.get("uid"), c, fresh) for c in cards]
+        if nearby:
+            nearby_text.value = (f"También cerca de {municipality}" if cards
+                                 else f"No hay profesionales en {municipality}; estos son los más cercanos")
+            controls.append(nearby_header)
+            controls.extend(_card_control(("near", c.get("uid")), c, fresh) for c in nearby)
+        card_controls.clear()
+        card_controls.update(fresh)
+        list_col.controls = controls or [empty_box]
+
+    async def _wait_ready(token: int, timeout: float) -> bool:
+        """Espera a que cargue el directorio sin ocupar un hilo del pool; False si cambió la consulta."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not directory.ready.is_set() and loop.time() < deadline:
+            await asyncio.sleep(READY_POLL_S)
+            if token != pipe["token"]:
+                return False
+        return token == pipe["token"]
+
+    async def _run_fetch(token: int, delay: float):
+        if delay:
+            await asyncio.sleep(delay)
+        if token != pipe["token"]:
+            return
+        filters, query = _filters(), search_state["q"]
+        loading_bar.visible = True
+        more_btn.visible = False
+        search_hint.visible = False
+        page.update()
+        if query and not await _wait_ready(token, 5):
+            return
+        try:
+            cards, cursor, nearby, local = await asyncio.to_thread(_compute, filters, query, token)
+        except Exception as ex:
+            print("[HELP] Error consultando el directorio:", ex)
+            cards, cursor, nearby, local = [], None, [], False
+        if token != pipe["token"]:
+            return  # llegó otra consulta mientras esta corría
+        paging["cursor"], paging["local"] = cursor, local
+        waiting = bool(query) and not local
+        _apply_results(cards, nearby, filters["municipality"])
+        # la búsqueda aún no está lista: se avisa y se repite en cuanto cargue el directorio
+        search_hint.value, search_hint.visible = SEARCH_PENDING, waiting
+        loading_bar.visible = waiting
+        more_btn.visible = cursor is not None
+        page.update()
+        if waiting:
+            if not await _wait_ready(token, 60):
+                return
+            if directory.ready.is_set():
+                _schedule_fetch(0)
+            else:
+                loading_bar.visible = False
+                search_hint.value = "La búsqueda no está disponible por ahora; usa los filtros."
+                page.update()
+
+    def _schedule_fetch(delay: float = FILTER_DEBOUNCE_S):
+        """Agenda la consulta con los filtros actuales y cancela la que siga pendiente."""
+        pipe["token"] += 1
+        prev = pipe["task"]
+        if prev is not None and not prev.done():
+            prev.cancel()
+        pipe["task"] = page.run_task(_run_fetch, pipe["token"], delay)
+
+    async def _load_more(token: int):
+        if paging["cursor"] is None or token != pipe["token"]:
+            return
+        filters = _filters()
+        more_btn.visible = False
+        loading_bar.visible = True
+        page.update()
+        try:
+            cards, cursor = await asyncio.to_thread(_query_page, filters, paging["local"], paging["cursor"])
+        except Exception as ex:
+            print("[HELP] Error cargando más profesionales:", ex)
+            cards, cursor = [], paging["cursor"]
+        if token != pipe["token"]:
+            return
+        paging["cursor"] = cursor
+        for c in cards:
+            list_col.controls.append(_card_control(c.get("uid"), c, card_controls))
+        loading_bar.visible = False
+        more_btn.visible = cursor is not None
         page.update()
 
-    # filtros reactivos
-    state_dd.on_change = lambda e: (_reload_municipios(), _fetch_and_render())
-    muni_dd.on_change = lambda e: _fetch_and_render()
-    spec_dd.on_change = lambda e: _fetch_and_render()
+    # filtros reactivos (con debounce; solo se pinta el último resultado)
+    state_dd.on_change = lambda e: (_reload_municipios(), _schedule_fetch())
+    muni_dd.on_change = lambda e: _schedule_fetch()
+    spec_dd.on_change = lambda e: _schedule_fetch()
 
     # --------- LAYOUT raíz ----------
     gradient_bg = ft.Container(
@@ -514,7 +669,9 @@ def HelpView(page: ft.Page):
                 ft.Container(height=12),
                 filter_bar,
                 ft.Container(height=8),
+                loading_bar,
                 list_col,
+                more_btn,
                 ft.Container(height=8),
             ],
             scroll=ft.ScrollMode.AUTO,
@@ -534,9 +691,6 @@ def HelpView(page: ft.Page):
         controls=[AppHeader(page, active_route="help"), body],
     )
 
-    try:
-        page.invoke_later(_fetch_and_render)
-    except Exception:
-        _fetch_and_render()
+    _schedule_fetch(0)
 
     return view
@@ -1,11 +1,14 @@
 from components.app_header import AppHeader
 import flet as ft
+import asyncio
 from datetime import datetime, timedelta
 import pytz
 from google.cloud import firestore as gcfirestore
 
 from theme import BG, INK, MUTED, rounded_card
 from services.firebase_service import FirebaseService
+from services import offline_overlay
+from services.local_mirror import get_mirror
 from ui_helpers import scroll_view, shell_header, two_col_grid
 
 
@@ -19,6 +22,7 @@ def HomeView(page: ft.Page):
         uid = None
 
     fb = FirebaseService()
+    mirror = get_mirror(page)
 
     # --- Detectar tamaño de pantalla ---
     def is_mobile():
@@ -66,18 +70,32 @@ def HomeView(page: ft.Page):
             start_utc = start_local.astimezone(pytz.utc)
             end_utc = end_local.astimezone(pytz.utc)
 
-            ref = fb.db.collection("users").document(uid).collection("diagnostics")
-            q = (
-                ref.where("createdAt", ">=", start_utc)
-                .where("createdAt", "<", end_utc)
-                .order_by("createdAt", direction=gcfirestore.Query.DESCENDING)
-                .limit(1)
-            )
-            docs = list(q.stream())
+            if mirror:
+                # Frase inmediata desde el espejo local; luego se trae solo lo nuevo
+                local = mirror.query(uid, "diagnostics", "createdAt", start_utc, end_utc, limit=1)
+                if local and local[0].get("phrase"):
+                    set_phrase(local[0]["phrase"], loading=True)
+                try:
+                    await asyncio.to_thread(mirror.sync, fb, uid, "diagnostics")
+                except Exception as ex:
+                    print("[HOME] Sync del espejo local falló:", ex)
+                docs = mirror.query(uid, "diagnostics", "createdAt", start_utc, end_utc, limit=1)
+            else:
+                ref = fb.db.collection("users").document(uid).collection("diagnostics")
+                q = (
+                    ref.where("createdAt", ">=", start_utc)
+                    .where("createdAt", "<", end_utc)
+                    .order_by("createdAt", direction=gcfirestore.Query.DESCENDING)
+                    .limit(1)
+                )
+                docs = [d.to_dict() or {} for d in q.stream()]
+            if not docs and offline_overlay.pending_docs(page, uid, "diagnostic", "createdAt", start_utc, end_utc):
+                set_phrase("Tu diagnóstico de hoy se guardó offline y está pendiente de sincronizar.", loading=False)
+                return
             if not docs:
                 set_phrase("Aún no haces un diagnóstico hoy. Hazlo para obtener tu frase.", loading=False)
                 return
-            doc = docs[0].to_dict() or {}
+            doc = docs[0]
             phrase = doc.get("phrase")
             if phrase:
                 set_phrase(phrase, loading=False)
@@ -90,7 +108,7 @@ def HomeView(page: ft.Page):
         try:
             page.run_task(load_phrase_for_today)
         except Exception:
-            import asyncio, threading
+            import threading
             threading.Thread(target=lambda: asyncio.run(load_phrase_for_today()), daemon=True).start()
 
     # Construcción responsiva de la tarjeta de frase
@@ -1,11 +1,11 @@
 # pages/login_page.py
 import re
-import json
 import flet as ft
 from dataclasses import asdict
 from urllib.parse import urlparse, parse_qs
 
 from services.firebase_service import FirebaseService
+from services import storage_codec
 from models.user_model import User
 from theme import BG, INK, MUTED, rounded_card, primary_button, ghost_button
 from firebase_admin import auth as admin_auth
@@ -341,7 +341,7 @@ class LoginView(ft.View):
             # Guardar en la sesión actual
             page.session.set("user", user_dict)
             # Guardar también en el storage del cliente (sobrevive recargas / offline)
-            page.client_storage.set("user", json.dumps(user_dict))
+            page.client_storage.set("user", storage_codec.encode(user_dict))
 
             self._toast(page, f"Bienvenid@, {user.username or user.email} 🌿")
             page.go(dest)
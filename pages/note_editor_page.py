@@ -5,6 +5,9 @@ from datetime import datetime
 from firebase_admin import firestore
 from services.firebase_service import FirebaseService
 from services import offline_queue
+from services import note_bodies
+from services.local_mirror import get_mirror
+from services.note_autosave import NoteAutosave, NETWORK_ERRORS
 import requests
 from theme import BG, MUTED, rounded_card, primary_button
 from ui_helpers import shell_header
@@ -41,6 +44,19 @@ def NoteEditorView(page: ft.Page):
     content = ft.TextField(label="Escribe tu nota", multiline=True, min_lines=8, max_lines=20, border_radius=16)
     status = ft.Text("", color=MUTED)
 
+    # Autoguardado: borrador local con debounce + escrituras parciales espaciadas
+    autosave = NoteAutosave(page, fb, uid, note_id)
+
+    def on_text_change(e):
+        autosave.touch({"title": title.value, "content": content.value})
+
+    def on_text_blur(e):
+        page.run_task(autosave.flush)
+
+    for field in (title, content):
+        field.on_change = on_text_change
+        field.on_blur = on_text_blur
+
     def toast(msg: str, error: bool = False):
         page.snack_bar = ft.SnackBar(ft.Text(msg), bgcolor="#E5484D" if error else "#2ECC71")
         page.snack_bar.open = True
@@ -50,11 +66,26 @@ def NoteEditorView(page: ft.Page):
         status.value = s
         page.update()
 
+    autosave.on_status = set_status
+
+    def restore_draft():
+        draft = autosave.load_draft()
+        if not draft:
+            return
+        fields = {"title": draft.get("title") or "", "content": draft.get("content") or ""}
+        if fields == {"title": title.value or "", "content": content.value or ""}:
+            autosave.discard_draft()
+            return
+        title.value, content.value = fields["title"], fields["content"]
+        autosave.current.update(fields)
+        toast("Se restauró un borrador sin guardar 📝")
+
     async def load_existing():
         if not note_id:
+            restore_draft()
             return True  # creando nueva → permitido
         try:
-            d = await asyncio.to_thread(fb.get_note, uid, note_id)
+            d = await asyncio.to_thread(note_bodies.get_note, fb, uid, note_id, get_mirror(page))
             if not d:
                 toast("Nota no encontrada.", error=True)
                 return False
@@ -72,8 +103,12 @@ def NoteEditorView(page: ft.Page):
             content.value = d.get("content") or ""
             title.disabled = not editable
             content.disabled = not editable
+            autosave.set_baseline(d)
+            autosave.enabled = editable
 
-            if not editable:
+            if editable:
+                restore_draft()
+            else:
                 toast("Las notas solo pueden editarse el día en que se crearon (solo lectura).", error=False)
             page.update()
             return editable
@@ -90,16 +125,23 @@ def NoteEditorView(page: ft.Page):
 
         set_status("Guardando…")
         try:
-            # Intento normal: guardar en Firebase (online)
-            if note_id:
-                await asyncio.to_thread(fb.update_note, uid, note_id, ttl, body)
-            else:
-                await asyncio.to_thread(fb.add_note, uid, ttl, body)
-
+            # Intento normal: subir lo que falte (solo campos cambiados)
+            autosave.current.update({"title": ttl, "content": body})
+            if not await autosave.flush():
+                if autosave.offline:
+                    raise requests.exceptions.ConnectionError("sin conexión")
+                raise RuntimeError("no se pudo guardar la nota")
+
+            autosave.discard_draft()
             toast("Nota guardada ✅")
             page.go("/notes")
 
-        except requests.exceptions.RequestException:
+        except NETWORK_ERRORS:
+            if autosave.note_id:
+                # La nota ya existe (autoguardado previo): el borrador local se sube al reabrirla
+                toast("Sin conexión: el borrador quedó en este dispositivo ✅")
+                page.go("/notes")
+                return
             # Error de red → guardamos la nota en cola offline
             offline_queue.queue_action(page, {
                 "type": "note",
@@ -109,6 +151,7 @@ def NoteEditorView(page: ft.Page):
                     "content": body,
                 },
             })
+            autosave.discard_draft()
             toast("Sin conexión: la nota se guardó offline y se subirá más tarde ✅")
             page.go("/notes")
 
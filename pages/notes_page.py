@@ -7,12 +7,20 @@ from google.cloud.firestore_v1 import base_query as bq
 from firebase_admin import firestore
 
 from theme import BG, INK, MUTED, rounded_card, primary_button
-from ui_helpers import shell_header, scroll_view
-from services.firebase_service import FirebaseService
+from ui_helpers import shell_header
+from services.firebase_service import FirebaseService, NOTE_INDEX_FIELDS
+from services import offline_overlay
+from services.local_mirror import get_mirror
+from services import stats_window, stats_index
+from services import journal_export
+from services import note_search
+from services import note_bodies
+from services import notes_cache
 
 
 def NotesView(page: ft.Page):
     fb = FirebaseService()
+    mirror = get_mirror(page)
 
     sess_user = page.session.get("user")
     if not isinstance(sess_user, dict) or not sess_user.get("uid"):
@@ -28,12 +36,16 @@ def NotesView(page: ft.Page):
     tz = pytz.timezone("America/Mexico_City")
 
     status = ft.Text("", color=MUTED)
-    list_col = ft.Column(spacing=10)
+    list_col = ft.ListView(spacing=10, expand=True, on_scroll_interval=100)
 
     # Filtro activo: "all", "today", "week", "month", "custom"
     active_filter = {"type": "all", "start": None, "end": None}
     filter_label = ft.Text("Todas las notas", size=14, weight=ft.FontWeight.W_500, color=INK)
 
+    # Búsqueda de texto completo (índice local por usuario)
+    SEARCH_DEBOUNCE_S = 0.2
+    search_state = {"q": "", "token": 0}
+
     # --- UI helpers ---
     def toast(msg: str, error: bool = False):
         print(f"[TOAST] {msg}")
@@ -243,16 +255,14 @@ def NotesView(page: ft.Page):
         print("[FILTER] Bottom sheet mostrado")
 
     # --- Cargar notas ---
-    async def load_notes():
-        set_status("Cargando notas…")
-        print(f"[LOAD] Cargando con filtro: {active_filter}")
+    def current_range():
+        if active_filter["type"] != "all" and active_filter["start"] and active_filter["end"]:
+            return active_filter["start"].astimezone(pytz.utc), active_filter["end"].astimezone(pytz.utc)
+        return None, None
 
+    def query_remote(start_utc, end_utc):
         notes_ref = fb.db.collection("users").document(uid).collection("notes")
-        
-        # Aplicar filtro de fecha si existe
-        if active_filter["type"] != "all" and active_filter["start"] and active_filter["end"]:
-            start_utc = active_filter["start"].astimezone(pytz.utc)
-            end_utc = active_filter["end"].astimezone(pytz.utc)
+        if start_utc and end_utc:
             q = (
                 notes_ref.where(filter=bq.FieldFilter("updatedAt", ">=", start_utc))
                 .where(filter=bq.FieldFilter("updatedAt", "<=", end_utc))
@@ -262,158 +272,440 @@ def NotesView(page: ft.Page):
         else:
             # Todas las notas
             q = notes_ref.order_by("updatedAt", direction=firestore.Query.DESCENDING).limit(500)
+        # Solo campos de índice: el cuerpo se pide al abrir la nota
+        q = q.select(NOTE_INDEX_FIELDS)
+        return [{**(d.to_dict() or {}), "id": d.id} for d in q.stream()]
+
+    def query_cached(start_utc, end_utc):
+        """Consulta remota con caché de intervalos de la sesión (bloqueante)."""
+        cache = notes_cache.get_cache(page, uid)
+        docs = cache.get(start_utc, end_utc)
+        if docs is not None:
+            print("[LOAD] Rango servido desde caché:", cache.stats())
+            return docs
+        docs = query_remote(start_utc, end_utc)
+        cache.put(docs, start_utc, end_utc, limit=500)
+        return docs
+
+    def query_local(start_utc, end_utc):
+        return mirror.query(uid, "notes", "updatedAt", start_utc, end_utc, limit=500)
+
+    async def migrate_summaries(docs) -> bool:
+        """
+        Notas anteriores a preview/length: se migran una vez por sesión, antes de
+        pintar. Devuelve True si se actualizó alguna.
+        """
+        key = f"notes_summaries_done:{uid}"
+        if page.session.get(key) or all("length" in d for d in docs):
+            return False
+        try:
+            migrated = await asyncio.to_thread(fb.backfill_note_summaries, uid)
+        except Exception as ex:
+            print("[LOAD] Migración a preview/length falló:", ex)
+            return False
+        page.session.set(key, True)
+        print(f"[LOAD] {migrated} notas migradas a preview/length")
+        return bool(migrated)
+
+    async def load_notes():
+        set_status("Cargando notas…")
+        print(f"[LOAD] Cargando con filtro: {active_filter}")
+        start_utc, end_utc = current_range()
+
+        if mirror:
+            # Primero lo local (instantáneo); luego solo los cambios desde la red
+            docs = query_local(start_utc, end_utc)
+            await migrate_summaries(docs)
+            render_notes(offline_overlay.notes_with_pending(page, uid, docs, start_utc, end_utc))
+            try:
+                changed = await asyncio.to_thread(mirror.sync, fb, uid, "notes")
+            except Exception as ex:
+                print("[LOAD] Sync del espejo local falló:", ex)
+                changed = 0
+            if not changed:
+                return
+            docs = query_local(start_utc, end_utc)
+            # Ya hay lista pintada: solo se aplican las diferencias
+            apply_changes(offline_overlay.notes_with_pending(page, uid, docs, start_utc, end_utc))
+        else:
+            docs = await asyncio.to_thread(query_cached, start_utc, end_utc)
+            if await migrate_summaries(docs):
+                # La migración no toca updatedAt: se vuelve a pedir el rango y se pinta completo
+                docs = await asyncio.to_thread(query_remote, start_utc, end_utc)
+                notes_cache.get_cache(page, uid).put(docs, start_utc, end_utc, limit=500)
+            # Notas guardadas offline que aún no se suben
+            render_notes(offline_overlay.notes_with_pending(page, uid, docs, start_utc, end_utc))
+
+        # Lo que llegó del servidor con cuerpo (p. ej. del espejo local) entra al índice de búsqueda
+        note_search.get_search_index(uid).ingest(docs)
+
+    # --- Buscar ---
+    async def run_search(query: str):
+        # se pide en cada búsqueda: el registro puede haber descartado el índice por inactividad
+        search_index = note_search.get_search_index(uid)
+        if not search_index.built:
+            set_status("Preparando búsqueda…")
+            await asyncio.to_thread(search_index.ensure_built, fb, mirror)
+        t0 = datetime.now()
+        hits = search_index.search(query)
+        print(f"[SEARCH] '{query}': {len(hits)} resultados en {(datetime.now() - t0).total_seconds() * 1000:.1f} ms")
+        if query != search_state["q"]:
+            return  # se escribió algo más mientras se construía el índice
+        render_notes(hits, ranked=True)
+
+    async def debounced_search(token: int):
+        await asyncio.sleep(SEARCH_DEBOUNCE_S)
+        if token != search_state["token"]:
+            return
+        if search_state["q"]:
+            await run_search(search_state["q"])
+        else:
+            await load_notes()
+
+    def on_search_change(e):
+        search_state["q"] = (e.control.value or "").strip()
+        search_state["token"] += 1
+        page.run_task(debounced_search, search_state["token"])
+
+    search_field = ft.TextField(
+        hint_text="Buscar en mis notas…",
+        prefix_icon=ft.Icons.SEARCH,
+        border_radius=12,
+        dense=True,
+        on_change=on_search_change,
+    )
+
+    # --- Modal para ver nota ---
+    def show_note_detail(note_title: str, note_id: str, note_content: str | None = None):
+        body_txt = ft.Text(
+            note_content or ("(Sin contenido)" if note_content is not None else "Cargando…"),
+            size=13,
+            color=INK,
+            selectable=True,
+            text_align=ft.TextAlign.JUSTIFY,
+        )
+        overlay = ft.Container(
+            bgcolor=ft.Colors.with_opacity(0.5, ft.Colors.BLACK),
+            alignment=ft.alignment.center,
+            content=ft.Container(
+                width=min(page.width - 40, 400) if page.width else 400,
+                height=min(page.height - 100, 500) if page.height else 500,
+                padding=20,
+                bgcolor=ft.Colors.WHITE,
+                border_radius=16,
+                content=ft.Column(
+                    [
+                        ft.Text(note_title, size=18, weight=ft.FontWeight.W_700, color=INK),
+                        ft.Container(
+                            expand=True,
+                            content=ft.Column(
+                                [body_txt],
+                                scroll=ft.ScrollMode.AUTO,
+                            ),
+                        ),
+                        ft.ElevatedButton(
+                            "Cerrar",
+                            bgcolor="#D9D9D9",
+                            color=INK,
+                            on_click=lambda e: close_overlay(),
+                        ),
+                    ],
+                    spacing=12,
+                    alignment=ft.MainAxisAlignment.START,
+                ),
+            ),
+        )
+
+        def close_overlay():
+            page.overlay.clear()
+            page.update()
+
+        async def load_body():
+            try:
+                doc = await asyncio.to_thread(note_bodies.get_note, fb, uid, note_id, mirror)
+                body_txt.value = ((doc or {}).get("content") or "").strip() or "(Sin contenido)"
+            except Exception as ex:
+                print("[ERROR] Cargando cuerpo de la nota:", ex)
+                body_txt.value = "No se pudo cargar la nota."
+            page.update()
+
+        page.overlay.append(overlay)
+        page.update()
+        if note_content is None:
+            page.run_task(load_body)
+
+    # --- Tarjetas ---
+    def date_header(date_key: str):
+        return ft.Container(
+            content=ft.Text(
+                format_date_header(date_key),
+                size=16,
+                weight=ft.FontWeight.W_700,
+                color=INK,
+            ),
+            padding=ft.padding.only(top=20, bottom=8, left=4),
+        )
+
+    def note_card(note_id: str, data: dict, today_key: str):
+        title = (data.get("title") or "Sin título")[:120]
+        # Las listas traen `preview`/`length`; las notas locales/pendientes, el cuerpo
+        full = data.get("content")
+        # Notas antiguas sin cuerpo ni preview/length (aún no migradas): tarjeta vacía
+        preview = ((data.get("preview") or "") if full is None else full or "").strip()
+        length = (data.get("length") or 0) if full is None else len(full.strip())
+        created_at = data.get("createdAt")
+        created_key = ts_to_key(created_at)
+        is_same_day = (created_key == today_key)
+
+        if offline_overlay.is_pending(data):
+            # ⏳ Guardada offline: aún no existe en Firestore, no se puede editar
+            action_row = ft.Row(
+                [
+                    ft.Icon(ft.Icons.CLOUD_UPLOAD_OUTLINED, color=MUTED, size=18),
+                    ft.Text("Pendiente de sincronizar", size=12, color=MUTED, italic=True),
+                ],
+                alignment=ft.MainAxisAlignment.END,
+                spacing=6,
+            )
+        elif is_same_day:
+            # ✅ Hoy: Editar / Eliminar
+            edit_btn = ft.IconButton(
+                icon=ft.Icons.EDIT,
+                tooltip="Editar",
+                icon_size=20,
+                on_click=lambda e, nid=note_id: page.go(f"/note_editor?id={nid}&date={created_key}"),
+            )
+            del_btn = ft.IconButton(
+                icon=ft.Icons.DELETE_OUTLINE,
+                tooltip="Eliminar",
+                icon_size=20,
+                on_click=lambda e, nid=note_id: on_delete_note(nid, created_key),
+            )
+            action_row = ft.Row([edit_btn, del_btn], alignment=ft.MainAxisAlignment.END, spacing=0)
+        else:
+            # 👁️ Anteriores: solo ver modal
+            view_btn = ft.IconButton(
+                icon=ft.Icons.REMOVE_RED_EYE_OUTLINED,
+                tooltip="Ver nota completa",
+                icon_size=20,
+                on_click=lambda e, t=title, nid=note_id, c=full: show_note_detail(t, nid, c),
+            )
+            action_row = ft.Row([view_btn], alignment=ft.MainAxisAlignment.END)
+
+        return ft.Container(
+            content=ft.Column(
+                [
+                    ft.Text(title, size=16, weight=ft.FontWeight.W_600, color=INK),
+                    ft.Text(
+                        preview[:200] + ("…" if length > min(len(preview), 200) else ""),
+                        size=12,
+                        color=MUTED,
+                        max_lines=3,
+                        overflow=ft.TextOverflow.ELLIPSIS,
+                    ),
+                    action_row,
+                ],
+                spacing=6,
+            ),
+            padding=14,
+            bgcolor="#EDE7FF",
+            border_radius=16,
+        )
+
+    # --- Render por bloques ---
+    # Solo se materializan los primeros grupos de fecha; el resto se agrega al
+    # acercarse al final del scroll, así el primer paint no depende del total.
+    CHUNK_NOTES = 20
+    SCROLL_PRELOAD_PX = 400
+    # Cambios por encima de este número se pintan completos en vez de uno a uno
+    MAX_SURGICAL_CHANGES = 25
+    render_state = {"groups": [], "next": 0, "today": "", "ranked": False}
+    # Controles materializados por llave: id de nota → tarjeta, fecha → encabezado
+    note_controls: dict[str, ft.Control] = {}
+    header_controls: dict[str, ft.Control] = {}
+    # id de nota → (fecha del grupo, doc) para todo lo que está en la lista
+    rendered: dict[str, tuple[str, dict]] = {}
+
+    def materialize(date_key: str, items):
+        header = date_header(date_key)
+        header_controls[date_key] = header
+        list_col.controls.append(header)
+        for note_id, data in items:
+            card = note_card(note_id, data, render_state["today"])
+            note_controls[note_id] = card
+            list_col.controls.append(card)
+
+    def append_chunk() -> bool:
+        """Agrega grupos hasta juntar ~CHUNK_NOTES tarjetas. Devuelve si quedan más."""
+        groups = render_state["groups"]
+        added = 0
+        while render_state["next"] < len(groups) and added < CHUNK_NOTES:
+            date_key, items = groups[render_state["next"]]
+            materialize(date_key, items)
+            added += len(items)
+            render_state["next"] += 1
+        return render_state["next"] < len(groups)
+
+    def on_list_scroll(e: ft.OnScrollEvent):
+        if render_state["next"] >= len(render_state["groups"]):
+            return
+        if e.max_scroll_extent - e.pixels <= SCROLL_PRELOAD_PX:
+            append_chunk()
+            list_col.update()
 
-        docs = list(q.stream())
+    list_col.on_scroll = on_list_scroll
 
+    def empty_placeholder(ranked: bool):
+        return ft.Container(
+            content=ft.Text("Sin resultados" if ranked else "No hay notas para este período", color=MUTED, size=14),
+            alignment=ft.alignment.center,
+            padding=40,
+        )
+
+    def render_notes(docs, ranked: bool = False):
+        """Pintado completo (cambio de filtro o búsqueda)."""
         list_col.controls.clear()
+        note_controls.clear()
+        header_controls.clear()
+        rendered.clear()
+        render_state["ranked"] = ranked
         print(f"[LOAD] {len(docs)} notas encontradas.")
 
         if not docs:
-            list_col.controls.append(
-                ft.Container(
-                    content=ft.Text("No hay notas para este período", color=MUTED, size=14),
-                    alignment=ft.alignment.center,
-                    padding=40,
-                )
-            )
+            render_state["groups"], render_state["next"] = [], 0
+            list_col.controls.append(empty_placeholder(ranked))
             page.update()
             set_status("")
             return
 
-        today_key = datetime.now(tz).strftime("%Y-%m-%d")
-
         # Agrupar notas por fecha
         notes_by_date = {}
-        for d in docs:
-            data = d.to_dict() or {}
+        for data in docs:
             created_at = data.get("createdAt")
             date_key = ts_to_key(created_at)
             
             if date_key not in notes_by_date:
                 notes_by_date[date_key] = []
             
-            notes_by_date[date_key].append((d.id, data))
-
-        # --- Modal para ver nota ---
-        def show_note_detail(note_title: str, note_content: str):
-            overlay = ft.Container(
-                bgcolor=ft.Colors.with_opacity(0.5, ft.Colors.BLACK),
-                alignment=ft.alignment.center,
-                content=ft.Container(
-                    width=min(page.width - 40, 400) if page.width else 400,
-                    height=min(page.height - 100, 500) if page.height else 500,
-                    padding=20,
-                    bgcolor=ft.Colors.WHITE,
-                    border_radius=16,
-                    content=ft.Column(
-                        [
-                            ft.Text(note_title, size=18, weight=ft.FontWeight.W_700, color=INK),
-                            ft.Container(
-                                expand=True,
-                                content=ft.Column(
-                                    [
-                                        ft.Text(
-                                            note_content or "(Sin contenido)",
-                                            size=13,
-                                            color=INK,
-                                            selectable=True,
-                                            text_align=ft.TextAlign.JUSTIFY,
-                                        )
-                                    ],
-                                    scroll=ft.ScrollMode.AUTO,
-                                ),
-                            ),
-                            ft.ElevatedButton(
-                                "Cerrar",
-                                bgcolor="#D9D9D9",
-                                color=INK,
-                                on_click=lambda e: close_overlay(),
-                            ),
-                        ],
-                        spacing=12,
-                        alignment=ft.MainAxisAlignment.START,
-                    ),
-                ),
-            )
+            notes_by_date[date_key].append((data["id"], data))
+            rendered[data["id"]] = (date_key, data)
 
-            def close_overlay():
-                page.overlay.clear()
-                page.update()
-
-            page.overlay.append(overlay)
-            page.update()
+        # Resultados de búsqueda: los grupos siguen el orden de relevancia
+        keys = list(notes_by_date) if ranked else sorted(notes_by_date.keys(), reverse=True)
+        render_state["groups"] = [(k, notes_by_date[k]) for k in keys]
+        render_state["next"] = 0
+        render_state["today"] = datetime.now(tz).strftime("%Y-%m-%d")
+        append_chunk()
 
-        # Renderizar notas agrupadas por fecha
-        for date_key in sorted(notes_by_date.keys(), reverse=True):
-            # Header de fecha
-            list_col.controls.append(
-                ft.Container(
-                    content=ft.Text(
-                        format_date_header(date_key),
-                        size=16,
-                        weight=ft.FontWeight.W_700,
-                        color=INK,
-                    ),
-                    padding=ft.padding.only(top=20, bottom=8, left=4),
-                )
-            )
+        page.update()
+        set_status("")
 
-            # Notas de esa fecha
-            for note_id, data in notes_by_date[date_key]:
-                title = (data.get("title") or "Sin título")[:120]
-                content = (data.get("content") or "").strip()
-                created_at = data.get("createdAt")
-                created_key = ts_to_key(created_at)
-                is_same_day = (created_key == today_key)
-
-                if is_same_day:
-                    # ✅ Hoy: Editar / Eliminar
-                    edit_btn = ft.IconButton(
-                        icon=ft.Icons.EDIT,
-                        tooltip="Editar",
-                        icon_size=20,
-                        on_click=lambda e, nid=note_id: page.go(f"/note_editor?id={nid}&date={date_key}"),
-                    )
-                    del_btn = ft.IconButton(
-                        icon=ft.Icons.DELETE_OUTLINE,
-                        tooltip="Eliminar",
-                        icon_size=20,
-                        on_click=lambda e, nid=note_id: on_delete_note(nid, created_key),
-                    )
-                    action_row = ft.Row([edit_btn, del_btn], alignment=ft.MainAxisAlignment.END, spacing=0)
-                else:
-                    # 👁️ Anteriores: solo ver modal
-                    view_btn = ft.IconButton(
-                        icon=ft.Icons.REMOVE_RED_EYE_OUTLINED,
-                        tooltip="Ver nota completa",
-                        icon_size=20,
-                        on_click=lambda e, t=title, c=content: show_note_detail(t, c),
-                    )
-                    action_row = ft.Row([view_btn], alignment=ft.MainAxisAlignment.END)
-
-                list_col.controls.append(
-                    ft.Container(
-                        content=ft.Column(
-                            [
-                                ft.Text(title, size=16, weight=ft.FontWeight.W_600, color=INK),
-                                ft.Text(
-                                    content[:200] + ("…" if len(content) > 200 else ""),
-                                    size=12,
-                                    color=MUTED,
-                                    max_lines=3,
-                                    overflow=ft.TextOverflow.ELLIPSIS,
-                                ),
-                                action_row,
-                            ],
-                            spacing=6,
-                        ),
-                        padding=14,
-                        bgcolor="#EDE7FF",
-                        border_radius=16,
-                    )
-                )
+    # --- Cambios puntuales (borrar / guardar / sync) ---
+    def _group_index(date_key: str) -> int:
+        for i, (k, _) in enumerate(render_state["groups"]):
+            if k == date_key:
+                return i
+        return -1
+
+    def remove_note(note_id: str):
+        """Quita una nota de la lista sin re-pintar el resto."""
+        entry = rendered.pop(note_id, None)
+        if entry is None:
+            return
+        date_key = entry[0]
+        gi = _group_index(date_key)
+        if gi >= 0:
+            items = render_state["groups"][gi][1]
+            items[:] = [(nid, d) for nid, d in items if nid != note_id]
+            if not items:
+                del render_state["groups"][gi]
+                if gi < render_state["next"]:
+                    render_state["next"] -= 1
+                header = header_controls.pop(date_key, None)
+                if header is not None and header in list_col.controls:
+                    list_col.controls.remove(header)
+        card = note_controls.pop(note_id, None)
+        if card is not None and card in list_col.controls:
+            list_col.controls.remove(card)
+        if not rendered:
+            list_col.controls.clear()
+            list_col.controls.append(empty_placeholder(render_state["ranked"]))
+
+    def upsert_note(data: dict):
+        """Inserta o reemplaza la tarjeta de una nota en su grupo de fecha."""
+        note_id = data["id"]
+        date_key = ts_to_key(data.get("createdAt"))
+        old = rendered.get(note_id)
+        if old is not None and old[0] == date_key:
+            # Misma fecha: se reemplaza la tarjeta en su lugar
+            rendered[note_id] = (date_key, data)
+            items = render_state["groups"][_group_index(date_key)][1]
+            items[:] = [(nid, data if nid == note_id else d) for nid, d in items]
+            card = note_controls.get(note_id)
+            if card is not None:
+                new_card = note_card(note_id, data, render_state["today"])
+                list_col.controls[list_col.controls.index(card)] = new_card
+                note_controls[note_id] = new_card
+            return
+        if old is not None:
+            remove_note(note_id)
+
+        if not rendered:
+            list_col.controls.clear()
+        rendered[note_id] = (date_key, data)
+        gi = _group_index(date_key)
+        if gi >= 0:
+            # Grupo existente: la nota más reciente va primero
+            render_state["groups"][gi][1].insert(0, (note_id, data))
+            header = header_controls.get(date_key)
+            if header is not None:
+                card = note_card(note_id, data, render_state["today"])
+                note_controls[note_id] = card
+                list_col.controls.insert(list_col.controls.index(header) + 1, card)
+            return
 
-        page.update()
+        # Grupo nuevo: se ubica por fecha entre los grupos existentes
+        groups = render_state["groups"]
+        gi = next((i for i, (k, _) in enumerate(groups) if k < date_key), len(groups))
+        groups.insert(gi, (date_key, [(note_id, data)]))
+        if gi < render_state["next"] or (gi == render_state["next"] and gi == 0):
+            # Cae dentro de lo ya materializado: se inserta antes del encabezado siguiente
+            nxt = groups[gi + 1][0] if gi + 1 < len(groups) else None
+            at = list_col.controls.index(header_controls[nxt]) if nxt in header_controls else len(list_col.controls)
+            header = date_header(date_key)
+            card = note_card(note_id, data, render_state["today"])
+            header_controls[date_key] = header
+            note_controls[note_id] = card
+            list_col.controls[at:at] = [header, card]
+            render_state["next"] += 1
+
+    def apply_changes(docs):
+        """
+        Lleva la lista al estado `docs` con inserciones/reemplazos/borrados
+        puntuales; si cambió demasiado, se pinta completa.
+        """
+        incoming = {d["id"]: d for d in docs}
+        removed = [nid for nid in rendered if nid not in incoming]
+        changed = [
+            d for nid, d in incoming.items()
+            if nid not in rendered
+            or rendered[nid][1].get("updatedAt") != d.get("updatedAt")
+            or offline_overlay.is_pending(rendered[nid][1]) != offline_overlay.is_pending(d)
+        ]
+        if render_state["ranked"] or (not removed and not changed):
+            # con una búsqueda activa la lista muestra resultados, no el filtro
+            set_status("")
+            return
+        if len(removed) + len(changed) > MAX_SURGICAL_CHANGES:
+            render_notes(docs)
+            return
+        print(f"[LOAD] Cambios puntuales: {len(changed)} nuevos/editados, {len(removed)} eliminados")
+        for nid in removed:
+            remove_note(nid)
+        # de la más vieja a la más nueva para que la más reciente quede arriba
+        for d in reversed(changed):
+            upsert_note(d)
+        list_col.update()
         set_status("")
 
     # --- Eliminar nota ---
@@ -421,9 +713,18 @@ def NotesView(page: ft.Page):
         print(f"[DELETE] Ejecutando delete_async para {note_id}")
         try:
             await asyncio.to_thread(fb.delete_note, uid, note_id)
+            if mirror:
+                mirror.delete(uid, "notes", note_id)
+            stats_window.forget(uid, "notes", note_id)
+            stats_index.forget(uid, "notes", note_id)
+            note_bodies.invalidate(uid, note_id)
+            notes_cache.note_deleted(page, uid, note_id)
+            await asyncio.to_thread(note_search.on_note_deleted, uid, note_id)
             print("[DELETE] Eliminación completada en Firestore.")
+            # Solo se quita su tarjeta; el resto de la lista no se vuelve a pedir ni pintar
+            remove_note(note_id)
+            list_col.update()
             toast("Nota eliminada ✅")
-            await load_notes()
         except Exception as ex:
             print("[ERROR] Durante delete_async:", ex)
             toast(f"Error al eliminar: {ex}", error=True)
@@ -475,6 +776,96 @@ def NotesView(page: ft.Page):
         page.overlay.append(overlay)
         page.update()
 
+    # --- Exportar diario ---
+    EXPORT_LABELS = {"zip": "ZIP (un CSV por colección)", "csv": "CSV", "ndjson": "NDJSON"}
+    COLLECTION_LABELS = {"notes": "notas", "diagnostics": "diagnósticos", "recommendations": "recomendaciones"}
+
+    def show_export_dialog():
+        fmt_dd = ft.Dropdown(
+            label="Formato",
+            value="zip",
+            options=[ft.dropdown.Option(k, v) for k, v in EXPORT_LABELS.items()],
+            width=260,
+        )
+        progress_bar = ft.ProgressBar(width=260, visible=False, color="#7C3AED")
+        progress_txt = ft.Text("", size=12, color=MUTED)
+        start_btn = ft.ElevatedButton("Exportar", bgcolor="#7C3AED", color="white")
+        close_btn = ft.TextButton("Cerrar", on_click=lambda e: close_dialog())
+        dlg = ft.AlertDialog(
+            modal=True,
+            title=ft.Text("Exportar mi diario", weight=ft.FontWeight.W_700, color=INK, size=16),
+            content=ft.Column([fmt_dd, progress_bar, progress_txt], tight=True, spacing=12),
+            actions=[close_btn, start_btn],
+        )
+
+        def on_progress(col, n):
+            # Se llama desde el hilo de exportación
+            progress_txt.value = f"Exportando {COLLECTION_LABELS.get(col, col)}… {n} documentos"
+            page.update()
+
+        export_state = {"tmp": None, "name": None}
+
+        def on_save_result(e: ft.FilePickerResultEvent):
+            # escritorio/móvil: el usuario eligió dónde guardar (o canceló)
+            tmp, export_state["tmp"] = export_state["tmp"], None
+            if not e.path:
+                journal_export.discard(tmp)
+                progress_txt.value = "Exportación cancelada."
+            else:
+                try:
+                    journal_export.save_to(tmp, e.path)
+                    progress_txt.value = f"✅ Guardado en {e.path}"
+                except OSError as ex:
+                    journal_export.discard(tmp)
+                    progress_txt.value = f"No se pudo guardar: {ex}"
+            page.update()
+
+        save_picker = ft.FilePicker(on_result=on_save_result)
+        page.overlay.append(save_picker)
+
+        async def run_export():
+            start_btn.disabled = close_btn.disabled = fmt_dd.disabled = True
+            progress_bar.visible = True
+            progress_txt.value = "Preparando exportación…"
+            page.update()
+            try:
+                fmt = fmt_dd.value
+                tmp, counts = await asyncio.to_thread(
+                    journal_export.export_to_tempfile, fb, uid, fmt, on_progress
+                )
+                name = journal_export.export_filename(fmt)
+                total = sum(counts.values())
+                print("[EXPORT] Listo:", counts)
+                if page.web:
+                    # URL de un solo uso; el archivo se borra del servidor a los pocos minutos
+                    url = await asyncio.to_thread(journal_export.publish_download, tmp, name)
+                    page.launch_url(url)
+                    progress_txt.value = f"✅ {total} documentos exportados. La descarga comenzó."
+                else:
+                    export_state["tmp"] = tmp
+                    progress_txt.value = f"✅ {total} documentos listos. Elige dónde guardarlos."
+                    save_picker.save_file(dialog_title="Guardar mi diario", file_name=name)
+            except Exception as ex:
+                print("[ERROR] Exportación:", ex)
+                progress_txt.value = f"No se pudo exportar: {ex}"
+            finally:
+                progress_bar.visible = False
+                start_btn.disabled = close_btn.disabled = fmt_dd.disabled = False
+                page.update()
+
+        def close_dialog():
+            dlg.open = False
+            if save_picker in page.overlay:
+                page.overlay.remove(save_picker)
+            journal_export.discard(export_state["tmp"])
+            export_state["tmp"] = None
+            page.update()
+
+        start_btn.on_click = lambda e: page.run_task(run_export)
+        page.dialog = dlg
+        dlg.open = True
+        page.update()
+
     # --- Layout principal ---
     filter_button = ft.Container(
         content=ft.Row(
@@ -495,17 +886,28 @@ def NotesView(page: ft.Page):
     actions = ft.Row(
         [
             primary_button("Nueva nota", lambda _: page.go("/note_editor")),
-            filter_button,
+            ft.Row(
+                [
+                    filter_button,
+                    ft.IconButton(
+                        icon=ft.Icons.DOWNLOAD_OUTLINED,
+                        tooltip="Exportar diario",
+                        icon_color="#7C3AED",
+                        on_click=lambda e: show_export_dialog(),
+                    ),
+                ],
+                spacing=4,
+            ),
         ],
         alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
         wrap=True,
     )
 
-    # Use shared scroll_view wrapper so the content becomes scrollable
-    body = scroll_view(
-        rounded_card(ft.Column([header, actions, list_col, status], spacing=12), 16),
-        page=page,
-    )
+    # La lista hace su propio scroll (ListView) para poder materializarse por bloques
+    card = rounded_card(ft.Column([header, actions, search_field, list_col, status], spacing=12, expand=True), 16)
+    card.expand = True
+    pad = 10 if page.width and page.width < 480 else 14 if page.width and page.width < 860 else 20
+    body = ft.Container(content=card, padding=pad, bgcolor=BG, expand=True)
 
     # --- Boot ---
     async def boot():
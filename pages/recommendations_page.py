@@ -6,15 +6,18 @@ import pytz
 from google.cloud.firestore_v1 import base_query as bq
 from firebase_admin import firestore
 
-from theme import BG, INK, MUTED, rounded_card, primary_button
+from theme import BG, INK, MUTED, rounded_card, primary_button, ghost_button
 from ui_helpers import date_scroller, shell_header
 from services.firebase_service import FirebaseService
 from services.gemini_service import GeminiService
+from services import offline_queue, offline_overlay
+from services.local_mirror import get_mirror
 
 
 def RecommendationsView(page: ft.Page):
     fb = FirebaseService()
     gem = GeminiService()
+    mirror = get_mirror(page)
 
     sess_user = page.session.get("user")
     if not isinstance(sess_user, dict) or not sess_user.get("uid"):
@@ -57,7 +60,14 @@ def RecommendationsView(page: ft.Page):
         return tz, now_local, now_local.strftime("%Y-%m-%d")
 
     # === SHOW DETAIL ===
-    def show_recommendation_detail(date_key: str, text: str):
+    def show_recommendation_detail(date_key: str, text: str | None = None):
+        body_txt = ft.Text(
+            text or ("(Sin contenido)" if text is not None else "Cargando…"),
+            size=13,
+            color=INK,
+            selectable=True,
+            text_align=ft.TextAlign.JUSTIFY,
+        )
         overlay = ft.Container(
             bgcolor=ft.Colors.with_opacity(0.5, ft.Colors.BLACK),
             alignment=ft.alignment.center,
@@ -73,15 +83,7 @@ def RecommendationsView(page: ft.Page):
                         ft.Container(
                             height=380,
                             content=ft.Column(
-                                [
-                                    ft.Text(
-                                        text or "(Sin contenido)",
-                                        size=13,
-                                        color=INK,
-                                        selectable=True,
-                                        text_align=ft.TextAlign.JUSTIFY,
-                                    )
-                                ],
+                                [body_txt],
                                 scroll=ft.ScrollMode.AUTO,
                             ),
                         ),
@@ -102,52 +104,136 @@ def RecommendationsView(page: ft.Page):
             page.overlay.clear()
             page.update()
 
+        async def load_text():
+            # El historial solo trae la vista previa; el texto completo se pide aquí
+            try:
+                doc = mirror.get(uid, "recommendations", date_key) if mirror else None
+                if doc is None:
+                    doc = await asyncio.to_thread(fb.get_recommendation_for_date, uid, date_key)
+                body_txt.value = ((doc or {}).get("text") or "").strip() or "(Sin contenido)"
+            except Exception as ex:
+                print("[Recommendations] Error cargando detalle:", ex)
+                body_txt.value = "No se pudo cargar la recomendación."
+            page.update()
+
         page.overlay.append(overlay)
         page.update()
+        if text is None:
+            page.run_task(load_text)
 
     # === LOAD DATA ===
+    HISTORY_PAGE = 20
+    SCROLL_PRELOAD_PX = 300
+    history = {"cursor": None, "done": False, "loading": False, "shown": set(), "migrated": False}
+
+    def history_item(doc: dict):
+        date_key = doc.get("date") or doc.get("id")
+        full = doc.get("text")
+        if full is not None:
+            # Pendientes offline / espejo local: el texto ya está aquí
+            text = full.strip()
+            preview = text[:120] + ("…" if len(text) > 120 else "")
+        else:
+            text = None
+            p = (doc.get("preview") or "").strip()
+            preview = (p + ("…" if doc.get("length", 0) > len(p) else "")) if p else "Toca para leer"
+        return ft.Container(
+            on_click=lambda e, dk=date_key, t=text: show_recommendation_detail(dk, t),
+            content=ft.Column(
+                [
+                    ft.Text(date_key, size=15, weight=ft.FontWeight.W_600, color=INK),
+                    ft.Text(preview, size=12, color=MUTED),
+                ] + ([ft.Text("Pendiente de sincronizar", size=11, color=MUTED, italic=True)]
+                     if offline_overlay.is_pending(doc) else []),
+                spacing=4,
+            ),
+            padding=14,
+            bgcolor="#EDE7FF",
+            border_radius=16,
+        )
+
+    # Respaldo del scroll infinito: si la primera página no desborda la lista
+    # (pocas tarjetas o ventana alta) nunca llega un on_scroll
+    more_btn = ft.Container(
+        alignment=ft.alignment.center,
+        visible=False,
+        content=ghost_button("Ver más recomendaciones", lambda e: page.run_task(load_history_page)),
+    )
+
+    def fetch_history_page(before):
+        if mirror:
+            docs = mirror.query(uid, "recommendations", "id", end=before, limit=HISTORY_PAGE + 1)
+            return [d for d in docs if d.get("id") != before][:HISTORY_PAGE]
+        return fb.list_recommendations_page(uid, HISTORY_PAGE, before)
+
+    async def load_history_page(reset: bool = False):
+        if history["loading"] or (history["done"] and not reset):
+            return
+        history["loading"] = True
+        try:
+            if reset:
+                history.update(cursor=None, done=False, shown=set())
+            recs = await asyncio.to_thread(fetch_history_page, history["cursor"])
+            history["done"] = len(recs) < HISTORY_PAGE
+            if recs:
+                history["cursor"] = recs[-1].get("date") or recs[-1].get("id")
+            if reset:
+                recs = offline_overlay.recommendations_with_pending(page, uid, recs)
+                list_col.controls.clear()
+
+            for doc in recs:
+                date_key = doc.get("date") or doc.get("id")
+                if not date_key or date_key in history["shown"]:
+                    continue
+                if doc.get("text") is not None and not doc["text"].strip():
+                    continue
+                history["shown"].add(date_key)
+                list_col.controls.append(history_item(doc))
+
+            if not list_col.controls:
+                list_col.controls.append(ft.Text("No hay recomendaciones pasadas aún.", color=MUTED))
+            more_btn.visible = not history["done"]
+            page.update()
+
+            if not mirror and not history["migrated"] and any("length" not in d for d in recs if not offline_overlay.is_pending(d)):
+                # Recomendaciones anteriores a la vista previa guardada: migración única
+                history["migrated"] = True
+                n = await asyncio.to_thread(fb.backfill_recommendation_previews, uid)
+                print(f"[Recommendations] {n} recomendaciones migradas a preview/length")
+        finally:
+            history["loading"] = False
+
+    def on_history_scroll(e: ft.OnScrollEvent):
+        if history["done"] or history["loading"]:
+            return
+        if e.max_scroll_extent - e.pixels <= SCROLL_PRELOAD_PX:
+            page.run_task(load_history_page)
+
     async def load_today_and_history():
         set_status("Cargando recomendaciones…")
         tz, now_local, dkey = today_key()
 
+        if mirror:
+            try:
+                await asyncio.to_thread(mirror.sync, fb, uid, "recommendations")
+            except Exception as ex:
+                print("[Recommendations] Sync del espejo local falló:", ex)
+
         # Recomendación de hoy
-        today = await asyncio.to_thread(fb.get_recommendation_for_date, uid, dkey)
+        if mirror:
+            today = next(iter(mirror.query(uid, "recommendations", "id", dkey, dkey, limit=1)), None)
+        else:
+            today = await asyncio.to_thread(fb.get_recommendation_for_date, uid, dkey)
+        pending_today = [r for r in offline_overlay.pending_docs(page, uid, "recommendation") if r.get("date") == dkey]
+        if pending_today:
+            today = pending_today[-1]
         if today and today.get("text"):
             today_text.value = today["text"]
         else:
             today_text.value = "Aún no hay recomendación de hoy. Presiona “Generar recomendación”."
 
-        # Historial
-        recs = await asyncio.to_thread(fb.list_recommendations, uid, 120)
-        list_col.controls.clear()
-
-        for doc in recs:
-            date_key = doc.get("date")
-            text = (doc.get("text") or "").strip()
-            preview = text[:120] + ("…" if len(text) > 120 else "")
-            if not date_key or not text:
-                continue
-
-            list_col.controls.append(
-                ft.Container(
-                    on_click=lambda e, dk=date_key, t=text: show_recommendation_detail(dk, t),
-                    content=ft.Column(
-                        [
-                            ft.Text(date_key, size=15, weight=ft.FontWeight.W_600, color=INK),
-                            ft.Text(preview, size=12, color=MUTED),
-                        ],
-                        spacing=4,
-                    ),
-                    padding=14,
-                    bgcolor="#EDE7FF",
-                    border_radius=16,
-                )
-            )
-
-        if not list_col.controls:
-            list_col.controls.append(ft.Text("No hay recomendaciones pasadas aún.", color=MUTED))
-
-        page.update()
+        # Historial: primera página; el resto llega con el scroll
+        await load_history_page(reset=True)
         set_status("")
 
     # === GENERAR HOY ===
@@ -177,6 +263,10 @@ def RecommendationsView(page: ft.Page):
               .limit(3))
         diags_today = [{"id": d.id, **(d.to_dict() or {})} for d in qd.stream()]
 
+        # Incluye lo guardado offline hoy (aún sin sincronizar)
+        notes_today = offline_overlay.notes_with_pending(page, uid, notes_today, start_utc, end_utc)
+        diags_today = offline_overlay.diagnostics_with_pending(page, uid, diags_today, start_utc, end_utc)[:3]
+
         if not notes_today and not diags_today:
             toast("Aún no hay datos suficientes (escribe una nota o haz tu diagnóstico).", error=True)
             set_status("")
@@ -191,11 +281,17 @@ def RecommendationsView(page: ft.Page):
             msg = "Hoy te recomiendo tomarte un momento para respirar profundamente y agradecer algo bueno de tu día 💜."
             toast("Error con Gemini, usando respaldo.", error=False)
 
-        await asyncio.to_thread(
-            fb.upsert_recommendation_for_date,
-            uid, dkey, msg,
-            {"source": "gemini-2.0-flash", "notesCount": len(notes_today), "diagsCount": len(diags_today)}
-        )
+        meta = {"source": "gemini-2.0-flash", "notesCount": len(notes_today), "diagsCount": len(diags_today)}
+        try:
+            await asyncio.to_thread(fb.upsert_recommendation_for_date, uid, dkey, msg, meta)
+        except Exception as ex:
+            # Sin conexión: se guarda en la cola y se muestra como pendiente
+            print("[Recommendations] upsert falló, se encola:", ex)
+            offline_queue.queue_action(page, {
+                "type": "recommendation",
+                "uid": uid,
+                "payload": {"date": dkey, "text": msg, "meta": meta},
+            })
 
         today_text.value = msg
         toast("Recomendación del día guardada ✅")
@@ -235,6 +331,7 @@ def RecommendationsView(page: ft.Page):
             [
                 ft.Text("Recomendaciones pasadas", size=15, weight=ft.FontWeight.W_600, color=INK),
                 list_col,
+                more_btn,
             ],
             spacing=8,
         ),
@@ -253,6 +350,8 @@ def RecommendationsView(page: ft.Page):
         spacing=20,
         padding=20,
         auto_scroll=False,
+        on_scroll=on_history_scroll,
+        on_scroll_interval=100,
     )
 
     body = ft.Container(
@@ -1,33 +1,44 @@
 import flet as ft
-import asyncio, io, base64, calendar
-import matplotlib.pyplot as plt
+import asyncio, calendar
 from datetime import datetime, timedelta
 import pytz
-from collections import defaultdict, Counter
 
 from components.app_header import AppHeader
+from components.stats_charts import bar_chart_card, line_chart_card, pie_chart_card, update_chart
+from components.mood_heatmap import mood_heatmap_card, update_heatmap
 from theme import BG, INK, rounded_card, MUTED
 from services.firebase_service import FirebaseService
-from google.cloud.firestore_v1 import base_query as bq
+from services import offline_overlay
+from services.local_mirror import get_mirror
+from services import chart_render
+from services import stats_window, stats_index
+
+DEFAULT_TZ = "America/Mexico_City"
+
+HEATMAP_DAYS = 365
+
+RANGE_OPTIONS = ["Semana actual", "Mes actual", "Últimos 90 días", "Año en curso", "Personalizado"]
 
 
 def StatsView(page: ft.Page):
     fb = FirebaseService()
+    mirror = get_mirror(page)
     sess_user = page.session.get("user")
     if not sess_user or not sess_user.get("uid"):
         return ft.View(route="/stats", controls=[ft.Text("Inicia sesión para continuar")], bgcolor=BG)
 
     uid = sess_user["uid"]
     username = sess_user.get("username") or (sess_user.get("email") or "").split("@")[0]
-    tz = pytz.timezone("America/Mexico_City")
+    tz = pytz.timezone(DEFAULT_TZ)
 
     today = datetime.now(tz)
     monday = today - timedelta(days=today.weekday())
-    week_days = [monday + timedelta(days=i) for i in range(7)]
     first_day_month = today.replace(day=1)
     _, last_day_num = calendar.monthrange(today.year, today.month)
     last_day_month = today.replace(day=last_day_num)
 
+    MONTHS = ["ene", "feb", "mar", "abr", "may", "jun", "jul", "ago", "sep", "oct", "nov", "dic"]
+
     # ---------- Detectar tamaño de pantalla ----------
     def is_mobile():
         return page.width and page.width <= 600
@@ -35,121 +46,85 @@ def StatsView(page: ft.Page):
     def is_tablet():
         return page.width and 600 < page.width <= 1024
 
-    # ---------- Utilidades ----------
-    def plot_to_base64(fig):
-        buf = io.BytesIO()
-        fig.savefig(buf, format="png", bbox_inches="tight", transparent=True)
-        buf.seek(0)
-        img_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
-        buf.close()
-        plt.close(fig)
-        return img_b64
-
-    def create_chart(data, title, color, emoji, ylabel, kind="bar"):
-        if not data:
-            fig, ax = plt.subplots(figsize=(5, 3))
-            ax.text(0.5, 0.5, "Sin datos disponibles", fontsize=14, ha="center", va="center")
-            ax.axis("off")
-            return plot_to_base64(fig)
-
-        labels, values = zip(*data.items())
-        
-        # Tamaño responsivo de gráficas
-        if is_mobile():
-            figsize = (6, 3.5)
-            title_size = 12
-        elif is_tablet():
-            figsize = (5.5, 3.3)
-            title_size = 13
-        else:
-            figsize = (6, 3.5)
-            title_size = 13
-            
-        fig, ax = plt.subplots(figsize=figsize)
-
-        if kind == "bar":
-            ax.bar(labels, values, color=color)
-        elif kind == "line":
-            ax.plot(labels, values, marker="o", color=color, linewidth=2.5)
-            ax.fill_between(range(len(values)), values, alpha=0.2, color=color)
-
-        ax.set_title(f"{emoji} {title}", fontsize=title_size, color="#4A148C")
-        ax.set_ylabel(ylabel)
-        ax.grid(True, linestyle="--", alpha=0.3)
-        plt.xticks(rotation=25, ha="right", fontsize=9 if is_mobile() else 10)
-        plt.yticks(fontsize=9 if is_mobile() else 10)
-        plt.tight_layout()
-        return plot_to_base64(fig)
-
     # ---------- Cargar datos ----------
-    async def load_notes_data():
-        ref = fb.db.collection("users").document(uid).collection("notes")
-        date_limit = (today - timedelta(days=60)).astimezone(pytz.utc)
-        q = ref.where(filter=bq.FieldFilter("createdAt", ">=", date_limit))
-        docs = list(q.stream())
-        daily = defaultdict(int)
-        for d in docs:
-            data = d.to_dict() or {}
-            if data.get("createdAt"):
-                dt = data["createdAt"].astimezone(tz).date()
-                daily[dt] += 1
-        return daily
-
-    async def load_diagnostics_data():
-        ref = fb.db.collection("users").document(uid).collection("diagnostics")
-        date_limit = (today - timedelta(days=60)).astimezone(pytz.utc)
-        q = ref.where(filter=bq.FieldFilter("createdAt", ">=", date_limit))
-        docs = list(q.stream())
-        daily = defaultdict(list)
-        emotions = []
-        for d in docs:
-            data = d.to_dict() or {}
-            if not data.get("createdAt"):
-                continue
-            dt = data["createdAt"].astimezone(tz).date()
-            mood = str(data.get("mood", "")).capitalize()
-            if mood:
-                emotions.append((dt, mood))
-            score = 3
-            lm = mood.lower()
-            if "feliz" in lm:
-                score = 5
-            elif "bien" in lm:
-                score = 4
-            elif "neutral" in lm:
-                score = 3
-            elif "triste" in lm:
-                score = 2
-            elif "mal" in lm:
-                score = 1
-            elif lm.isdigit():
-                score = int(lm)
-            daily[dt].append(score)
-        return {k: sum(v) / len(v) for k, v in daily.items()}, emotions
+    window = stats_window.get_window(uid)
+    index = stats_index.get_index(uid, tz)
+
+    def utc_start(d):
+        return tz.localize(datetime(d.year, d.month, d.day)).astimezone(pytz.utc)
+
+    def ensure_data(start, sync: bool = True):
+        """Deja en el índice todo lo necesario para un rango que empieza en `start` (bloqueante)."""
+        if mirror:
+            # Solo viajan los cambios; el resto sale del espejo local
+            for col in ("notes", "diagnostics") if sync else ():
+                try:
+                    mirror.sync(fb, uid, col)
+                except Exception as ex:
+                    print("[STATS] Sync del espejo local falló:", ex)
+            since = utc_start(start)
+            notes = mirror.query(uid, "notes", "createdAt", since)
+            diags = mirror.query(uid, "diagnostics", "createdAt", since)
+            index.ingest(notes, diags)
+            # el espejo ya refleja borrados hechos en otro dispositivo
+            t = datetime.now(tz).date()
+            index.reconcile("notes", (d["id"] for d in notes), start, t)
+            index.reconcile("diagnostics", (d["id"] for d in diags), start, t)
+            index.mark_covered(start)
+            return
+
+        # Ventana en memoria: solo se piden los documentos nuevos desde la última visita
+        try:
+            fetched = window.refresh(fb, datetime.now(tz))
+            print("[STATS] docs nuevos:", fetched)
+        except Exception as ex:
+            print("[STATS] No se pudo actualizar la ventana:", ex)
+            return
+        notes, diags = window.items("notes"), window.items("diagnostics")
+        index.ingest(notes, diags)
+        # días completos dentro de la ventana: lo que no esté en ella se borró
+        now = datetime.now(tz)
+        window_start = (now - timedelta(days=window.days)).date() + timedelta(days=1)
+        index.reconcile("notes", (d["id"] for d in notes), window_start, now.date())
+        index.reconcile("diagnostics", (d["id"] for d in diags), window_start, now.date())
+        index.mark_covered((now - timedelta(days=window.days)).date())
+
+        # Rango más largo que la ventana: se rellena una vez hacia atrás y queda agregado
+        if index.covered_from and start < index.covered_from:
+            lo, hi = utc_start(start), utc_start(index.covered_from)
+            # solo createdAt/mood: basta con agregados
+            notes = fb.list_created_between(uid, "notes", lo, hi, stats_index.INDEX_FIELDS["notes"])
+            diags = fb.list_created_between(uid, "diagnostics", lo, hi, stats_index.INDEX_FIELDS["diagnostics"])
+            index.ingest(notes, diags)
+            last = index.covered_from - timedelta(days=1)
+            index.reconcile("notes", (d["id"] for d in notes), start, last)
+            index.reconcile("diagnostics", (d["id"] for d in diags), start, last)
+            index.mark_covered(start)
+
+    def pending_index():
+        """Lo guardado offline va en un índice aparte para no duplicarlo tras sincronizar."""
+        notes = offline_overlay.pending_docs(page, uid, "note")
+        diags = offline_overlay.pending_docs(page, uid, "diagnostic")
+        if not notes and not diags:
+            return None
+        idx = stats_index.StatsIndex(tz)
+        idx.ingest(notes, diags)
+        return idx
 
     # ---------- UI ----------
-    transparent_pixel = (
-        "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mP8"
-        "/w8AAgMBAp9x0W8AAAAASUVORK5CYII="
+    # Gráficas nativas: se crean una vez y se actualizan por datos
+    chart_notes = bar_chart_card("Notas por día", "#9575CD", "📝", "Notas")
+    chart_mood = line_chart_card("Estado emocional diario", "#7E57C2", "💜", "Promedio")
+    chart_emotions = pie_chart_card("Emociones más frecuentes (semana)", "#B39DDB", "💬", "Veces")
+    heatmap = mood_heatmap_card(HEATMAP_DAYS)
+    year_start = today.date() - timedelta(days=HEATMAP_DAYS - 1)
+    # Sin espejo el año completo cuesta un año de lecturas: solo se pide si el usuario lo quiere
+    year_btn = ft.TextButton(
+        "Cargar el año completo", icon=ft.Icons.CALENDAR_MONTH_OUTLINED, visible=False,
+        on_click=lambda e: page.run_task(fill_year),
     )
+    heatmap.controls.append(year_btn)
 
-    # Imágenes responsivas
-    chart_notes = ft.Image(
-        src_base64=transparent_pixel,
-        width=None,  # Auto width
-        fit=ft.ImageFit.CONTAIN,
-    )
-    chart_mood = ft.Image(
-        src_base64=transparent_pixel,
-        width=None,
-        fit=ft.ImageFit.CONTAIN,
-    )
-    chart_emotions = ft.Image(
-        src_base64=transparent_pixel,
-        width=None,
-        fit=ft.ImageFit.CONTAIN,
-    )
-    
     insights_txt = ft.Text(
         "Cargando estadísticas…",
         color=MUTED,
@@ -158,7 +133,7 @@ def StatsView(page: ft.Page):
     )
 
     mode_dropdown = ft.Dropdown(
-        options=[ft.dropdown.Option("Semana actual"), ft.dropdown.Option("Mes actual")],
+        options=[ft.dropdown.Option(o) for o in RANGE_OPTIONS],
         value="Semana actual",
         label="Ver por",
         border_color="#B39DDB",
@@ -167,89 +142,122 @@ def StatsView(page: ft.Page):
         width=160 if is_mobile() else 220,
     )
 
+    # Rango personalizado
+    start_field = ft.TextField(label="Desde", hint_text="YYYY-MM-DD", width=140, height=50)
+    end_field = ft.TextField(label="Hasta", hint_text="YYYY-MM-DD", width=140, height=50)
+    custom_row = ft.Row(
+        [start_field, end_field, ft.ElevatedButton("Aplicar", on_click=lambda e: on_range_change(applied=True), bgcolor="#7E57C2", color="white")],
+        spacing=10,
+        wrap=True,
+        visible=False,
+    )
+
+    state = {"ready": False, "pending": None}
+
+    def selected_range():
+        """(inicio, fin, etiqueta corta) del rango elegido."""
+        t = today.date()
+        mode = mode_dropdown.value
+        if mode == "Mes actual":
+            return first_day_month.date(), last_day_month.date(), "mes"
+        if mode == "Últimos 90 días":
+            return t - timedelta(days=89), t, "90 días"
+        if mode == "Año en curso":
+            return t.replace(month=1, day=1), t, "año"
+        if mode == "Personalizado":
+            try:
+                s_ = datetime.strptime((start_field.value or "").strip(), "%Y-%m-%d").date()
+                e_ = datetime.strptime((end_field.value or "").strip(), "%Y-%m-%d").date()
+                if s_ <= e_:
+                    return s_, e_, "rango"
+            except ValueError:
+                pass
+            return None
+        start = monday.date()
+        return start, start + timedelta(days=6), "semana"
+
+    def range_series(start, end, granularity):
+        series = index.series(start, end, granularity)
+        if state["pending"]:
+            for (_, _, b), (_, _, pb) in zip(series, state["pending"].series(start, end, granularity)):
+                b.add(pb)
+        return series
+
+    def range_totals(start, end):
+        total = index.totals(start, end)
+        if state["pending"]:
+            total.add(state["pending"].totals(start, end))
+        return total
+
+    def bucket_label(i, s_, e_, granularity, same_month):
+        if granularity == "day":
+            return s_.strftime("%a %d")
+        if granularity == "week":
+            return f"Semana {i} ({s_.day}-{e_.day})" if same_month else f"{s_.day} {MONTHS[s_.month - 1]}"
+        return f"{MONTHS[s_.month - 1]} {s_.strftime('%y')}"
+
     # ---------- Lógica de carga ----------
     async def load_and_update():
+        rng = selected_range()
+        if rng is None:
+            return
         insights_txt.value = "Analizando tus datos 🌿"
         page.update()
 
-        notes_data, (mood_data, emotions_data) = await asyncio.gather(
-            load_notes_data(), load_diagnostics_data()
-        )
+        try:
+            # Solo el rango elegido; el mapa de calor pinta lo que ya esté cubierto
+            await asyncio.to_thread(ensure_data, rng[0])
+        except Exception as ex:
+            print("[STATS] Error cargando datos:", ex)
+        state["pending"] = pending_index()
+        state["ready"] = True
+        render_charts()
+        if not year_loaded():
+            if mirror:
+                # con espejo el año sale de SQLite (ya sincronizado): se completa en segundo plano
+                page.run_task(fill_year)
+            else:
+                year_btn.visible = True
+                page.update()
+
+    def year_loaded() -> bool:
+        return index.covered_from is not None and index.covered_from <= year_start
+
+    async def fill_year():
+        """Completa el mapa de calor hacia atrás hasta un año; queda agregado en el índice."""
+        year_btn.disabled = True
+        page.update()
+        try:
+            await asyncio.to_thread(ensure_data, year_start, False)
+        except Exception as ex:
+            print("[STATS] Error cargando el año:", ex)
+        year_btn.disabled = False
+        year_btn.visible = not year_loaded()
+        render_heatmap()
+        page.update()
 
-        # mapa de emojis amigable
-        emoji_map = {
-            "feliz": "😊 Feliz",
-            "bien": "🙂 Bien",
-            "neutral": "😐 Neutral",
-            "triste": "😢 Triste",
-            "mal": "😞 Mal",
-            "ansioso": "😰 Ansioso",
-            "estresado": "😫 Estresado",
-            "enojado": "😡 Enojado",
-            "motivado": "💪 Motivado",
-            "calmado": "🕊️ Calmado",
-            "1": "😞 Muy mal",
-            "2": "😢 Triste",
-            "3": "😐 Neutral",
-            "4": "🙂 Bien",
-            "5": "😊 Feliz",
-        }
-
-        # --- SEMANA ---
-        if mode_dropdown.value == "Semana actual":
-            labels = [d.strftime("%a %d") for d in week_days]
-            notes_week = {d.strftime("%a %d"): notes_data.get(d.date(), 0) for d in week_days}
-            mood_week = {d.strftime("%a %d"): mood_data.get(d.date(), 0) for d in week_days}
-
-            # emociones de la semana
-            emotion_week = [m for (dt, m) in emotions_data if monday.date() <= dt <= (monday + timedelta(days=6)).date()]
-            normalized = []
-            for emo in emotion_week:
-                key = str(emo).lower().strip()
-                found = next((v for k, v in emoji_map.items() if k in key), str(emo))
-                normalized.append(found)
-            counter = Counter(normalized)
-            top_emotions = dict(counter.most_common(7))
-
-            chart_notes.src_base64 = create_chart(notes_week, "Notas por día", "#9575CD", "📝", "Notas", "bar")
-            chart_mood.src_base64 = create_chart(mood_week, "Estado emocional diario", "#7E57C2", "💜", "Promedio", "line")
-            chart_emotions.src_base64 = create_chart(top_emotions, "Emociones más frecuentes (semana)", "#B39DDB", "💬", "Veces", "bar")
-
-            total_notes = sum(notes_week.values())
-            avg_mood = sum(v for v in mood_week.values() if v) / (len([v for v in mood_week.values() if v]) or 1)
-
-        # --- MES ---
-        else:
-            start = first_day_month.date()
-            week_ranges = []
-            while start <= last_day_month.date():
-                end = min(start + timedelta(days=6), last_day_month.date())
-                week_ranges.append((start, end))
-                start = end + timedelta(days=1)
-
-            notes_weeks, mood_weeks = {}, {}
-            emotion_month = [m for (_, m) in emotions_data if first_day_month.date() <= _ <= last_day_month.date()]
-            normalized_month = []
-            for emo in emotion_month:
-                key = str(emo).lower().strip()
-                found = next((v for k, v in emoji_map.items() if k in key), str(emo))
-                normalized_month.append(found)
-            counter_month = Counter(normalized_month)
-            top_month = dict(counter_month.most_common(7))
-
-            for i, (start, end) in enumerate(week_ranges, 1):
-                label = f"Semana {i} ({start.day}-{end.day})"
-                ndays = [d for d in notes_data if start <= d <= end]
-                mdays = [d for d in mood_data if start <= d <= end]
-                notes_weeks[label] = sum(notes_data[d] for d in ndays)
-                mood_weeks[label] = sum(mood_data[d] for d in mdays) / len(mdays) if mdays else 0
-
-            chart_notes.src_base64 = create_chart(notes_weeks, "Notas por semana", "#9575CD", "📝", "Notas", "bar")
-            chart_mood.src_base64 = create_chart(mood_weeks, "Promedio emocional semanal", "#7E57C2", "💜", "Promedio", "line")
-            chart_emotions.src_base64 = create_chart(top_month, "Emociones más comunes del mes", "#B39DDB", "💬", "Veces", "bar")
-
-            total_notes = sum(notes_weeks.values())
-            avg_mood = sum(mood_weeks.values()) / (len(mood_weeks) or 1)
+    def render_charts():
+        rng = selected_range()
+        if not state["ready"] or rng is None:
+            return
+        start, end, short = rng
+        granularity = stats_index.auto_granularity(start, end)
+        same_month = (start.year, start.month) == (end.year, end.month)
+
+        series = range_series(start, end, granularity)
+        labels = [bucket_label(i, s_, e_, granularity, same_month) for i, (s_, e_, _) in enumerate(series, 1)]
+        notes_series = {lbl: b.notes for lbl, (_, _, b) in zip(labels, series)}
+        mood_series = {lbl: (b.mood or 0) for lbl, (_, _, b) in zip(labels, series)}
+        total = range_totals(start, end)
+        top = dict(total.emotions.most_common(7))
+
+        per = {"day": "día", "week": "semana", "month": "mes"}[granularity]
+        update_chart(chart_notes, notes_series, f"Notas por {per}", compact=is_mobile())
+        update_chart(chart_mood, mood_series, "Estado emocional diario" if granularity == "day" else f"Promedio emocional por {per}", compact=is_mobile())
+        update_chart(chart_emotions, top, f"Emociones más frecuentes ({short})", compact=is_mobile())
+
+        total_notes = total.notes
+        avg_mood = total.mood or 0
 
         # --- RESUMEN ---
         if avg_mood >= 4:
@@ -263,9 +271,47 @@ def StatsView(page: ft.Page):
             f"📝 Notas totales: {total_notes}\n"
             f"{mood_txt}"
         )
+        render_heatmap()
         page.update()
 
-    mode_dropdown.on_change = lambda e: page.run_task(load_and_update)
+    def render_heatmap():
+        """Año de un vistazo desde los buckets diarios; solo cambian las celdas nuevas."""
+        t = today.date()
+        cells = index.day_cells(year_start, t)
+        if state["pending"]:
+            for d, (n, mood) in state["pending"].day_cells(year_start, t).items():
+                b = index.days.get(d)
+                total_n = (b.notes if b else 0) + n
+                # promedio combinado con lo pendiente
+                pb = state["pending"].days[d]
+                mood_sum = (b.mood_sum if b else 0) + pb.mood_sum
+                mood_n = (b.mood_n if b else 0) + pb.mood_n
+                cells[d] = (total_n, mood_sum / mood_n if mood_n else None)
+        current, longest = stats_index.streaks(cells.keys(), t)
+        changed = update_heatmap(heatmap, cells, t, current, longest)
+        print("[STATS] celdas del mapa de calor actualizadas:", changed)
+
+    def toast(msg: str, error: bool = False):
+        page.snack_bar = ft.SnackBar(ft.Text(msg), bgcolor="#E5484D" if error else "#2ECC71")
+        page.snack_bar.open = True
+        page.update()
+
+    def on_range_change(applied: bool = False):
+        custom_row.visible = mode_dropdown.value == "Personalizado"
+        rng = selected_range()
+        if rng is None:
+            if applied:
+                toast("Rango inválido: usa fechas YYYY-MM-DD y que «Desde» no sea posterior a «Hasta».", error=True)
+            else:
+                page.update()
+            return
+        # Si el índice ya cubre el rango, se pinta sin tocar la red
+        if state["ready"] and index.covered_from and rng[0] >= index.covered_from:
+            render_charts()
+        else:
+            page.run_task(load_and_update)
+
+    mode_dropdown.on_change = lambda e: on_range_change()
 
     try:
         page.run_task(load_and_update)
@@ -273,6 +319,49 @@ def StatsView(page: ft.Page):
         import threading
         threading.Thread(target=lambda: asyncio.run(load_and_update()), daemon=True).start()
 
+    # ---------- Exportar como imagen ----------
+    export_dlg = ft.AlertDialog(modal=True)
+
+    async def export_charts():
+        specs = []
+        for card in (chart_notes, chart_mood, chart_emotions):
+            meta = card.data
+            specs.append({
+                "data": meta["series"], "title": meta["title_str"], "color": meta["color"],
+                "emoji": meta["emoji"], "ylabel": meta["ylabel"],
+                # la gráfica de emociones se exporta como barras
+                "kind": "line" if meta["kind"] == "line" else "bar",
+                "size_class": size_class(),
+            })
+        # Las tres se rasterizan en paralelo fuera del loop de la UI
+        images = await chart_render.create_charts_async(specs)
+        print("[STATS] chart cache:", chart_render.cache_stats())
+        export_dlg.title = ft.Text("Exportar gráficas", weight=ft.FontWeight.W_700, color=INK, size=16)
+        export_dlg.content = ft.Container(
+            width=520,
+            content=ft.Column(
+                [ft.Image(src_base64=b64, fit=ft.ImageFit.CONTAIN) for b64 in images],
+                scroll=ft.ScrollMode.AUTO,
+                spacing=12,
+                tight=True,
+            ),
+        )
+        export_dlg.actions = [ft.TextButton("Cerrar", on_click=lambda e: close_export())]
+        page.dialog = export_dlg
+        export_dlg.open = True
+        page.update()
+
+    def close_export():
+        export_dlg.open = False
+        page.update()
+
+    export_btn = ft.IconButton(
+        icon=ft.Icons.IMAGE_OUTLINED,
+        tooltip="Exportar gráficas",
+        icon_color="#7E57C2",
+        on_click=lambda e: page.run_task(export_charts),
+    )
+
     # ---------- Header responsivo ----------
     title_text = ft.Text(
         f"📊 Estadísticas de {username}",
@@ -286,7 +375,7 @@ def StatsView(page: ft.Page):
         header_section = ft.Column(
             [
                 title_text,
-                mode_dropdown,
+                ft.Row([mode_dropdown, export_btn], spacing=4),
             ],
             spacing=12,
             horizontal_alignment=ft.CrossAxisAlignment.START,
@@ -295,7 +384,7 @@ def StatsView(page: ft.Page):
         header_section = ft.Row(
             [
                 title_text,
-                mode_dropdown,
+                ft.Row([mode_dropdown, export_btn], spacing=4),
             ],
             alignment=ft.MainAxisAlignment.SPACE_BETWEEN,
             vertical_alignment=ft.CrossAxisAlignment.CENTER,
@@ -305,27 +394,11 @@ def StatsView(page: ft.Page):
     content = ft.Column(
         [
             header_section,
-            rounded_card(
-                ft.Container(
-                    content=chart_notes,
-                    alignment=ft.alignment.center,
-                ),
-                16
-            ),
-            rounded_card(
-                ft.Container(
-                    content=chart_mood,
-                    alignment=ft.alignment.center,
-                ),
-                16
-            ),
-            rounded_card(
-                ft.Container(
-                    content=chart_emotions,
-                    alignment=ft.alignment.center,
-                ),
-                16
-            ),
+            custom_row,
+            rounded_card(chart_notes, 16),
+            rounded_card(chart_mood, 16),
+            rounded_card(chart_emotions, 16),
+            rounded_card(heatmap, 16),
             rounded_card(
                 ft.Column(
                     [
@@ -357,8 +430,19 @@ def StatsView(page: ft.Page):
         expand=True,
     )
 
-    # Función para actualizar en resize
-    def on_resize(e):
+    # ---------- Resize: debounce + solo al cruzar un breakpoint ----------
+    RESIZE_DEBOUNCE_S = 0.25
+
+    def size_class():
+        if is_mobile():
+            return "mobile"
+        if is_tablet():
+            return "tablet"
+        return "desktop"
+
+    resize_state = {"size_class": size_class(), "token": 0}
+
+    def apply_layout():
         # Actualizar tamaños de texto
         title_text.size = 18 if is_mobile() else 20
         insights_txt.size = 13 if is_mobile() else 14
@@ -372,14 +456,30 @@ def StatsView(page: ft.Page):
         
         # Actualizar espaciado
         content.spacing = 20 if is_mobile() else 25
-        
-        # Recargar gráficas con nuevo tamaño
+
+        # Re-layout de las gráficas con los datos ya cargados (sin red)
+        if not state["ready"]:
+            page.update()
+        else:
+            render_charts()
+
+    async def debounced_resize(token: int):
+        await asyncio.sleep(RESIZE_DEBOUNCE_S)
+        if token != resize_state["token"]:
+            return  # llegó otro resize; ese se encarga
+        new_class = size_class()
+        if new_class == resize_state["size_class"]:
+            return
+        resize_state["size_class"] = new_class
+        apply_layout()
+
+    def on_resize(e):
+        resize_state["token"] += 1
+        token = resize_state["token"]
         try:
-            page.run_task(load_and_update)
+            page.run_task(debounced_resize, token)
         except Exception:
             pass
-        
-        page.update()
     
     page.on_resize = on_resize
 
@@ -0,0 +1,292 @@
+# services/chart_render.py
+"""
+Render de gráficas como imagen PNG (base64) para exportar (PDF, correo, descarga).
+
+StatsView dibuja con controles nativos de Flet; esto solo se usa cuando hace
+falta una imagen. Los PNG se guardan en un caché LRU direccionado por contenido:
+la llave es un hash de (datos, título, tipo, tamaño, estilo), así que volver a
+pedir los mismos datos no vuelve a rasterizar. El caché tiene tope de memoria y,
+opcionalmente, se desborda a disco (MINDFUL_CHART_CACHE_DIR). Cada archivo se
+escribe completo antes de publicarse (os.replace), y el directorio se recorta
+por antigüedad a DISK_MAX_BYTES.
+
+La rasterización usa la API orientada a objetos de Matplotlib (Figure + Agg,
+sin el estado global de pyplot) y corre en un pool de procesos, para no bloquear
+el loop de la UI ni serializar en el GIL a varias sesiones a la vez. Los
+workers se arrancan con "spawn": un fork del servidor copiaría hilos, canales
+gRPC de Firestore y la conexión SQLite del espejo a medio usar.
+"""
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# figsize y tamaño de título por clase de tamaño de pantalla
+SIZE_CLASSES = {
+    "mobile": ((6, 3.5), 12),
+    "tablet": ((5.5, 3.3), 13),
+    "desktop": ((6, 3.5), 13),
+}
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+DISK_MAX_BYTES = int(os.getenv("MINDFUL_CHART_CACHE_DISK_MB", "64")) * 1024 * 1024
+
+# Procesos del pool de render (MINDFUL_CHART_WORKERS=0 desactiva el pool)
+CHART_WORKERS = int(os.getenv("MINDFUL_CHART_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+
+def chart_key(data: dict, title: str, kind: str, size_class: str, color: str = "", emoji: str = "", ylabel: str = "") -> str:
+    """Hash estable del contenido de una gráfica."""
+    blob = json.dumps(
+        {
+            "data": [[str(k), v] for k, v in (data or {}).items()],
+            "title": title, "kind": kind, "size": size_class,
+            "color": color, "emoji": emoji, "ylabel": ylabel,
+        },
+        sort_keys=True, ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ChartRenderCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, disk_dir: str | None = None,
+                 disk_max_bytes: int = DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+        self._items: "OrderedDict[str, str]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.b64")
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                with open(path, "r", encoding="ascii") as f:
+                    value = f.read()
+                os.utime(path)  # el recorte borra primero lo menos usado
+            except OSError:
+                value = None
+            if value:
+                with self._lock:
+                    self.disk_hits += 1
+                self._put_memory(key, value)
+                return value
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: str):
+        self._put_memory(key, value)
+
+    def _put_memory(self, key: str, value: str):
+        spilled = []
+        with self._lock:
+            if key in self._items:
+                self._bytes -= len(self._items.pop(key))
+            self._items[key] = value
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes and len(self._items) > 1:
+                old_key, old_val = self._items.popitem(last=False)
+                self._bytes -= len(old_val)
+                self.evictions += 1
+                spilled.append((old_key, old_val))
+        if self.disk_dir and spilled:
+            for k, v in spilled:
+                self._write_disk(k, v)
+            self._prune_disk()
+
+    def _write_disk(self, key: str, value: str):
+        path = self._disk_path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="ascii") as f:
+                f.write(value)
+            os.replace(tmp, path)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+    def _prune_disk(self):
+        """Borra los PNG más viejos hasta que el directorio quede bajo disk_max_bytes."""
+        try:
+            entries = [e for e in os.scandir(self.disk_dir) if e.name.endswith(".b64")]
+            files = sorted(((e.stat().st_mtime, e.stat().st_size, e.path) for e in entries))
+        except OSError:
+            return
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.disk_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._items),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": ((self.hits + self.disk_hits) / lookups) if lookups else 0.0,
+            }
+
+
+_cache = ChartRenderCache(disk_dir=os.getenv("MINDFUL_CHART_CACHE_DIR") or None)
+
+
+def cache_stats() -> dict:
+    """Instrumentación del caché compartido (hits, misses, hit_ratio…)."""
+    return _cache.stats()
+
+
+def plot_to_base64(fig) -> str:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", bbox_inches="tight", transparent=True)
+    img_b64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+    buf.close()
+    return img_b64
+
+
+def _render(data: dict, title: str, color: str, emoji: str, ylabel: str, kind: str, size_class: str) -> str:
+    """Rasteriza una gráfica; función de módulo para poder ejecutarse en el pool."""
+    # matplotlib solo se importa cuando de verdad hay que rasterizar
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+    if not data:
+        fig = Figure(figsize=(5, 3))
+        FigureCanvasAgg(fig)
+        ax = fig.subplots()
+        ax.text(0.5, 0.5, "Sin datos disponibles", fontsize=14, ha="center", va="center")
+        ax.axis("off")
+        return plot_to_base64(fig)
+
+    labels, values = zip(*data.items())
+    labels = [str(x) for x in labels]
+    figsize, title_size = SIZE_CLASSES.get(size_class, SIZE_CLASSES["desktop"])
+    tick_size = 9 if size_class == "mobile" else 10
+
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+
+    if kind == "bar":
+        ax.bar(labels, values, color=color)
+    elif kind == "line":
+        ax.plot(labels, values, marker="o", color=color, linewidth=2.5)
+        ax.fill_between(range(len(values)), values, alpha=0.2, color=color)
+
+    ax.set_title(f"{emoji} {title}", fontsize=title_size, color="#4A148C")
+    ax.set_ylabel(ylabel)
+    ax.grid(True, linestyle="--", alpha=0.3)
+    ax.tick_params(axis="x", labelrotation=25, labelsize=tick_size)
+    ax.tick_params(axis="y", labelsize=tick_size)
+    for lbl in ax.get_xticklabels():
+        lbl.set_horizontalalignment("right")
+    fig.tight_layout()
+    return plot_to_base64(fig)
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor | None:
+    global _pool
+    if CHART_WORKERS <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                _pool = ProcessPoolExecutor(
+                    max_workers=CHART_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                )
+            except (OSError, NotImplementedError) as ex:
+                # Plataformas sin multiprocessing (p. ej. builds móviles)
+                print("[CHARTS] Pool de procesos no disponible:", ex)
+                return None
+        return _pool
+
+
+def _discard_pool(broken: ProcessPoolExecutor):
+    """Descarta un pool roto (worker caído, OOM); el siguiente render crea uno nuevo."""
+    global _pool
+    with _pool_lock:
+        if _pool is broken:
+            _pool = None
+    broken.shutdown(wait=False, cancel_futures=True)
+
+
+def create_chart(data: dict, title: str, color: str, emoji: str, ylabel: str, kind: str = "bar",
+                 size_class: str = "desktop") -> str:
+    """PNG en base64 de la gráfica (bloqueante, en el proceso actual); usa el caché."""
+    key = chart_key(data, title, kind, size_class, color, emoji, ylabel)
+    cached = _cache.get(key)
+    if cached is not None:
+        return cached
+    img_b64 = _render(data, title, color, emoji, ylabel, kind, size_class)
+    _cache.put(key, img_b64)
+    return img_b64
+
+
+async def create_charts_async(specs: list[dict]) -> list[str]:
+    """
+    Rasteriza varias gráficas en paralelo en el pool de procesos.
+    Cada spec tiene las llaves de `create_chart` (data, title, color, emoji, ylabel, kind, size_class).
+    Devuelve los PNG en base64 en el mismo orden; lo que ya está en caché no se re-rasteriza.
+    """
+    loop = asyncio.get_running_loop()
+    pool = _get_pool()
+
+    async def one(spec: dict) -> str:
+        args = (
+            spec.get("data") or {}, spec.get("title", ""), spec.get("color", ""), spec.get("emoji", ""),
+            spec.get("ylabel", ""), spec.get("kind", "bar"), spec.get("size_class", "desktop"),
+        )
+        key = chart_key(args[0], args[1], args[5], args[6], args[2], args[3], args[4])
+        cached = _cache.get(key)
+        if cached is not None:
+            return cached
+        try:
+            img_b64 = await loop.run_in_executor(pool, _render, *args)
+        except Exception as ex:
+            if pool is None:
+                raise
+            if isinstance(ex, BrokenProcessPool):
+                _discard_pool(pool)
+            print("[CHARTS] Falló el pool, se renderiza en hilo:", ex)
+            img_b64 = await asyncio.to_thread(_render, *args)
+        _cache.put(key, img_b64)
+        return img_b64
+
+    return list(await asyncio.gather(*(one(s) for s in specs)))
@@ -0,0 +1,264 @@
+# services/directory_engine.py
+"""
+Motor en memoria del directorio de profesionales, compartido por todo el proceso.
+
+Las tarjetas públicas de `directory` se cargan una sola vez y cada una ocupa un
+slot (posición de bit). Por cada faceta (especialidad, estado, municipio,
+nivel) se guarda {valor: bitset} como un int de Python, así que cualquier
+combinación de filtros es un AND de enteros y la página se arma recorriendo los
+bits encendidos en el orden de `sortName`. Un listener de Firestore
+(on_snapshot) mantiene el motor al día; todas las sesiones web leen la misma
+copia en lugar de consultar Firestore en cada cambio de filtro. El índice de
+trigramas (directory_search) y la rejilla geográfica (geo_index) comparten los
+slots y se actualizan en el mismo paso.
+"""
+import bisect
+import threading
+
+from services.directory_search import TrigramIndex
+from services.geo_index import GridIndex, load_centroids
+
+FACETS = ("specialty", "state", "municipality", "level")
+ORDER_BLOCK = 64
+
+
+def _bits(mask: int):
+    """Índices de los bits encendidos, de menor a mayor."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class DirectoryEngine:
+    def __init__(self):
+        self.cards: list[dict | None] = []      # slot -> tarjeta (None = libre)
+        self.slots: dict[str, int] = {}         # uid -> slot
+        self._free: list[int] = []
+        self.facets: dict[str, dict[str, int]] = {f: {} for f in FACETS}
+        self.all_mask = 0
+        # slots ordenados por (sortName, uid); se mantiene con bisect
+        self._order: list[tuple[str, str, int]] = []
+        self._blocks: list[tuple[int, list[int]]] = []
+        self._blocks_version = -1
+        self.fuzzy = TrigramIndex()
+        self.centroids = load_centroids()
+        self.geo = GridIndex()
+        self.ready = threading.Event()
+        self.version = 0
+        self.lock = threading.RLock()
+        self._watch = None
+
+    # ---------- escritura ----------
+    def _unset(self, slot: int):
+        card = self.cards[slot]
+        bit = 1 << slot
+        for f in FACETS:
+            v = card.get(f)
+            if not v:
+                continue
+            m = self.facets[f].get(v, 0) & ~bit
+            if m:
+                self.facets[f][v] = m
+            else:
+                self.facets[f].pop(v, None)
+        key = (card.get("sortName") or "", card["uid"], slot)
+        i = bisect.bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+        self.fuzzy.remove(slot, card)
+        self.geo.remove(slot)
+        self.all_mask &= ~bit
+
+    def upsert(self, uid: str, data: dict):
+        card = {**data, "uid": uid}
+        with self.lock:
+            slot = self.slots.get(uid)
+            if slot is None:
+                slot = self._free.pop() if self._free else len(self.cards)
+                if slot == len(self.cards):
+                    self.cards.append(None)
+                self.slots[uid] = slot
+            else:
+                self._unset(slot)
+            self.cards[slot] = card
+            bit = 1 << slot
+            for f in FACETS:
+                v = card.get(f)
+                if v:
+                    self.facets[f][v] = self.facets[f].get(v, 0) | bit
+            self.fuzzy.add(slot, card)
+            self.geo.add(slot, self.centroids.locate(card.get("state"), card.get("municipality")))
+            bisect.insort(self._order, (card.get("sortName") or "", uid, slot))
+            self.all_mask |= bit
+            self.version += 1
+
+    def remove(self, uid: str):
+        with self.lock:
+            slot = self.slots.pop(uid, None)
+            if slot is None:
+                return
+            self._unset(slot)
+            self.cards[slot] = None
+            self._free.append(slot)
+            self.version += 1
+
+    def load(self, items):
+        """Carga inicial a partir de (uid, datos)."""
+        with self.lock:
+            for uid, data in items:
+                self.upsert(uid, data)
+        self.ready.set()
+
+    # ---------- lectura ----------
+    def mask(self, specialty: str | None = None, state: str | None = None,
+             municipality: str | None = None, level: str | None = None) -> int:
+        m = self.all_mask
+        for f, v in zip(FACETS, (specialty, state, municipality, level)):
+            if v:
+                m &= self.facets[f].get(v, 0)
+                if not m:
+                    break
+        return m
+
+    def count(self, **filters) -> int:
+        with self.lock:
+            return self.mask(**filters).bit_count()
+
+    def facet_counts(self, facet: str, **filters) -> dict[str, int]:
+        """Cuántos profesionales hay por valor de `facet` con el resto de filtros aplicados."""
+        with self.lock:
+            filters.pop(facet, None)
+            m = self.mask(**filters)
+            return {v: c for v, b in self.facets[facet].items() if (c := (b & m).bit_count())}
+
+    def _ensure_blocks(self):
+        """Parte el orden en bloques de ORDER_BLOCK slots, cada uno con su bitset."""
+        if self._blocks_version == self.version:
+            return
+        self._blocks = []
+        for i in range(0, len(self._order), ORDER_BLOCK):
+            chunk = [s for _, _, s in self._order[i:i + ORDER_BLOCK]]
+            bm = 0
+            for s in chunk:
+                bm |= 1 << s
+            self._blocks.append((bm, chunk))
+        self._blocks_version = self.version
+
+    def ordered_slots(self, m: int, offset: int = 0, limit: int = 20) -> list[int]:
+        """
+        Slots de `m` en orden de sortName, desde `offset`. Los bloques sin
+        coincidencias (o que quedan completos antes del offset) se saltan con un AND.
+        """
+        if m.bit_count() <= 4 * limit:
+            picked = sorted(_bits(m), key=lambda s: (self.cards[s].get("sortName") or "", self.cards[s]["uid"]))
+            return picked[offset:offset + limit]
+        self._ensure_blocks()
+        out, seen = [], 0
+        for bm, chunk in self._blocks:
+            hit = bm & m
+            if not hit:
+                continue
+            n = hit.bit_count()
+            if seen + n <= offset:
+                seen += n
+                continue
+            for s in chunk:
+                if hit >> s & 1:
+                    if seen >= offset:
+                        out.append(s)
+                        if len(out) == limit:
+                            return out
+                    seen += 1
+        return out
+
+    def query(self, specialty: str | None = None, state: str | None = None,
+              municipality: str | None = None, level: str | None = None,
+              offset: int = 0, limit: int = 20) -> tuple[list[dict], int | None]:
+        """
+        Página ordenada por sortName. Devuelve (tarjetas, siguiente offset);
+        el offset es None cuando ya no hay más resultados.
+        """
+        with self.lock:
+            m = self.mask(specialty, state, municipality, level)
+            total = m.bit_count()
+            if offset >= total:
+                return [], None
+            page = self.ordered_slots(m, offset, limit)
+            nxt = offset + len(page)
+            return [dict(self.cards[s]) for s in page], (nxt if nxt < total else None)
+
+    def search(self, text: str, limit: int = 20, **filters) -> list[dict]:
+        """Búsqueda difusa por nombre/especialidad/propósito dentro de los filtros activos."""
+        with self.lock:
+            hits = self.fuzzy.search(self, text, self.mask(**filters), limit)
+            return [{**self.cards[s], "score": score} for score, s in hits]
+
+    def nearest(self, state: str, municipality: str | None = None, limit: int = 10,
+                exclude: int = 0, specialty: str | None = None, level: str | None = None) -> list[dict]:
+        """
+        Profesionales más cercanos al centroide de (state, municipality); respeta
+        especialidad/nivel y omite los slots de `exclude`. Solo llevan
+        `distanceKm` si ambos municipios tienen centroide propio; si alguno usa
+        el del estado, llevan `sameState` cuando comparten estado.
+        """
+        origin = self.centroids.locate(state, municipality)
+        if origin is None:
+            return []
+        origin_exact = self.centroids.is_exact(state, municipality)
+        with self.lock:
+            m = self.mask(specialty=specialty, level=level) & ~exclude
+            out = []
+            for km, bits in self.geo.nearest(origin, m, limit):
+                for s in self.ordered_slots(bits, 0, limit - len(out)):
+                    card = self.cards[s]
+                    if origin_exact and self.centroids.is_exact(card.get("state"), card.get("municipality")):
+                        out.append({**card, "distanceKm": round(km, 1)})
+                    else:
+                        out.append({**card, "sameState": card.get("state") == state})
+            return out
+
+    # ---------- Firestore ----------
+    def _on_snapshot(self, docs, changes, read_time):
+        with self.lock:
+            for ch in changes:
+                doc = ch.document
+                if ch.type.name == "REMOVED":
+                    self.remove(doc.id)
+                else:
+                    self.upsert(doc.id, doc.to_dict() or {})
+        if not self.ready.is_set():
+            print(f"[DIRECTORY] Directorio en memoria: {len(self.slots)} profesionales")
+        self.ready.set()
+
+    def watch(self, fb):
+        """Primera carga + cambios en vivo; si el listener falla, carga una sola vez."""
+        if self._watch is not None:
+            return
+        try:
+            self._watch = fb.directory_collection().on_snapshot(self._on_snapshot)
+        except Exception as ex:
+            print("[DIRECTORY] Listener no disponible, carga única:", ex)
+            self._watch = False
+            try:
+                self.load((d.id, d.to_dict() or {}) for d in fb.directory_collection().stream())
+            except Exception as ex2:
+                print("[DIRECTORY] No se pudo cargar el directorio:", ex2)
+
+
+_engine: DirectoryEngine | None = None
+_engine_lock = threading.Lock()
+
+
+def get_engine(fb=None) -> DirectoryEngine:
+    """Motor único del proceso; el primer llamador con `fb` arranca el listener."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = DirectoryEngine()
+        engine = _engine
+    if fb is not None and engine._watch is None:
+        with _engine_lock:
+            if engine._watch is None:
+                engine.watch(fb)
+    return engine
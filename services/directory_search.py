@@ -0,0 +1,150 @@
+# services/directory_search.py
+"""
+Búsqueda difusa por trigramas sobre el directorio de profesionales.
+
+Nombre y propósito se pasan a minúsculas sin acentos y se parten en
+trigramas por palabra (" ana " → " an", "ana", "na "). Por cada trigrama se
+guarda un bitset de slots (los mismos del DirectoryEngine), así que el índice
+se actualiza por tarjeta junto con el motor. Una consulta no recorre tarjetas:
+los bitsets de sus trigramas se suman en contadores por planos de bits
+(suma en paralelo de todos los slots) y de ahí salen las máscaras "k trigramas
+en común" para cada k. La especialidad tiene pocos valores distintos, se
+califica por valor y se aplica con el bitset de faceta del motor. Cada
+combinación de niveles tiene un mismo puntaje, así que la página se llena
+tomando grupos de mayor a menor puntaje en orden alfabético.
+"""
+import math
+import re
+
+from services.note_search import fold
+
+MIN_SIM = 0.5         # fracción mínima de trigramas de la consulta
+NAME_WEIGHT = 3.0
+SPEC_WEIGHT = 2.0
+PURPOSE_WEIGHT = 1.0
+PURPOSE_CHARS = 240
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def trigrams(text: str, partial_tail: bool = False) -> set[str]:
+    """
+    Trigramas por palabra con un espacio de relleno a cada lado. Con
+    `partial_tail` la última palabra no lleva relleno final (se está escribiendo).
+    """
+    words = _WORD_RE.findall(fold(text))
+    out = set()
+    for i, w in enumerate(words):
+        tail = "" if partial_tail and i == len(words) - 1 else " "
+        padded = f" {w}{tail}"
+        if len(padded) < 3:
+            continue
+        out.update(padded[j:j + 3] for j in range(len(padded) - 2))
+    return out
+
+
+class TrigramIndex:
+    def __init__(self):
+        self.name: dict[str, int] = {}      # trigrama -> bitset de slots
+        self.purpose: dict[str, int] = {}
+        self._spec_grams: dict[str, set[str]] = {}
+
+    @staticmethod
+    def _fields(card: dict) -> tuple[set[str], set[str]]:
+        name = card.get("fullName") or card.get("username") or ""
+        purpose = (card.get("purpose") or "")[:PURPOSE_CHARS]
+        return trigrams(name), trigrams(purpose)
+
+    def add(self, slot: int, card: dict):
+        bit = 1 << slot
+        for table, grams in zip((self.name, self.purpose), self._fields(card)):
+            for g in grams:
+                table[g] = table.get(g, 0) | bit
+
+    def remove(self, slot: int, card: dict):
+        bit = ~(1 << slot)
+        for table, grams in zip((self.name, self.purpose), self._fields(card)):
+            for g in grams:
+                m = table.get(g, 0) & bit
+                if m:
+                    table[g] = m
+                else:
+                    table.pop(g, None)
+
+    def _spec_sim(self, value: str, qgrams: set[str]) -> float:
+        grams = self._spec_grams.get(value)
+        if grams is None:
+            grams = self._spec_grams[value] = trigrams(value)
+        return len(qgrams & grams) / len(qgrams)
+
+    @staticmethod
+    def _levels(posts: list[int], mask: int, need: int, weight: float) -> list[tuple[float, int]]:
+        """[(puntaje, slots con exactamente k trigramas en común)] para k >= need."""
+        planes: list[int] = []  # planes[i] = bit i del contador de cada slot
+        for p in posts:
+            carry = p & mask
+            for i in range(len(planes)):
+                if not carry:
+                    break
+                planes[i], carry = planes[i] ^ carry, planes[i] & carry
+            if carry:
+                planes.append(carry)
+        n = len(posts)
+        out = []
+        for k in range(need, n + 1):
+            if k >> len(planes):
+                break
+            m = mask
+            for i, plane in enumerate(planes):
+                m &= plane if k >> i & 1 else ~plane
+                if not m:
+                    break
+            if m:
+                out.append((weight * k / n, m))
+        return out
+
+    def search(self, engine, query: str, mask: int, limit: int = 20) -> list[tuple[float, int]]:
+        """
+        [(puntaje, slot)] de mayor a menor. `engine` aporta las tarjetas, el
+        orden por nombre y los bitsets de especialidad; `mask` son los filtros activos.
+        """
+        qgrams = trigrams(query, partial_tail=True)
+        if not qgrams or not mask:
+            return []
+        need = max(1, math.ceil(MIN_SIM * len(qgrams)))
+
+        fields = []
+        for table, weight in ((self.name, NAME_WEIGHT), (self.purpose, PURPOSE_WEIGHT)):
+            levels = self._levels([table.get(g, 0) for g in qgrams], mask, need, weight)
+            fields.append(levels)
+        spec = []
+        for value, bits in engine.facets["specialty"].items():
+            sim = self._spec_sim(value, qgrams)
+            if sim >= MIN_SIM and bits & mask:
+                spec.append((SPEC_WEIGHT * sim, bits & mask))
+        fields.append(spec)
+
+        # cada campo suma 0 fuera de sus niveles
+        for levels in fields:
+            covered = 0
+            for _, m in levels:
+                covered |= m
+            levels.append((0.0, mask & ~covered))
+
+        groups = []
+        for s1, m1 in fields[0]:
+            for s2, m2 in fields[1]:
+                m12 = m1 & m2
+                if not m12:
+                    continue
+                for s3, m3 in fields[2]:
+                    m = m12 & m3
+                    if m and s1 + s2 + s3 > 0:
+                        groups.append((s1 + s2 + s3, m))
+
+        out: list[tuple[float, int]] = []
+        for score, m in sorted(groups, key=lambda g: -g[0]):
+            out.extend((score, s) for s in engine.ordered_slots(m, 0, limit - len(out)))
+            if len(out) >= limit:
+                break
+        return out
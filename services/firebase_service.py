@@ -1,13 +1,50 @@
 import os
 import json
+import unicodedata
 import requests
 from typing import Optional, Tuple, Dict, Any
 
 import firebase_admin
 from firebase_admin import credentials, firestore, auth as admin_auth
 from firebase_admin import firestore as admin_fs
+from google.cloud.firestore_v1 import base_query as bq
 from typing import Optional, Tuple, Dict, Any
 
+NOTE_PREVIEW_CHARS = 200
+RECOMMENDATION_PREVIEW_CHARS = 120
+# Proyección del historial de recomendaciones (sin el texto completo ni meta)
+RECOMMENDATION_INDEX_FIELDS = ["date", "preview", "length"]
+# Campos que necesitan las listas de notas (sin el cuerpo completo)
+NOTE_INDEX_FIELDS = ["title", "preview", "length", "createdAt", "updatedAt"]
+
+
+# Campos públicos de la tarjeta de un profesional (colección `directory`)
+DIRECTORY_FIELDS = [
+    "fullName", "level", "specialty", "cedula", "phone", "purpose",
+    "state", "municipality", "photoUrl",
+]
+
+
+def directory_card(user_doc: dict) -> dict | None:
+    """Tarjeta pública a partir de users/{uid}; None si no es profesional."""
+    pro = (user_doc or {}).get("professional")
+    if not isinstance(pro, dict) or pro.get("type") != "profesional":
+        return None
+    card = {k: pro.get(k) for k in DIRECTORY_FIELDS if pro.get(k) not in (None, "")}
+    card["username"] = user_doc.get("username") or user_doc.get("email")
+    # orden estable del listado (sin acentos ni mayúsculas)
+    base = pro.get("fullName") or card["username"] or ""
+    card["sortName"] = "".join(
+        c for c in unicodedata.normalize("NFKD", base.lower()) if not unicodedata.combining(c)
+    )
+    return card
+
+
+def note_summary(content: str, chars: int = NOTE_PREVIEW_CHARS) -> dict:
+    """Campos derivados del cuerpo que se guardan junto a la nota."""
+    body = (content or "").strip()[:4000]
+    preview = " ".join(body[:chars + 40].split())[:chars]
+    return {"preview": preview, "length": len(body)}
 
 
 class FirebaseService:
@@ -175,6 +212,7 @@ class FirebaseService:
         if photo_url:
             payload["professional"]["photoUrl"] = photo_url
         doc_ref.set(payload, merge=True)
+        self.sync_directory_entry(uid)
 
     # Dentro de class FirebaseService: (agrega estos métodos si no existen)
 
@@ -182,6 +220,7 @@ class FirebaseService:
         """Actualiza professional.photoUrl (no toca otros campos)."""
         doc_ref = self.db.collection("users").document(uid)
         doc_ref.set({"professional": {"photoUrl": photo_url}}, merge=True)
+        self.sync_directory_entry(uid)
 
     def update_professional_profile(self, uid: str, data: dict):
         """
@@ -194,6 +233,82 @@ class FirebaseService:
         for k, v in data.items():
             payload["professional"][k] = v
         doc_ref.set(payload, merge=True)
+        self.sync_directory_entry(uid)
+
+    # ---------- DIRECTORIO DE PROFESIONALES ----------
+    def directory_collection(self):
+        return self.db.collection("directory")
+
+    def sync_directory_entry(self, uid: str):
+        """Reescribe directory/{uid} desde el perfil (o lo borra si ya no es profesional)."""
+        snap = self.db.collection("users").document(uid).get()
+        card = directory_card(snap.to_dict() if snap.exists else {})
+        ref = self.directory_collection().document(uid)
+        if card is None:
+            ref.delete()
+        else:
+            ref.set({**card, "updatedAt": admin_fs.SERVER_TIMESTAMP})
+
+    def list_directory(self, specialty: str | None = None, state: str | None = None,
+                       municipality: str | None = None, limit: int = 20, after=None):
+        """
+        Página del directorio filtrada en el servidor (índices compuestos en
+        firestore.indexes.json). Devuelve (tarjetas, cursor); el cursor es el
+        último snapshot y se pasa como `after` para la siguiente página.
+        """
+        q = self.directory_collection()
+        if specialty:
+            q = q.where(filter=bq.FieldFilter("specialty", "==", specialty))
+        if state:
+            q = q.where(filter=bq.FieldFilter("state", "==", state))
+        if municipality:
+            q = q.where(filter=bq.FieldFilter("municipality", "==", municipality))
+        q = q.order_by("sortName").limit(limit)
+        if after is not None:
+            q = q.start_after(after)
+        snaps = list(q.stream())
+        items = [{**(d.to_dict() or {}), "uid": d.id} for d in snaps]
+        return items, (snaps[-1] if len(snaps) == limit else None)
+
+    def rebuild_directory(self) -> tuple[int, int]:
+        """
+        Migración: genera `directory` desde los perfiles profesionales existentes
+        y borra las tarjetas cuyo uid ya no es profesional (o ya no existe).
+        Devuelve (tarjetas escritas, tarjetas borradas).
+        """
+        q = self.db.collection("users").where(filter=bq.FieldFilter("professional.type", "==", "profesional"))
+        batch, pending, written = self.db.batch(), 0, 0
+        kept = set()
+        for d in q.stream():
+            card = directory_card(d.to_dict() or {})
+            if card is None:
+                continue
+            kept.add(d.id)
+            batch.set(self.directory_collection().document(d.id), {**card, "updatedAt": admin_fs.SERVER_TIMESTAMP})
+            pending += 1
+            if pending >= 400:
+                batch.commit()
+                written += pending
+                batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+            written += pending
+
+        # Tarjetas huérfanas: solo se leen los ids (proyección vacía)
+        batch, pending, deleted = self.db.batch(), 0, 0
+        for d in self.directory_collection().select([]).stream():
+            if d.id in kept:
+                continue
+            batch.delete(d.reference)
+            pending += 1
+            if pending >= 400:
+                batch.commit()
+                deleted += pending
+                batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+            deleted += pending
+        return written, deleted
 
 
 
@@ -202,12 +317,15 @@ class FirebaseService:
         return self.db.collection("users").document(uid).collection("diagnostics")
 
     def add_diagnostic(self, uid: str, data: dict) -> str:
-        doc = {**data, "createdAt": admin_fs.SERVER_TIMESTAMP}
+        doc = {**data, "createdAt": admin_fs.SERVER_TIMESTAMP, "updatedAt": admin_fs.SERVER_TIMESTAMP}
         doc_ref = self.diagnostics_collection(uid).add(doc)[1]
         return doc_ref.id
 
     def update_diagnostic(self, uid: str, diagnostic_id: str, data: dict):
-        self.diagnostics_collection(uid).document(diagnostic_id).update(data)
+        # updatedAt: marca de agua del espejo local y de la ventana de estadísticas
+        self.diagnostics_collection(uid).document(diagnostic_id).update(
+            {**data, "updatedAt": admin_fs.SERVER_TIMESTAMP}
+        )
 
     def list_diagnostics(self, uid: str, limit: int = 30):
         q = self.diagnostics_collection(uid).order_by(
@@ -223,6 +341,7 @@ class FirebaseService:
         doc = {
             "title": title.strip()[:80] or "Sin título",
             "content": content.strip()[:4000],
+            **note_summary(content),
             "createdAt": admin_fs.SERVER_TIMESTAMP,
             "updatedAt": admin_fs.SERVER_TIMESTAMP,
         }
@@ -233,9 +352,20 @@ class FirebaseService:
         self.notes_collection(uid).document(note_id).update({
             "title": (title or "").strip()[:80] or "Sin título",
             "content": (content or "").strip()[:4000],
+            **note_summary(content),
             "updatedAt": admin_fs.SERVER_TIMESTAMP,
         })
 
+    def update_note_fields(self, uid: str, note_id: str, fields: dict):
+        """Actualiza solo los campos dados (title y/o content) de una nota."""
+        payload = {"updatedAt": admin_fs.SERVER_TIMESTAMP}
+        if "title" in fields:
+            payload["title"] = (fields["title"] or "").strip()[:80] or "Sin título"
+        if "content" in fields:
+            payload["content"] = (fields["content"] or "").strip()[:4000]
+            payload.update(note_summary(fields["content"]))
+        self.notes_collection(uid).document(note_id).update(payload)
+
     def delete_note(self, uid: str, note_id: str):
         self.notes_collection(uid).document(note_id).delete()
 
@@ -243,12 +373,38 @@ class FirebaseService:
         d = self.notes_collection(uid).document(note_id).get()
         return ({**d.to_dict(), "id": d.id} if d.exists else None)
 
-    def list_notes(self, uid: str, limit: int = 100):
+    def list_notes(self, uid: str, limit: int = 100, index_only: bool = False):
+        """Notas recientes; con index_only solo viajan título, vista previa, largo y fechas."""
         q = (self.notes_collection(uid)
             .order_by("updatedAt", direction=firestore.Query.DESCENDING)
             .limit(limit))
+        if index_only:
+            q = q.select(NOTE_INDEX_FIELDS)
         return [{**doc.to_dict(), "id": doc.id} for doc in q.stream()]
 
+    def backfill_note_summaries(self, uid: str, batch_size: int = 400) -> int:
+        """
+        Migración: agrega preview/length a las notas que aún no los tienen.
+        No toca updatedAt para no alterar el orden ni las marcas de sync.
+        Devuelve cuántas notas se actualizaron.
+        """
+        updated = 0
+        batch, pending = self.db.batch(), 0
+        for d in self.notes_collection(uid).stream():
+            data = d.to_dict() or {}
+            if "preview" in data and "length" in data:
+                continue
+            batch.update(d.reference, note_summary(data.get("content") or ""))
+            pending += 1
+            if pending >= batch_size:
+                batch.commit()
+                updated += pending
+                batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+            updated += pending
+        return updated
+
     # ---------- RECOMMENDATIONS (UNA POR DÍA) ----------
     def recommendation_doc(self, uid: str, date_key: str):
         """Referencia al documento de recomendación de ese día."""
@@ -259,6 +415,7 @@ class FirebaseService:
         payload = {
             "date": date_key,
             "text": (text or "").strip(),
+            **note_summary(text, RECOMMENDATION_PREVIEW_CHARS),
             "meta": meta or {},
             "updatedAt": admin_fs.SERVER_TIMESTAMP,
             "createdAt": admin_fs.SERVER_TIMESTAMP,
@@ -279,6 +436,38 @@ class FirebaseService:
             .limit(limit))
         return [{**d.to_dict(), "id": d.id} for d in q.stream()]
 
+    def list_recommendations_page(self, uid: str, limit: int = 20, before: str | None = None):
+        """
+        Página del historial (solo fecha, vista previa y largo), de la más
+        reciente a la más antigua; `before` es la fecha de la última ya mostrada.
+        """
+        q = self.db.collection("users").document(uid).collection("recommendations")
+        if before:
+            q = q.where(filter=bq.FieldFilter("date", "<", before))
+        q = (q.order_by("date", direction=firestore.Query.DESCENDING)
+            .select(RECOMMENDATION_INDEX_FIELDS)
+            .limit(limit))
+        return [{**d.to_dict(), "id": d.id} for d in q.stream()]
+
+    def backfill_recommendation_previews(self, uid: str, batch_size: int = 400) -> int:
+        """Migración: agrega preview/length a recomendaciones antiguas. Devuelve cuántas cambió."""
+        updated = 0
+        batch, pending = self.db.batch(), 0
+        for d in self.db.collection("users").document(uid).collection("recommendations").stream():
+            data = d.to_dict() or {}
+            if "preview" in data and "length" in data:
+                continue
+            batch.update(d.reference, note_summary(data.get("text") or "", RECOMMENDATION_PREVIEW_CHARS))
+            pending += 1
+            if pending >= batch_size:
+                batch.commit()
+                updated += pending
+                batch, pending = self.db.batch(), 0
+        if pending:
+            batch.commit()
+            updated += pending
+        return updated
+
     def delete_recommendation(self, uid: str, date_key: str):
         """Elimina una recomendación de un día específico."""
         self.recommendation_doc(uid, date_key).delete()
@@ -289,3 +478,61 @@ class FirebaseService:
         for d in self.db.collection("users").document(uid).collection("recommendations").stream():
             batch.delete(d.reference)
         batch.commit()
+
+    # ---------- SINCRONIZACIÓN INCREMENTAL ----------
+    def list_changed_since(self, uid: str, collection: str, field: str, since=None, fields: list | None = None):
+        """
+        Documentos de users/{uid}/{collection} con `field` >= since, en orden ascendente.
+        Sin `since` devuelve toda la colección (primera sincronización), incluidos
+        los documentos antiguos que aún no tienen `field`.
+        Con `fields` solo viajan esos campos (proyección con select()).
+        """
+        q = self.db.collection("users").document(uid).collection(collection)
+        if since is not None:
+            q = q.where(filter=bq.FieldFilter(field, ">=", since))
+            q = q.order_by(field, direction=firestore.Query.ASCENDING)
+        if fields:
+            q = q.select(fields)
+        return [{**(d.to_dict() or {}), "id": d.id} for d in q.stream()]
+
+    def count_docs(self, uid: str, collection: str) -> int:
+        """Cuántos documentos hay en users/{uid}/{collection} (agregación count())."""
+        q = self.db.collection("users").document(uid).collection(collection)
+        return int(q.count().get()[0][0].value)
+
+    def list_ids(self, uid: str, collection: str) -> set[str]:
+        """Ids de users/{uid}/{collection}; proyección vacía, no viaja ningún campo."""
+        q = self.db.collection("users").document(uid).collection(collection).select([])
+        return {d.id for d in q.stream()}
+
+    def list_created_between(self, uid: str, collection: str, start, end=None, fields: list | None = None):
+        """
+        Documentos de users/{uid}/{collection} con start <= createdAt < end.
+        Con `fields` solo viajan esos campos (proyección con select()).
+        """
+        q = (self.db.collection("users").document(uid).collection(collection)
+            .where(filter=bq.FieldFilter("createdAt", ">=", start)))
+        if end is not None:
+            q = q.where(filter=bq.FieldFilter("createdAt", "<", end))
+        if fields:
+            q = q.select(fields)
+        return [{**(d.to_dict() or {}), "id": d.id} for d in q.stream()]
+
+    # ---------- EXPORTACIÓN ----------
+    def iter_collection(self, uid: str, collection: str, order_field: str = "createdAt", page_size: int = 500):
+        """
+        Recorre users/{uid}/{collection} por páginas de `page_size` usando el
+        último documento como cursor; en memoria solo vive una página a la vez.
+        """
+        base = (self.db.collection("users").document(uid).collection(collection)
+            .order_by(order_field, direction=firestore.Query.ASCENDING)
+            .limit(page_size))
+        last = None
+        while True:
+            q = base.start_after(last) if last is not None else base
+            snaps = list(q.stream())
+            for d in snaps:
+                yield {**d.to_dict(), "id": d.id}
+            if len(snaps) < page_size:
+                return
+            last = snaps[-1]
@@ -0,0 +1,147 @@
+# services/geo_index.py
+"""
+Ubicación aproximada de los profesionales sin geocodificar en tiempo de consulta.
+
+centroides.json (junto a estados.json) trae, por estado, su centroide ("*") y
+el de sus municipios con los mismos nombres sin acentos de estados.json; un
+municipio que no esté en la tabla usa el centroide de su estado. Esa
+posición es solo aproximada: is_exact() dice si un municipio tiene centroide
+propio, y sin él no se muestra una distancia en km. La tabla se genera con
+tools/build_centroids.py: la versión incluida sale de GeoNames (CC BY 4.0,
+geonames.org) y cubre ~91% de los municipios; con el catálogo de localidades
+del INEGI (AGEEML) cubre todos.
+
+GridIndex reparte los slots del DirectoryEngine en celdas de CELL_DEG grados y,
+dentro de cada celda, en un bitset por centroide: muchos profesionales
+comparten punto, así que la distancia se calcula por centroide y no por
+persona. La búsqueda recorre anillos de celdas alrededor del origen y se
+detiene cuando el anillo siguiente ya no puede mejorar el k-ésimo.
+"""
+import json
+import math
+import os
+
+from services.note_search import fold
+
+CELL_DEG = 1.0
+EARTH_KM = 6371.0
+KM_PER_DEG = 111.2  # cota inferior de km por grado de latitud
+
+
+def haversine_km(a: tuple[float, float], b: tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_KM * math.asin(min(1.0, math.sqrt(h)))
+
+
+class Centroids:
+    def __init__(self, table: dict | None = None):
+        # {estado plegado: {"*": (lat, lon), municipio plegado: (lat, lon)}}
+        self.table: dict[str, dict[str, tuple[float, float]]] = {}
+        for state, rows in (table or {}).items():
+            self.table[fold(state)] = {("*" if m == "*" else fold(m)): (float(c[0]), float(c[1])) for m, c in rows.items()}
+
+    def locate(self, state: str | None, municipality: str | None = None) -> tuple[float, float] | None:
+        rows = self.table.get(fold(state or ""))
+        if not rows:
+            return None
+        if municipality:
+            point = rows.get(fold(municipality))
+            if point:
+                return point
+        return rows.get("*")
+
+    def is_exact(self, state: str | None, municipality: str | None) -> bool:
+        """True si el municipio tiene centroide propio (no el de su estado)."""
+        rows = self.table.get(fold(state or ""))
+        return bool(rows and municipality and fold(municipality) in rows)
+
+
+def load_centroids() -> Centroids:
+    for p in ("centroides.json", "data/centroides.json"):
+        if os.path.exists(p):
+            try:
+                with open(p, "r", encoding="utf-8") as f:
+                    return Centroids(json.load(f))
+            except Exception as ex:
+                print("[GEO] No se pudo leer", p, ex)
+    return Centroids()
+
+
+def _cell(point: tuple[float, float]) -> tuple[int, int]:
+    return math.floor(point[0] / CELL_DEG), math.floor(point[1] / CELL_DEG)
+
+
+class GridIndex:
+    def __init__(self):
+        # celda -> {centroide: bitset de slots}
+        self.cells: dict[tuple[int, int], dict[tuple[float, float], int]] = {}
+        self.points: dict[int, tuple[float, float]] = {}
+
+    def add(self, slot: int, point: tuple[float, float] | None):
+        if point is None:
+            return
+        self.points[slot] = point
+        cell = self.cells.setdefault(_cell(point), {})
+        cell[point] = cell.get(point, 0) | (1 << slot)
+
+    def remove(self, slot: int):
+        point = self.points.pop(slot, None)
+        if point is None:
+            return
+        c = _cell(point)
+        cell = self.cells[c]
+        m = cell[point] & ~(1 << slot)
+        if m:
+            cell[point] = m
+        else:
+            del cell[point]
+            if not cell:
+                del self.cells[c]
+
+    def _ring(self, center: tuple[int, int], r: int):
+        ci, cj = center
+        if r == 0:
+            yield center
+            return
+        for j in range(cj - r, cj + r + 1):
+            yield ci - r, j
+            yield ci + r, j
+        for i in range(ci - r + 1, ci + r):
+            yield i, cj - r
+            yield i, cj + r
+
+    def nearest(self, origin: tuple[float, float], mask: int, k: int = 10) -> list[tuple[float, int]]:
+        """[(km, bitset)] por centroide, de cerca a lejos, hasta cubrir k slots de `mask`."""
+        if not mask or not self.cells:
+            return []
+        center = _cell(origin)
+        max_r = max(max(abs(i - center[0]), abs(j - center[1])) for i, j in self.cells)
+        found: list[tuple[float, int, int]] = []   # (km, cuántos, bitset)
+        for r in range(max_r + 1):
+            if sum(n for _, n, _ in found) >= k:
+                # k-ésima distancia contra la mínima posible en el anillo r: todo punto ahí
+                # está al menos a r - 1 celdas; la longitud se acorta hacia el norte
+                found.sort()
+                acc, kth = 0, 0.0
+                for d, n, _ in found:
+                    acc += n
+                    if acc >= k:
+                        kth = d
+                        break
+                lat = min(89.0, abs(origin[0]) + r * CELL_DEG)
+                if (r - 1) * CELL_DEG * KM_PER_DEG * math.cos(math.radians(lat)) > kth:
+                    break
+            for cell in self._ring(center, r):
+                for point, bits in self.cells.get(cell, {}).items():
+                    m = bits & mask
+                    if m:
+                        found.append((haversine_km(origin, point), m.bit_count(), m))
+        found.sort(key=lambda f: f[0])
+        out, acc = [], 0
+        for d, n, m in found:
+            out.append((d, m))
+            acc += n
+            if acc >= k:
+                break
+        return out
@@ -0,0 +1,209 @@
+# services/journal_export.py
+"""
+Exportación en streaming del diario completo (notas, diagnósticos y recomendaciones).
+
+Los documentos se leen de Firestore por páginas con cursor y se escriben uno a
+uno al destino (archivo, respuesta HTTP o cualquier stream binario), así la
+memoria no crece con el historial. Formatos:
+
+- "csv":    un solo CSV con columna `collection`.
+- "ndjson": una línea JSON por documento, con llave `collection`.
+- "zip":    un CSV por colección dentro de un ZIP.
+
+El archivo se arma en un temporal del sistema y se entrega al cliente: en
+escritorio/móvil se copia a la ruta que elige el usuario (FilePicker) y en web
+se publica bajo una URL de un solo uso en assets/downloads/ que se borra a
+los DOWNLOAD_TTL_S. main.py pasa la ruta absoluta de assets con
+`set_assets_dir` (la misma que recibe ft.app), que además limpia lo que haya
+quedado de una ejecución anterior. Nada queda guardado en el servidor.
+"""
+import csv
+import io
+import json
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+
+import pytz
+
+FORMATS = ("csv", "ndjson", "zip")
+
+# (colección, campo de orden para el cursor)
+COLLECTIONS = (
+    ("notes", "createdAt"),
+    ("diagnostics", "createdAt"),
+    ("recommendations", "date"),
+)
+
+# Columnas fijas; lo demás del documento va serializado en `extra`
+DOWNLOADS_DIR = "downloads"   # dentro de assets_dir
+DOWNLOAD_TTL_S = 10 * 60
+
+# assets junto a main.py, sin depender del directorio de trabajo
+_assets_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets")
+
+CSV_FIELDS = ["collection", "id", "createdAt", "updatedAt", "date", "title", "content", "mood", "text", "extra"]
+
+
+def _value(v):
+    if isinstance(v, datetime):
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=pytz.utc)
+        return v.isoformat()
+    return v
+
+
+def _plain(doc: dict) -> dict:
+    return {k: _value(v) for k, v in doc.items()}
+
+
+def _csv_row(collection: str, doc: dict) -> dict:
+    d = _plain(doc)
+    row = {"collection": collection}
+    for f in CSV_FIELDS[1:-1]:
+        v = d.pop(f, "")
+        row[f] = v if isinstance(v, (str, int, float)) else json.dumps(v, ensure_ascii=False, default=str)
+    row["extra"] = json.dumps(d, ensure_ascii=False, default=str) if d else ""
+    return row
+
+
+def export_filename(fmt: str, now: datetime | None = None) -> str:
+    stamp = (now or datetime.now(pytz.utc)).strftime("%Y%m%d-%H%M%S")
+    return f"mindful-diario-{stamp}.{fmt}"
+
+
+def export_journal(fb, uid: str, out, fmt: str = "zip", progress=None, page_size: int = 500) -> dict:
+    """
+    Escribe el diario de `uid` en `out` (stream binario con .write).
+    `progress(collection, count)` se llama cada `page_size` documentos y al
+    terminar cada colección. Devuelve {colección: documentos escritos}.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no soportado: {fmt}")
+
+    counts = {}
+
+    def report(col, n, force=False):
+        if progress and (force or n % page_size == 0):
+            progress(col, n)
+
+    if fmt == "zip":
+        # ZIP_DEFLATED en modo stream: cada entrada se comprime mientras se escribe
+        with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for col, order in COLLECTIONS:
+                n = 0
+                with zf.open(f"{col}.csv", "w", force_zip64=True) as raw:
+                    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+                    writer = csv.DictWriter(text, fieldnames=CSV_FIELDS)
+                    writer.writeheader()
+                    for doc in fb.iter_collection(uid, col, order, page_size):
+                        writer.writerow(_csv_row(col, doc))
+                        n += 1
+                        report(col, n)
+                    text.flush()
+                    text.detach()
+                counts[col] = n
+                report(col, n, force=True)
+        return counts
+
+    text = io.TextIOWrapper(out, encoding="utf-8", newline="", write_through=True)
+    try:
+        writer = None
+        if fmt == "csv":
+            writer = csv.DictWriter(text, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+        for col, order in COLLECTIONS:
+            n = 0
+            for doc in fb.iter_collection(uid, col, order, page_size):
+                if writer is not None:
+                    writer.writerow(_csv_row(col, doc))
+                else:
+                    text.write(json.dumps({"collection": col, **_plain(doc)}, ensure_ascii=False, default=str))
+                    text.write("\n")
+                n += 1
+                report(col, n)
+            counts[col] = n
+            report(col, n, force=True)
+        text.flush()
+    finally:
+        # el stream de salida lo cierra quien lo abrió
+        text.detach()
+    return counts
+
+
+def export_to_tempfile(fb, uid: str, fmt: str = "zip", progress=None) -> tuple[str, dict]:
+    """Exporta a un archivo temporal del sistema; quien lo recibe debe entregarlo y borrarlo."""
+    fd, path = tempfile.mkstemp(prefix="mindful-export-", suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            counts = export_journal(fb, uid, f, fmt, progress)
+    except Exception:
+        discard(path)
+        raise
+    return path, counts
+
+
+def discard(path: str | None):
+    if not path:
+        return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _sweep_downloads(root: str):
+    """Borra descargas publicadas que ya caducaron (p. ej. tras un reinicio)."""
+    try:
+        entries = os.listdir(root)
+    except OSError:
+        return
+    limit = time.time() - DOWNLOAD_TTL_S
+    for name in entries:
+        d = os.path.join(root, name)
+        try:
+            if os.path.getmtime(d) < limit:
+                shutil.rmtree(d, ignore_errors=True)
+        except OSError:
+            pass
+
+
+def _schedule(delay: float, fn, *args, **kwargs):
+    timer = threading.Timer(delay, fn, args=args, kwargs=kwargs)
+    timer.daemon = True
+    timer.start()
+
+
+def set_assets_dir(path: str):
+    """Directorio de assets que sirve Flet; borra las descargas caducadas de otra ejecución."""
+    global _assets_dir
+    _assets_dir = os.path.abspath(path)
+    root = os.path.join(_assets_dir, DOWNLOADS_DIR)
+    _sweep_downloads(root)
+    # las que aún no caducan ya no tienen temporizador: otra pasada cuando lo hagan
+    _schedule(DOWNLOAD_TTL_S, _sweep_downloads, root)
+
+
+def publish_download(path: str, filename: str) -> str:
+    """
+    Mueve `path` a <assets>/downloads/<token>/<filename> y devuelve la URL
+    relativa; el directorio se borra después de DOWNLOAD_TTL_S.
+    """
+    root = os.path.join(_assets_dir, DOWNLOADS_DIR)
+    _sweep_downloads(root)
+    token = secrets.token_urlsafe(24)
+    target_dir = os.path.join(root, token)
+    os.makedirs(target_dir)
+    shutil.move(path, os.path.join(target_dir, filename))
+    _schedule(DOWNLOAD_TTL_S, shutil.rmtree, target_dir, ignore_errors=True)
+    return f"/{DOWNLOADS_DIR}/{token}/{filename}"
+
+
+def save_to(path: str, destination: str):
+    """Entrega en escritorio/móvil: mueve el temporal a la ruta elegida por el usuario."""
+    shutil.move(path, destination)
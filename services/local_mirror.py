@@ -0,0 +1,244 @@
+# services/local_mirror.py
+"""
+Espejo local en SQLite de notas, diagnósticos y recomendaciones por uid.
+
+Solo se usa en builds de escritorio/móvil (en web el almacenamiento es
+localStorage). Se mantiene fresco con pulls incrementales: por cada colección
+se guarda una marca de agua (el mayor `updatedAt` visto) y solo se piden a
+Firestore los documentos con valor >= a esa marca.
+
+Los borrados hechos en otro dispositivo no aparecen en ese pull; después de
+cada sync se compara el conteo remoto (agregación count()) con el local y,
+solo si el local es mayor, se piden los ids remotos y se borran los que ya no
+existen.
+"""
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+import pytz
+
+# colección -> campo usado como marca de agua
+KINDS = {
+    "notes": "updatedAt",
+    "diagnostics": "updatedAt",
+    "recommendations": "updatedAt",
+}
+
+DB_NAME = "mindful_mirror.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    uid TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id TEXT NOT NULL,
+    created REAL,
+    updated REAL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (uid, kind, id)
+);
+CREATE INDEX IF NOT EXISTS docs_created ON docs (uid, kind, created);
+CREATE INDEX IF NOT EXISTS docs_updated ON docs (uid, kind, updated);
+CREATE TABLE IF NOT EXISTS watermarks (
+    uid TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    ts REAL NOT NULL,
+    PRIMARY KEY (uid, kind)
+);
+"""
+
+
+# ---------- serialización ----------
+def _default(o):
+    if isinstance(o, datetime):
+        if o.tzinfo is None:
+            o = o.replace(tzinfo=pytz.utc)
+        return {"__dt__": o.timestamp()}
+    return str(o)
+
+
+def _hook(d):
+    if "__dt__" in d and len(d) == 1:
+        return datetime.fromtimestamp(d["__dt__"], tz=pytz.utc)
+    return d
+
+
+def _epoch(v):
+    if isinstance(v, datetime):
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=pytz.utc)
+        return v.timestamp()
+    return None
+
+
+def default_path() -> str:
+    # Flet empaquetado expone un directorio de datos propio de la app
+    base = os.getenv("FLET_APP_STORAGE_DATA") or os.path.join(os.path.expanduser("~"), ".mindful")
+    return os.path.join(base, DB_NAME)
+
+
+class LocalMirror:
+    def __init__(self, path: str | None = None):
+        self.path = path or default_path()
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ---------- escritura ----------
+    def put_many(self, uid: str, kind: str, docs: list[dict]):
+        rows = []
+        for d in docs:
+            if not d.get("id"):
+                continue
+            rows.append((
+                uid, kind, d["id"],
+                _epoch(d.get("createdAt")), _epoch(d.get("updatedAt")),
+                json.dumps(d, default=_default, ensure_ascii=False),
+            ))
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO docs (uid, kind, id, created, updated, data) VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def put(self, uid: str, kind: str, doc: dict):
+        self.put_many(uid, kind, [doc])
+
+    def delete(self, uid: str, kind: str, doc_id: str):
+        self.delete_many(uid, kind, [doc_id])
+
+    def delete_many(self, uid: str, kind: str, doc_ids):
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM docs WHERE uid=? AND kind=? AND id=?", [(uid, kind, i) for i in doc_ids]
+            )
+            self._conn.commit()
+
+    # ---------- marcas de agua ----------
+    def watermark(self, uid: str, kind: str) -> datetime | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ts FROM watermarks WHERE uid=? AND kind=?", (uid, kind)
+            ).fetchone()
+        return datetime.fromtimestamp(row[0], tz=pytz.utc) if row else None
+
+    def _set_watermark(self, uid: str, kind: str, ts: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO watermarks (uid, kind, ts) VALUES (?, ?, ?)", (uid, kind, ts)
+            )
+            self._conn.commit()
+
+    def sync(self, fb, uid: str, kind: str) -> int:
+        """
+        Trae de Firestore solo lo nuevo/cambiado desde la última marca de agua.
+        Devuelve cuántos documentos se actualizaron localmente (bloqueante).
+        """
+        field = KINDS[kind]
+        since = self.watermark(uid, kind)
+        docs = fb.list_changed_since(uid, kind, field, since)
+        changed = []
+        if docs:
+            # `>=` vuelve a traer los documentos que empatan con la marca; son idempotentes
+            known = since.timestamp() if since else None
+            changed = [d for d in docs if known is None or (_epoch(d.get(field)) or 0) > known or not self._has(uid, kind, d["id"])]
+            self.put_many(uid, kind, docs)
+
+            newest = max((_epoch(d.get(field)) or 0) for d in docs)
+            if newest:
+                self._set_watermark(uid, kind, newest)
+        return len(changed) + self.reconcile(fb, uid, kind)
+
+    def reconcile(self, fb, uid: str, kind: str) -> int:
+        """
+        Borra los documentos locales que ya no existen en Firestore. Tras el pull
+        el espejo contiene todo lo remoto, así que solo puede sobrar: si los
+        conteos coinciden no hace falta pedir ids. Devuelve cuántos se borraron.
+        """
+        local = self.count(uid, kind)
+        if not local or fb.count_docs(uid, kind) >= local:
+            return 0
+        remote = fb.list_ids(uid, kind)
+        with self._lock:
+            rows = self._conn.execute("SELECT id FROM docs WHERE uid=? AND kind=?", (uid, kind)).fetchall()
+        stale = [r[0] for r in rows if r[0] not in remote]
+        if stale:
+            self.delete_many(uid, kind, stale)
+            print(f"[MIRROR] {len(stale)} {kind} borrados en otro dispositivo")
+        return len(stale)
+
+    def count(self, uid: str, kind: str) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT COUNT(*) FROM docs WHERE uid=? AND kind=?", (uid, kind)).fetchone()
+        return row[0]
+
+    def _has(self, uid: str, kind: str, doc_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM docs WHERE uid=? AND kind=? AND id=?", (uid, kind, doc_id)
+            ).fetchone()
+        return row is not None
+
+    # ---------- lectura ----------
+    def query(self, uid: str, kind: str, field: str = "updatedAt", start=None, end=None,
+              limit: int | None = None, descending: bool = True) -> list[dict]:
+        """
+        Lista documentos locales filtrados por rango [start, end] sobre
+        `field` ("createdAt", "updatedAt" o "id" para recomendaciones por fecha).
+        """
+        col = {"createdAt": "created", "updatedAt": "updated", "id": "id"}[field]
+        sql = f"SELECT data FROM docs WHERE uid=? AND kind=?"
+        args: list = [uid, kind]
+        if start is not None:
+            sql += f" AND {col} >= ?"
+            args.append(_epoch(start) if isinstance(start, datetime) else start)
+        if end is not None:
+            sql += f" AND {col} <= ?"
+            args.append(_epoch(end) if isinstance(end, datetime) else end)
+        sql += f" ORDER BY {col} {'DESC' if descending else 'ASC'}"
+        if limit:
+            sql += " LIMIT ?"
+            args.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, args).fetchall()
+        return [json.loads(r[0], object_hook=_hook) for r in rows]
+
+    def get(self, uid: str, kind: str, doc_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM docs WHERE uid=? AND kind=? AND id=?", (uid, kind, doc_id)
+            ).fetchone()
+        return json.loads(row[0], object_hook=_hook) if row else None
+
+    def clear_user(self, uid: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM docs WHERE uid=?", (uid,))
+            self._conn.execute("DELETE FROM watermarks WHERE uid=?", (uid,))
+            self._conn.commit()
+
+
+_mirror: LocalMirror | None = None
+_mirror_lock = threading.Lock()
+
+
+def get_mirror(page) -> LocalMirror | None:
+    """Espejo compartido del proceso; None en web o si SQLite no está disponible."""
+    global _mirror
+    if getattr(page, "web", False):
+        return None
+    with _mirror_lock:
+        if _mirror is None:
+            try:
+                _mirror = LocalMirror()
+            except Exception as ex:
+                print("[MIRROR] No se pudo abrir el espejo local:", ex)
+                return None
+        return _mirror
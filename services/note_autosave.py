@@ -0,0 +1,164 @@
+# services/note_autosave.py
+"""
+Autoguardado de NoteEditorView.
+
+Cada ráfaga de teclas (con debounce) deja un borrador en `client_storage`, así
+un cierre, una navegación o una caída de red no pierden el texto. A Firestore
+se envía como mucho una escritura cada AUTOSAVE_INTERVAL_S (o al salir del
+campo), y solo con los campos que cambiaron desde la última escritura. Al
+reabrir la nota, el borrador pendiente se restaura.
+"""
+import asyncio
+import time
+
+import requests
+from google.api_core import exceptions as gexc
+
+from services import storage_codec
+from services import note_search
+from services import note_bodies
+from services import notes_cache
+
+DRAFT_DEBOUNCE_S = 0.8
+AUTOSAVE_INTERVAL_S = 10
+FIELDS = ("title", "content")
+
+# Fallas de red: HTTP directo (requests) o gRPC de Firestore (google.api_core)
+NETWORK_ERRORS = (
+    requests.exceptions.RequestException,
+    gexc.ServiceUnavailable,
+    gexc.DeadlineExceeded,
+    gexc.RetryError,
+)
+
+
+def draft_key(uid: str, note_id: str | None) -> str:
+    return f"draft:{uid}:{note_id or 'new'}"
+
+
+class NoteAutosave:
+    def __init__(self, page, fb, uid: str, note_id: str | None = None, interval: float = AUTOSAVE_INTERVAL_S):
+        self.page = page
+        self.fb = fb
+        self.uid = uid
+        self.note_id = note_id
+        self.interval = interval
+        self.baseline = {f: "" for f in FIELDS}   # lo que ya está en Firestore
+        self.current = dict(self.baseline)
+        self.last_flush = 0.0
+        self.enabled = True
+        self.offline = False  # el último intento falló por red
+        self.on_status = None  # callback(texto) para la UI
+        self._draft_token = 0
+        self._flush_scheduled = False
+        self._lock = asyncio.Lock()
+
+    # ---------- borrador local ----------
+    def load_draft(self) -> dict | None:
+        try:
+            raw = self.page.client_storage.get(draft_key(self.uid, self.note_id))
+        except Exception as ex:
+            print("[AUTOSAVE] No se pudo leer el borrador:", ex)
+            return None
+        draft = storage_codec.decode(raw)
+        return draft if isinstance(draft, dict) else None
+
+    def _write_draft(self):
+        try:
+            self.page.client_storage.set(
+                draft_key(self.uid, self.note_id),
+                storage_codec.encode({**self.current, "savedAt": time.time()}),
+            )
+        except Exception as ex:
+            print("[AUTOSAVE] No se pudo guardar el borrador:", ex)
+
+    def discard_draft(self, note_id: str | None = ...):
+        key = draft_key(self.uid, self.note_id if note_id is ... else note_id)
+        self._draft_token += 1  # cancela una escritura de borrador en espera
+        try:
+            if self.page.client_storage.contains_key(key):
+                self.page.client_storage.remove(key)
+        except Exception as ex:
+            print("[AUTOSAVE] No se pudo borrar el borrador:", ex)
+
+    # ---------- estado ----------
+    def set_baseline(self, fields: dict):
+        self.baseline = {f: fields.get(f) or "" for f in FIELDS}
+        self.current = dict(self.baseline)
+
+    def changed_fields(self) -> dict:
+        return {f: self.current[f] for f in FIELDS if self.current[f].strip() != self.baseline[f].strip()}
+
+    def touch(self, fields: dict):
+        """Registrar texto nuevo (en cada on_change)."""
+        if not self.enabled:
+            return
+        self.current.update({f: fields[f] or "" for f in FIELDS if f in fields})
+        self._draft_token += 1
+        self.page.run_task(self._debounced_draft, self._draft_token)
+        if not self._flush_scheduled:
+            if not self.last_flush:
+                # el intervalo empieza con la primera tecla, no al abrir el editor
+                self.last_flush = time.time()
+            self._flush_scheduled = True
+            self.page.run_task(self._scheduled_flush)
+
+    async def _debounced_draft(self, token: int):
+        await asyncio.sleep(DRAFT_DEBOUNCE_S)
+        if token == self._draft_token:
+            self._write_draft()
+
+    async def _scheduled_flush(self):
+        # tras un rato sin escribir, espera al menos el debounce para no subir una sola tecla
+        await asyncio.sleep(max(self.last_flush + self.interval - time.time(), DRAFT_DEBOUNCE_S))
+        self._flush_scheduled = False
+        await self.flush()
+
+    # ---------- escritura remota ----------
+    async def flush(self) -> bool:
+        """
+        Sube los campos cambiados. Devuelve True si Firestore quedó al día.
+        Los errores de red dejan el borrador local para el siguiente intento.
+        """
+        if not self.enabled:
+            return False
+        async with self._lock:
+            diff = self.changed_fields()
+            if not diff:
+                return True
+            snapshot = dict(self.current)
+            if not self.note_id and not (snapshot["title"].strip() or snapshot["content"].strip()):
+                return True
+            try:
+                if self.note_id:
+                    await asyncio.to_thread(self.fb.update_note_fields, self.uid, self.note_id, diff)
+                else:
+                    new_id = await asyncio.to_thread(self.fb.add_note, self.uid, snapshot["title"], snapshot["content"])
+                    # el borrador "nuevo" pasa a ser el de la nota creada
+                    self.discard_draft(None)
+                    self.note_id = new_id
+            except NETWORK_ERRORS as ex:
+                self.offline = True
+                print("[AUTOSAVE] Sin conexión, queda el borrador local:", ex)
+                self._status("Sin conexión · borrador guardado en el dispositivo")
+                return False
+            except Exception as ex:
+                print("[AUTOSAVE] Error al autoguardar:", ex)
+                self._status("No se pudo autoguardar")
+                return False
+
+            self.offline = False
+            self.baseline = snapshot
+            self.last_flush = time.time()
+            note_search.on_note_saved(self.uid, {"id": self.note_id, **snapshot})
+            note_bodies.invalidate(self.uid, self.note_id)
+            notes_cache.note_changed(self.page, self.uid, self.note_id)
+            print(f"[AUTOSAVE] Nota {self.note_id} sincronizada ({', '.join(diff)})")
+            if self.current == snapshot:
+                self.discard_draft()
+            self._status("Guardado automáticamente")
+            return True
+
+    def _status(self, text: str):
+        if self.on_status:
+            self.on_status(text)
@@ -0,0 +1,45 @@
+# services/note_bodies.py
+"""
+Caché pequeño de notas completas (con `content`).
+
+Las listas solo traen los campos de índice (título, vista previa, largo y
+fechas); el cuerpo se pide al abrir una nota. Aquí se guardan las últimas
+MAX_ENTRIES abiertas para no repetir la lectura al volver a ellas.
+"""
+import threading
+from collections import OrderedDict
+
+MAX_ENTRIES = 64
+
+_cache: "OrderedDict[tuple[str, str], dict]" = OrderedDict()
+_lock = threading.Lock()
+
+
+def put(uid: str, doc: dict):
+    if not doc or not doc.get("id") or "content" not in doc:
+        return
+    with _lock:
+        _cache[(uid, doc["id"])] = doc
+        _cache.move_to_end((uid, doc["id"]))
+        while len(_cache) > MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def invalidate(uid: str, note_id: str):
+    with _lock:
+        _cache.pop((uid, note_id), None)
+
+
+def get_note(fb, uid: str, note_id: str, mirror=None) -> dict | None:
+    """Nota completa: caché → espejo local → Firestore (bloqueante)."""
+    with _lock:
+        doc = _cache.get((uid, note_id))
+        if doc is not None:
+            _cache.move_to_end((uid, note_id))
+            return doc
+    if mirror is not None:
+        doc = mirror.get(uid, "notes", note_id)
+    if doc is None or "content" not in doc:
+        doc = fb.get_note(uid, note_id)
+    put(uid, doc)
+    return doc
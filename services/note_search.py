@@ -0,0 +1,270 @@
+# services/note_search.py
+"""
+Búsqueda de texto completo sobre las notas (título y contenido).
+
+Índice invertido por usuario con tokenización para español: minúsculas, sin
+acentos (á→a, ñ→n), sin palabras vacías y con un stemmer ligero de sufijos,
+así "trabajando", "trabajé" y "trabajo" caen en el mismo término. El término de
+la consulta se busca también como prefijo (lista ordenada + bisect), para que
+los resultados aparezcan mientras se escribe.
+
+El índice se actualiza por nota (add/update/delete) y vive solo en memoria:
+el texto de las notas no se escribe en el disco del servidor. El registro de
+índices es un LRU acotado (MAX_INDEXES usuarios) y los índices sin uso por más
+de IDLE_TTL_S se descartan; si se vuelve a buscar, se reconstruye.
+"""
+import bisect
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, defaultdict
+from datetime import datetime
+
+import pytz
+
+TITLE_WEIGHT = 3.0
+PREVIEW_CHARS = 160
+MIN_STEM = 3
+MAX_PREFIX_TERMS = 50  # términos distintos que puede expandir un prefijo
+MAX_INDEXES = int(os.getenv("MINDFUL_SEARCH_INDEXES", "32"))
+IDLE_TTL_S = 2 * 60 * 60
+
+STOPWORDS = frozenset("""
+a al algo algun alguna algunas alguno algunos ante antes aqui asi aun bajo bien cada casi como con contra cual
+cuales cuando de del desde donde dos el ella ellas ello ellos en entre era eran eres es esa esas ese eso esos esta
+estaba estaban estado estan estar estas este esto estos estoy fue fueron fui ha habia han hasta hay he la las le les
+lo los mas me mi mis mucho muy nada ni no nos nosotros o os otra otras otro otros para pero poco por porque que
+quien se ser si sido sin sobre solo son soy su sus tambien tan te tengo ti tiene tienen todo todos tu tus un una
+uno unos y ya yo
+""".split())
+
+# De más largo a más corto: gana el primer sufijo que deje un stem suficiente
+SUFFIXES = (
+    "amientos", "imientos", "aciones", "uciones", "amiento", "imiento", "idades", "mente",
+    "acion", "ucion", "idad", "ables", "ibles", "istas", "able", "ible", "ista",
+    "ando", "iendo", "osos", "osas", "ados", "idos", "adas", "idas",
+    "oso", "osa", "ado", "ido", "ada", "ida", "aba", "ia",
+    "ar", "er", "ir", "es", "os", "as", "e", "a", "o", "s",
+)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def fold(text: str) -> str:
+    """Minúsculas y sin diacríticos."""
+    nfkd = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(c for c in nfkd if not unicodedata.combining(c))
+
+
+def stem(word: str) -> str:
+    for suf in SUFFIXES:
+        if word.endswith(suf) and len(word) - len(suf) >= MIN_STEM:
+            return word[: -len(suf)]
+    return word
+
+
+def tokenize(text: str) -> list[str]:
+    return [stem(w) for w in _WORD_RE.findall(fold(text)) if w not in STOPWORDS and len(w) > 1]
+
+
+def _epoch(v) -> float:
+    if isinstance(v, datetime):
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=pytz.utc)
+        return v.timestamp()
+    if isinstance(v, (int, float)):
+        return float(v)
+    return time.time()
+
+
+class NoteSearchIndex:
+    def __init__(self, uid: str):
+        self.uid = uid
+        # id -> {"u": updatedAt, "c": createdAt, "t": título, "p": vista previa, "w": {término: peso}}
+        self.docs: dict[str, dict] = {}
+        self.postings: dict[str, dict[str, float]] = defaultdict(dict)
+        self.built = False
+        self._terms: list[str] = []
+        self._terms_dirty = False
+        self.lock = threading.RLock()
+        self.used_at = time.time()
+
+    # ---------- escritura ----------
+    def _add_postings(self, doc_id: str, weights: dict[str, float]):
+        for term, w in weights.items():
+            if term not in self.postings:
+                self._terms_dirty = True
+            self.postings[term][doc_id] = w
+
+    def _remove_postings(self, doc_id: str):
+        entry = self.docs.get(doc_id)
+        if not entry:
+            return
+        for term in entry["w"]:
+            plist = self.postings.get(term)
+            if plist is None:
+                continue
+            plist.pop(doc_id, None)
+            if not plist:
+                del self.postings[term]
+                self._terms_dirty = True
+
+    def index(self, doc: dict) -> bool:
+        """Indexa (o reindexa) una nota; se omite si no cambió desde la última vez."""
+        doc_id = doc.get("id")
+        if not doc_id or "content" not in doc:
+            # Doc proyectado (sin cuerpo): no hay texto que indexar
+            return False
+        updated = _epoch(doc.get("updatedAt"))
+        with self.lock:
+            old = self.docs.get(doc_id)
+            if old is not None and old["u"] >= updated:
+                return False
+            weights: dict[str, float] = defaultdict(float)
+            for t in tokenize(doc.get("title") or ""):
+                weights[t] += TITLE_WEIGHT
+            for t in tokenize(doc.get("content") or ""):
+                weights[t] += 1.0
+            self._remove_postings(doc_id)
+            content = (doc.get("content") or "").strip()
+            self.docs[doc_id] = {
+                "u": updated,
+                "c": _epoch(doc.get("createdAt")),
+                "t": (doc.get("title") or "")[:120],
+                "p": content[:PREVIEW_CHARS],
+                "w": dict(weights),
+            }
+            self._add_postings(doc_id, self.docs[doc_id]["w"])
+            return True
+
+    def remove(self, doc_id: str) -> bool:
+        with self.lock:
+            if doc_id not in self.docs:
+                return False
+            self._remove_postings(doc_id)
+            del self.docs[doc_id]
+            return True
+
+    def ingest(self, docs: list[dict]) -> int:
+        """Indexa un lote; devuelve cuántas notas cambiaron."""
+        with self.lock:
+            return sum(1 for d in docs if self.index(d))
+
+    # ---------- lectura ----------
+    def _sorted_terms(self) -> list[str]:
+        if self._terms_dirty or len(self._terms) != len(self.postings):
+            self._terms = sorted(self.postings)
+            self._terms_dirty = False
+        return self._terms
+
+    def _expand(self, token: str) -> list[tuple[str, float]]:
+        """Términos que coinciden con `token`: exacto (1.0) y por prefijo (0.6)."""
+        terms = self._sorted_terms()
+        out = []
+        i = bisect.bisect_left(terms, token)
+        while i < len(terms) and terms[i].startswith(token) and len(out) < MAX_PREFIX_TERMS:
+            out.append((terms[i], 1.0 if terms[i] == token else 0.6))
+            i += 1
+        return out
+
+    def search(self, query: str, limit: int = 50) -> list[dict]:
+        """
+        Notas que contienen todos los términos de la consulta (el último también
+        como prefijo), ordenadas por tf-idf. Cada resultado trae id, score,
+        title, preview, createdAt y updatedAt.
+        """
+        words = [w for w in _WORD_RE.findall(fold(query)) if w not in STOPWORDS]
+        if not words:
+            return []
+        with self.lock:
+            n_docs = len(self.docs) or 1
+            scores: dict[str, float] | None = None
+            for i, w in enumerate(words):
+                # las palabras completas se comparan por stem; la que se está escribiendo, por prefijo
+                token = stem(w) if i < len(words) - 1 else min(stem(w), w, key=len)
+                hits: dict[str, float] = defaultdict(float)
+                for term, boost in self._expand(token):
+                    plist = self.postings[term]
+                    idf = math.log(1 + n_docs / len(plist))
+                    for doc_id, tf in plist.items():
+                        hits[doc_id] += boost * idf * (1 + math.log(tf))
+                if scores is None:
+                    scores = hits
+                else:
+                    scores = {d: s + hits[d] for d, s in scores.items() if d in hits}
+                if not scores:
+                    return []
+
+            ranked = sorted(scores.items(), key=lambda kv: (-kv[1], -self.docs[kv[0]]["u"]))[:limit]
+            out = []
+            for doc_id, score in ranked:
+                e = self.docs[doc_id]
+                out.append({
+                    "id": doc_id,
+                    "score": score,
+                    "title": e["t"],
+                    "preview": e["p"],
+                    "createdAt": datetime.fromtimestamp(e["c"], tz=pytz.utc),
+                    "updatedAt": datetime.fromtimestamp(e["u"], tz=pytz.utc),
+                })
+            return out
+
+    # ---------- construcción ----------
+    def ensure_built(self, fb, mirror=None) -> int:
+        """Primera construcción completa (espejo local o Firestore por páginas); bloqueante."""
+        if self.built:
+            return 0
+        if mirror is not None:
+            changed = self.ingest(mirror.query(self.uid, "notes"))
+        else:
+            changed = 0
+            for doc in fb.iter_collection(self.uid, "notes", "createdAt"):
+                changed += int(self.index(doc))
+        self.built = True
+        return changed
+
+
+_indexes: "OrderedDict[str, NoteSearchIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _evict_locked(now: float):
+    for uid in [u for u, i in _indexes.items() if now - i.used_at > IDLE_TTL_S]:
+        del _indexes[uid]
+    while len(_indexes) > MAX_INDEXES:
+        _indexes.popitem(last=False)
+
+
+def get_search_index(uid: str) -> NoteSearchIndex:
+    now = time.time()
+    with _indexes_lock:
+        idx = _indexes.get(uid)
+        if idx is None:
+            idx = _indexes[uid] = NoteSearchIndex(uid)
+        else:
+            _indexes.move_to_end(uid)
+        idx.used_at = now
+        _evict_locked(now)
+        return idx
+
+
+def _peek(uid: str) -> NoteSearchIndex | None:
+    """Índice ya construido en memoria, sin crearlo ni renovar su uso."""
+    with _indexes_lock:
+        return _indexes.get(uid)
+
+
+def on_note_saved(uid: str, doc: dict):
+    """Llamar tras add_note/update_note (doc con id, title, content)."""
+    idx = _peek(uid)
+    if idx is not None:
+        idx.index({**doc, "updatedAt": doc.get("updatedAt") or time.time()})
+
+
+def on_note_deleted(uid: str, note_id: str):
+    idx = _peek(uid)
+    if idx is not None:
+        idx.remove(note_id)
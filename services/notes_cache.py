@@ -0,0 +1,116 @@
+# services/notes_cache.py
+"""
+Caché de resultados de NotesView por sesión, por intervalos de `updatedAt`.
+
+Cada consulta remota registra el intervalo que cubre (acotado por el `limit`
+si llegó completo) y sus documentos. Un filtro cuyo rango cae dentro de lo ya
+cubierto se responde en memoria, así que alternar "hoy / semana / mes / todas"
+solo lee de Firestore la primera vez.
+
+Invalidación: borrar una nota solo la quita; crear o editar mueve su
+`updatedAt` a "ahora", así que se descarta todo lo que cubre el presente.
+"""
+import time
+from datetime import datetime
+
+import pytz
+
+SESSION_KEY = "notes_range_cache"
+# Intervalos abiertos se guardan con estos extremos
+MIN_TS = float("-inf")
+MAX_TS = float("inf")
+
+
+def _epoch(v) -> float | None:
+    if isinstance(v, datetime):
+        if v.tzinfo is None:
+            v = v.replace(tzinfo=pytz.utc)
+        return v.timestamp()
+    return None
+
+
+class NotesRangeCache:
+    def __init__(self, uid: str):
+        self.uid = uid
+        self.docs: dict[str, dict] = {}
+        self.intervals: list[tuple[float, float]] = []  # disjuntos y ordenados
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- intervalos ----------
+    def _add_interval(self, lo: float, hi: float):
+        merged = []
+        for a, b in sorted(self.intervals + [(lo, hi)]):
+            if merged and a <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+            else:
+                merged.append((a, b))
+        self.intervals = merged
+
+    def covers(self, start=None, end=None) -> bool:
+        lo = _epoch(start) if start is not None else MIN_TS
+        hi = _epoch(end) if end is not None else MAX_TS
+        return any(a <= lo and hi <= b for a, b in self.intervals)
+
+    # ---------- lectura / escritura ----------
+    def get(self, start=None, end=None) -> list[dict] | None:
+        """Documentos del rango si está cubierto (más recientes primero); si no, None."""
+        if not self.covers(start, end):
+            self.misses += 1
+            return None
+        self.hits += 1
+        lo = _epoch(start) if start is not None else MIN_TS
+        hi = _epoch(end) if end is not None else MAX_TS
+        out = [d for d in self.docs.values() if lo <= (_epoch(d.get("updatedAt")) or 0) <= hi]
+        out.sort(key=lambda d: _epoch(d.get("updatedAt")) or 0, reverse=True)
+        return out
+
+    def put(self, docs: list[dict], start=None, end=None, limit: int | None = None):
+        """Registra el resultado de una consulta de [start, end] (más recientes primero)."""
+        lo = _epoch(start) if start is not None else MIN_TS
+        hi = _epoch(end) if end is not None else MAX_TS
+        if limit and len(docs) >= limit:
+            # Llegó truncada: solo se cubre desde la nota más vieja recibida
+            oldest = min((_epoch(d.get("updatedAt")) or 0) for d in docs)
+            lo = max(lo, oldest)
+        for d in docs:
+            if d.get("id"):
+                self.docs[d["id"]] = d
+        self._add_interval(lo, hi)
+
+    # ---------- invalidación ----------
+    def remove(self, note_id: str):
+        self.docs.pop(note_id, None)
+
+    def invalidate_recent(self, since: float | None = None):
+        """Deja de cubrir desde `since` (por defecto, ahora) hacia adelante."""
+        cut = since if since is not None else time.time()
+        self.intervals = [(a, min(b, cut)) for a, b in self.intervals if a < cut]
+
+    def stats(self) -> dict:
+        return {"docs": len(self.docs), "intervals": len(self.intervals), "hits": self.hits, "misses": self.misses}
+
+
+def get_cache(page, uid: str) -> NotesRangeCache:
+    """Caché de la sesión actual (se crea al primer uso o si cambió el usuario)."""
+    cache = page.session.get(SESSION_KEY)
+    if not isinstance(cache, NotesRangeCache) or cache.uid != uid:
+        cache = NotesRangeCache(uid)
+        page.session.set(SESSION_KEY, cache)
+    return cache
+
+
+def note_changed(page, uid: str, note_id: str | None = None):
+    """Llamar tras crear/editar una nota: su updatedAt ahora es "ahora"."""
+    cache = page.session.get(SESSION_KEY)
+    if isinstance(cache, NotesRangeCache) and cache.uid == uid:
+        if note_id:
+            cache.remove(note_id)
+        # un minuto de margen por la diferencia con el reloj del servidor
+        cache.invalidate_recent(time.time() - 60)
+
+
+def note_deleted(page, uid: str, note_id: str):
+    cache = page.session.get(SESSION_KEY)
+    if isinstance(cache, NotesRangeCache) and cache.uid == uid:
+        cache.remove(note_id)
@@ -0,0 +1,107 @@
+# services/offline_overlay.py
+"""
+Capa de "read-your-writes" sobre la cola offline.
+
+Mezcla las acciones pendientes de `offline_queue` con los resultados de las
+consultas de notas, diagnósticos y recomendaciones, para que lo guardado sin
+conexión aparezca en las listas antes de sincronizar. Cada elemento pendiente
+lleva PENDING_FLAG = True.
+"""
+from datetime import datetime
+
+import pytz
+
+from services import offline_queue
+
+PENDING_FLAG = "pendingSync"
+
+
+def _queued_at(action: dict) -> datetime:
+    try:
+        return datetime.fromtimestamp(float(action.get("queuedAt")), tz=pytz.utc)
+    except Exception:
+        return datetime.now(pytz.utc)
+
+
+def _as_doc(action: dict) -> dict:
+    typ = action.get("type")
+    payload = dict(action.get("payload") or {})
+    ts = _queued_at(action)
+
+    if typ == "note":
+        # mismo recorte que FirebaseService.add_note
+        payload["title"] = (payload.get("title") or "").strip()[:80] or "Sin título"
+        payload["content"] = (payload.get("content") or "").strip()[:4000]
+
+    payload.setdefault("createdAt", ts)
+    payload.setdefault("updatedAt", ts)
+    payload["id"] = f"pending-{action.get('id') or int(ts.timestamp() * 1000)}"
+    payload[PENDING_FLAG] = True
+    return payload
+
+
+def pending_docs(page, uid: str, typ: str, field: str | None = None, start=None, end=None) -> list[dict]:
+    """
+    Acciones pendientes del tipo `typ` para `uid`, con la forma de un documento.
+    Si se pasa `field`, filtra por el rango [start, end] sobre ese campo.
+    """
+    try:
+        actions = offline_queue.peek_all(page)
+    except Exception:
+        return []
+
+    out = []
+    for action in actions:
+        if action.get("type") != typ or action.get("uid") != uid:
+            continue
+        doc = _as_doc(action)
+        if field:
+            value = doc.get(field)
+            if start is not None and (value is None or value < start):
+                continue
+            if end is not None and (value is None or value > end):
+                continue
+        out.append(doc)
+    return out
+
+
+def is_pending(doc: dict) -> bool:
+    return bool((doc or {}).get(PENDING_FLAG))
+
+
+def merge(items: list[dict], pending: list[dict], order_by: str, descending: bool = True) -> list[dict]:
+    """
+    Une resultados del servidor con pendientes, ordenados por `order_by`.
+    Para recomendaciones (una por fecha) la pendiente reemplaza a la del servidor.
+    """
+    if not pending:
+        return list(items)
+
+    merged = list(items)
+    if order_by == "date":
+        pending_dates = {p.get("date") for p in pending}
+        merged = [d for d in merged if d.get("date") not in pending_dates]
+    merged.extend(pending)
+
+    def sort_key(d):
+        v = d.get(order_by)
+        if isinstance(v, datetime):
+            if v.tzinfo is None:
+                v = v.replace(tzinfo=pytz.utc)
+            return (1, v.timestamp())
+        return (0 if v is None else 1, str(v or ""))
+
+    merged.sort(key=sort_key, reverse=descending)
+    return merged
+
+
+def notes_with_pending(page, uid: str, notes: list[dict], start=None, end=None) -> list[dict]:
+    return merge(notes, pending_docs(page, uid, "note", "updatedAt", start, end), "updatedAt")
+
+
+def diagnostics_with_pending(page, uid: str, diags: list[dict], start=None, end=None) -> list[dict]:
+    return merge(diags, pending_docs(page, uid, "diagnostic", "createdAt", start, end), "createdAt")
+
+
+def recommendations_with_pending(page, uid: str, recs: list[dict]) -> list[dict]:
+    return merge(recs, pending_docs(page, uid, "recommendation"), "date")
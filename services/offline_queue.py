@@ -1,5 +1,8 @@
 # services/offline_queue.py
-import json
+import time
+import uuid
+
+from services import storage_codec
 
 QUEUE_KEY = "offline_action_queue"
 
@@ -11,27 +14,34 @@ def _get_storage(page):
 
 def _load_list(page):
     storage = _get_storage(page)
-    raw = storage.get(QUEUE_KEY) or "[]"
-    try:
-        return json.loads(raw)
-    except Exception:
+    raw = storage.get(QUEUE_KEY)
+    data = storage_codec.decode(raw, default=[])
+    if not isinstance(data, list):
         return []
+    if raw and storage_codec.is_legacy(raw):
+        # Migra la cola guardada como JSON plano al formato compacto
+        _save_list(page, data)
+    return data
 
 
 def _save_list(page, data):
     storage = _get_storage(page)
-    storage.set(QUEUE_KEY, json.dumps(data))
+    storage.set(QUEUE_KEY, storage_codec.encode(data))
 
 
 def queue_action(page, action: dict):
     """
     action debe tener al menos:
     {
-      "type": "note" | "diagnostic" | ...,
+      "type": "note" | "diagnostic" | "recommendation" | ...,
       "payload": {...},
       "uid": "user-id-opcional"
     }
+    Se le agregan "id" y "queuedAt" (epoch en segundos) si no los trae,
+    para poder mostrarla en las listas mientras está pendiente.
     """
+    action.setdefault("id", uuid.uuid4().hex)
+    action.setdefault("queuedAt", time.time())
     lst = _load_list(page)
     lst.append(action)
     _save_list(page, lst)
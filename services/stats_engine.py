@@ -0,0 +1,114 @@
+# services/stats_engine.py
+"""
+Motor de agregación de estadísticas con NumPy.
+
+Carga un lote de eventos (notas y diagnósticos) en arreglos: día (ordinal de
+fecha local), puntaje de ánimo y código de emoción. stats_index agrega el lote
+por día con pasadas vectorizadas (bincount) antes de sumarlo a sus buckets;
+StatsView solo pinta el resultado.
+"""
+from datetime import date
+
+import numpy as np
+
+# Orden importante: gana la primera llave contenida en el texto del ánimo
+EMOJI_MAP = [
+    ("feliz", "😊 Feliz"),
+    ("bien", "🙂 Bien"),
+    ("neutral", "😐 Neutral"),
+    ("triste", "😢 Triste"),
+    ("mal", "😞 Mal"),
+    ("ansioso", "😰 Ansioso"),
+    ("estresado", "😫 Estresado"),
+    ("enojado", "😡 Enojado"),
+    ("motivado", "💪 Motivado"),
+    ("calmado", "🕊️ Calmado"),
+    ("1", "😞 Muy mal"),
+    ("2", "😢 Triste"),
+    ("3", "😐 Neutral"),
+    ("4", "🙂 Bien"),
+    ("5", "😊 Feliz"),
+]
+
+
+def mood_score(mood) -> int:
+    """Convierte el ánimo guardado (texto o 1..5) a un puntaje 1..5."""
+    lm = str(mood if mood is not None else "").lower()
+    if "feliz" in lm:
+        return 5
+    if "bien" in lm:
+        return 4
+    if "neutral" in lm:
+        return 3
+    if "triste" in lm:
+        return 2
+    if "mal" in lm:
+        return 1
+    if lm.isdigit():
+        return int(lm)
+    return 3
+
+
+def emotion_label(mood) -> str:
+    key = str(mood).lower().strip()
+    return next((v for k, v in EMOJI_MAP if k in key), str(mood).capitalize())
+
+
+class StatsEngine:
+    def __init__(self, tz):
+        self.tz = tz
+        self.note_day = np.empty(0, dtype=np.int64)
+        self.diag_day = np.empty(0, dtype=np.int64)
+        self.diag_score = np.empty(0, dtype=np.float64)
+        self.diag_emotion = np.empty(0, dtype=np.int32)
+        self.emotion_labels: list[str] = []
+        self._emotion_codes: dict[str, int] = {}
+
+    # ---------- ingesta ----------
+    def _day(self, ts) -> int:
+        return ts.astimezone(self.tz).date().toordinal()
+
+    def _emotion_code(self, mood) -> int:
+        # la búsqueda en EMOJI_MAP se hace una vez por valor distinto, no por evento
+        raw = str(mood)
+        code = self._emotion_codes.get(raw)
+        if code is None:
+            label = emotion_label(raw)
+            if label in self.emotion_labels:
+                code = self.emotion_labels.index(label)
+            else:
+                code = len(self.emotion_labels)
+                self.emotion_labels.append(label)
+            self._emotion_codes[raw] = code
+        return code
+
+    def load(self, notes: list[dict], diagnostics: list[dict]):
+        """Reemplaza los datos con las listas de documentos (cada uno con createdAt)."""
+        self.note_day = np.fromiter(
+            (self._day(d["createdAt"]) for d in notes if d.get("createdAt")), dtype=np.int64
+        )
+        days, scores, emos = [], [], []
+        for d in diagnostics:
+            if not d.get("createdAt"):
+                continue
+            mood = d.get("mood", "")
+            days.append(self._day(d["createdAt"]))
+            scores.append(mood_score(mood))
+            emos.append(self._emotion_code(mood) if str(mood) else -1)
+        self.diag_day = np.asarray(days, dtype=np.int64)
+        self.diag_score = np.asarray(scores, dtype=np.float64)
+        self.diag_emotion = np.asarray(emos, dtype=np.int32)
+        return self
+
+    # ---------- series diarias ----------
+    @staticmethod
+    def _span(start: date, end: date) -> tuple[int, int]:
+        s = start.toordinal()
+        return s, end.toordinal() - s + 1
+
+    def daily_counts(self, start: date, end: date) -> np.ndarray:
+        """Notas por día en [start, end]."""
+        s, n = self._span(start, end)
+        idx = self.note_day - s
+        idx = idx[(idx >= 0) & (idx < n)]
+        return np.bincount(idx, minlength=n).astype(np.int64)
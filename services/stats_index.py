@@ -0,0 +1,284 @@
+# services/stats_index.py
+"""
+Índice jerárquico de series de tiempo para estadísticas: día → semana → mes.
+
+Por cada bucket guarda agregados compactos (notas, suma/conteo de ánimo y
+conteo por emoción), no documentos. Un rango arbitrario se descompone en meses
+completos, luego semanas completas (lunes a domingo) y días sueltos en los
+bordes, así que un año cuesta ~12 + 8 + 12 lecturas de buckets en lugar de
+miles de documentos. Los lotes de documentos se agregan por día con
+StatsEngine (vectorizado) antes de sumarse al índice. Lo borrado en otro
+dispositivo se resta con `reconcile` contra el conjunto completo de ids de un
+rango recién leído.
+
+Los índices viven en un LRU acotado (MAX_INDEXES usuarios, IDLE_TTL_S sin uso).
+"""
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytz
+
+from services.stats_engine import StatsEngine, emotion_label, mood_score
+
+# Campos que necesita el índice; las lecturas hacia atrás solo piden estos
+INDEX_FIELDS = {"notes": ["createdAt"], "diagnostics": ["createdAt", "mood"]}
+
+MAX_INDEXES = int(os.getenv("MINDFUL_STATS_INDEXES", "64"))
+IDLE_TTL_S = 2 * 60 * 60
+
+
+@dataclass
+class Bucket:
+    notes: int = 0
+    mood_sum: float = 0.0
+    mood_n: int = 0
+    emotions: Counter = field(default_factory=Counter)
+
+    def add(self, other: "Bucket", sign: int = 1):
+        self.notes += sign * other.notes
+        self.mood_sum += sign * other.mood_sum
+        self.mood_n += sign * other.mood_n
+        for k, v in other.emotions.items():
+            self.emotions[k] += sign * v
+            if self.emotions[k] <= 0:
+                del self.emotions[k]
+
+    @property
+    def mood(self) -> float | None:
+        return self.mood_sum / self.mood_n if self.mood_n else None
+
+
+def week_start(d: date) -> date:
+    return d - timedelta(days=d.weekday())
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def next_month(d: date) -> date:
+    return (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class StatsIndex:
+    def __init__(self, tz):
+        self.tz = tz
+        self.days: dict[date, Bucket] = {}
+        self.weeks: dict[date, Bucket] = {}
+        self.months: dict[date, Bucket] = {}
+        # id -> (colección, día, puntaje, emoción) para poder restar al borrar
+        self._seen: dict[str, tuple] = {}
+        self.covered_from: date | None = None
+        self.used_at = time.time()
+        self.lock = threading.RLock()
+
+    # ---------- escritura ----------
+    def _apply(self, day: date, delta: Bucket, sign: int = 1):
+        for table, key in ((self.days, day), (self.weeks, week_start(day)), (self.months, month_start(day))):
+            b = table.get(key)
+            if b is None:
+                b = table[key] = Bucket()
+            b.add(delta, sign)
+
+    def _entry(self, collection: str, d: dict) -> tuple:
+        """(colección, día, puntaje, emoción) de un documento, tal como se guarda en `_seen`."""
+        if collection == "notes":
+            return ("notes", self._day(d["createdAt"]), None, None)
+        mood = d.get("mood", "")
+        return ("diagnostics", self._day(d["createdAt"]), mood_score(mood), emotion_label(mood) if str(mood) else None)
+
+    def _changed(self, collection: str, docs: list[dict]) -> list[dict]:
+        """Docs nuevos o editados (otro día/ánimo); los editados se restan antes de volver a entrar."""
+        prefix = "n:" if collection == "notes" else "d:"
+        out = []
+        for d in docs:
+            if not d.get("createdAt"):
+                continue
+            seen = self._seen.get(prefix + str(d.get("id")))
+            if seen is not None:
+                if seen == self._entry(collection, d):
+                    continue
+                self.forget(collection, d.get("id"))
+            out.append(d)
+        return out
+
+    def ingest(self, notes: list[dict], diagnostics: list[dict]) -> int:
+        """
+        Agrega documentos nuevos; los ya vistos se ignoran salvo que hayan
+        cambiado de día o de ánimo (se restan y se vuelven a sumar).
+        Devuelve cuántos entraron.
+        """
+        with self.lock:
+            new_notes = self._changed("notes", notes)
+            new_diags = self._changed("diagnostics", diagnostics)
+            if not new_notes and not new_diags:
+                return 0
+
+            engine = StatsEngine(self.tz).load(new_notes, new_diags)
+            days = np.concatenate([engine.note_day, engine.diag_day])
+            lo, hi = date.fromordinal(int(days.min())), date.fromordinal(int(days.max()))
+            counts = engine.daily_counts(lo, hi)
+            s, n = lo.toordinal(), hi.toordinal() - lo.toordinal() + 1
+            idx = engine.diag_day - s
+            mood_sum = np.bincount(idx, weights=engine.diag_score, minlength=n)
+            mood_n = np.bincount(idx, minlength=n)
+
+            emos: dict[int, Counter] = {}
+            for day_i, code in zip(idx.tolist(), engine.diag_emotion.tolist()):
+                if code >= 0:
+                    emos.setdefault(day_i, Counter())[engine.emotion_labels[code]] += 1
+
+            for i in np.flatnonzero((counts > 0) | (mood_n > 0)).tolist():
+                self._apply(date.fromordinal(s + i), Bucket(
+                    notes=int(counts[i]), mood_sum=float(mood_sum[i]), mood_n=int(mood_n[i]),
+                    emotions=emos.get(i, Counter()),
+                ))
+
+            for d in new_notes:
+                self._seen[f"n:{d.get('id')}"] = self._entry("notes", d)
+            for d in new_diags:
+                self._seen[f"d:{d.get('id')}"] = self._entry("diagnostics", d)
+            return len(new_notes) + len(new_diags)
+
+    def forget(self, collection: str, doc_id: str):
+        """Resta un documento borrado de sus buckets."""
+        key = f"{'n' if collection == 'notes' else 'd'}:{doc_id}"
+        with self.lock:
+            entry = self._seen.pop(key, None)
+            if entry is None:
+                return
+            _, day, score, emo = entry
+            if collection == "notes":
+                delta = Bucket(notes=1)
+            else:
+                delta = Bucket(mood_sum=float(score), mood_n=1, emotions=Counter({emo: 1} if emo else {}))
+            self._apply(day, delta, sign=-1)
+
+    def reconcile(self, collection: str, ids, start: date, end: date) -> int:
+        """
+        Resta lo que el índice tiene en [start, end] para `collection` y ya no
+        viene en `ids` (el conjunto completo de ese rango): borrados remotos.
+        """
+        prefix = "n:" if collection == "notes" else "d:"
+        ids = set(ids)
+        with self.lock:
+            gone = [
+                key[2:] for key, entry in self._seen.items()
+                if key.startswith(prefix) and start <= entry[1] <= end and key[2:] not in ids
+            ]
+            for doc_id in gone:
+                self.forget(collection, doc_id)
+        return len(gone)
+
+    def mark_covered(self, start: date):
+        with self.lock:
+            if self.covered_from is None or start < self.covered_from:
+                self.covered_from = start
+
+    def _day(self, ts) -> date:
+        if isinstance(ts, datetime) and ts.tzinfo is None:
+            ts = ts.replace(tzinfo=pytz.utc)
+        return ts.astimezone(self.tz).date()
+
+    # ---------- lectura ----------
+    def _decompose(self, start: date, end: date):
+        """Recorre [start, end] con los buckets más gruesos que caben completos."""
+        cur = start
+        while cur <= end:
+            if cur.day == 1 and next_month(cur) - timedelta(days=1) <= end:
+                yield self.months.get(cur)
+                cur = next_month(cur)
+            elif cur.weekday() == 0 and cur + timedelta(days=6) <= end:
+                yield self.weeks.get(cur)
+                cur += timedelta(days=7)
+            else:
+                yield self.days.get(cur)
+                cur += timedelta(days=1)
+
+    def totals(self, start: date, end: date) -> Bucket:
+        out = Bucket()
+        with self.lock:
+            for b in self._decompose(start, end):
+                if b is not None:
+                    out.add(b)
+        return out
+
+    def series(self, start: date, end: date, granularity: str) -> list[tuple[date, date, Bucket]]:
+        """Serie por "day", "week" o "month"; los buckets de los bordes se recortan al rango."""
+        out = []
+        cur = start
+        while cur <= end:
+            if granularity == "month":
+                stop = min(next_month(cur) - timedelta(days=1), end)
+            elif granularity == "week":
+                stop = min(week_start(cur) + timedelta(days=6), end)
+            else:
+                stop = cur
+            out.append((cur, stop, self.totals(cur, stop)))
+            cur = stop + timedelta(days=1)
+        return out
+
+    def day_cells(self, start: date, end: date) -> dict[date, tuple[int, float | None]]:
+        """{día: (notas, ánimo promedio)} solo para los días con actividad en [start, end]."""
+        with self.lock:
+            return {
+                d: (b.notes, b.mood)
+                for d, b in self.days.items()
+                if start <= d <= end and (b.notes or b.mood_n)
+            }
+
+
+def streaks(active_days, today: date) -> tuple[int, int]:
+    """
+    (racha actual, racha más larga) de días consecutivos con actividad.
+    La actual sigue viva si el último día activo es hoy o ayer.
+    """
+    days = sorted(set(active_days))
+    longest = run = 0
+    prev = None
+    for d in days:
+        run = run + 1 if prev is not None and d - prev == timedelta(days=1) else 1
+        longest = max(longest, run)
+        prev = d
+    current = run if prev is not None and (today - prev).days <= 1 else 0
+    return current, longest
+
+
+def auto_granularity(start: date, end: date) -> str:
+    span = (end - start).days + 1
+    if span <= 14:
+        return "day"
+    if span <= 92:
+        return "week"
+    return "month"
+
+
+_indexes: "OrderedDict[str, StatsIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(uid: str, tz) -> StatsIndex:
+    now = time.time()
+    with _indexes_lock:
+        idx = _indexes.get(uid)
+        if idx is None or idx.tz.zone != getattr(tz, "zone", None):
+            idx = _indexes[uid] = StatsIndex(tz)
+        _indexes.move_to_end(uid)
+        idx.used_at = now
+        for u in [u for u, i in _indexes.items() if now - i.used_at > IDLE_TTL_S]:
+            del _indexes[u]
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+        return idx
+
+
+def forget(uid: str, collection: str, doc_id: str):
+    with _indexes_lock:
+        idx = _indexes.get(uid)
+    if idx is not None:
+        idx.forget(collection, doc_id)
@@ -0,0 +1,133 @@
+# services/stats_window.py
+"""
+Ventana de estadísticas en memoria, compartida por proceso y por usuario.
+
+Guarda los documentos de los últimos N días (notas y diagnósticos), solo con
+los campos del índice (stats_index.INDEX_FIELDS + updatedAt, sin cuerpos), y
+el mayor `updatedAt` visto por colección. Las siguientes cargas de /stats solo
+piden a Firestore lo creado o editado desde esa marca y descartan lo que salió
+de la ventana. Cada MAX_AGE_S se recarga completa para reconciliar borrados
+hechos en otro dispositivo; los borrados locales se aplican con `forget`.
+
+El registro de ventanas es un LRU acotado (MAX_WINDOWS usuarios) y las
+ventanas sin uso por más de IDLE_TTL_S se descartan.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import pytz
+
+from services.stats_index import INDEX_FIELDS
+
+WINDOW_DAYS = 60
+MAX_AGE_S = 30 * 60
+COLLECTIONS = ("notes", "diagnostics")
+WINDOW_FIELDS = {c: INDEX_FIELDS[c] + ["updatedAt"] for c in COLLECTIONS}
+MAX_WINDOWS = int(os.getenv("MINDFUL_STATS_WINDOWS", "64"))
+IDLE_TTL_S = 2 * 60 * 60
+
+
+def _utc(ts):
+    if isinstance(ts, datetime) and ts.tzinfo is None:
+        return ts.replace(tzinfo=pytz.utc)
+    return ts
+
+
+class StatsWindow:
+    def __init__(self, uid: str, days: int = WINDOW_DAYS):
+        self.uid = uid
+        self.days = days
+        self.docs: dict[str, dict[str, dict]] = {c: {} for c in COLLECTIONS}
+        self.watermarks: dict[str, datetime | None] = {c: None for c in COLLECTIONS}
+        self.loaded_at = 0.0
+        self.used_at = time.time()
+        self.lock = threading.Lock()
+
+    def _limit(self, now: datetime) -> datetime:
+        return (now - timedelta(days=self.days)).astimezone(pytz.utc)
+
+    def refresh(self, fb, now: datetime) -> dict[str, int]:
+        """
+        Trae lo nuevo o editado desde la última marca (o la ventana completa
+        si no hay datos o caducó) y desaloja lo viejo. Devuelve cuántos docs llegaron.
+        """
+        limit = self._limit(now)
+        with self.lock:
+            full = time.time() - self.loaded_at > MAX_AGE_S
+            if full:
+                self.docs = {c: {} for c in COLLECTIONS}
+                self.watermarks = {c: None for c in COLLECTIONS}
+
+            fetched = {}
+            for col in COLLECTIONS:
+                if self.watermarks[col] is None:
+                    # carga completa de la ventana por createdAt (incluye docs sin updatedAt)
+                    new_docs = fb.list_created_between(self.uid, col, limit, None, WINDOW_FIELDS[col])
+                    self.watermarks[col] = limit
+                else:
+                    new_docs = fb.list_changed_since(
+                        self.uid, col, "updatedAt", self.watermarks[col], WINDOW_FIELDS[col]
+                    )
+                bucket = self.docs[col]
+                for d in new_docs:
+                    if d.get("createdAt"):
+                        bucket[d["id"]] = d
+                fetched[col] = len(new_docs)
+
+                # desalojo de lo que ya salió de la ventana
+                for doc_id in [k for k, d in bucket.items() if _utc(d["createdAt"]) < limit]:
+                    del bucket[doc_id]
+
+                newest = max((_utc(d["updatedAt"]) for d in new_docs if d.get("updatedAt")), default=None)
+                if newest and newest > self.watermarks[col]:
+                    self.watermarks[col] = newest
+
+            if full:
+                self.loaded_at = time.time()
+            return fetched
+
+    def items(self, collection: str, since: datetime | None = None) -> list[dict]:
+        with self.lock:
+            docs = list(self.docs[collection].values())
+        if since is not None:
+            docs = [d for d in docs if _utc(d["createdAt"]) >= since]
+        return docs
+
+    def forget(self, collection: str, doc_id: str):
+        with self.lock:
+            self.docs.get(collection, {}).pop(doc_id, None)
+
+
+_windows: "OrderedDict[str, StatsWindow]" = OrderedDict()
+_windows_lock = threading.Lock()
+
+
+def _evict_locked(now: float):
+    for uid in [u for u, w in _windows.items() if now - w.used_at > IDLE_TTL_S]:
+        del _windows[uid]
+    while len(_windows) > MAX_WINDOWS:
+        _windows.popitem(last=False)
+
+
+def get_window(uid: str) -> StatsWindow:
+    now = time.time()
+    with _windows_lock:
+        w = _windows.get(uid)
+        if w is None:
+            w = _windows[uid] = StatsWindow(uid)
+        else:
+            _windows.move_to_end(uid)
+        w.used_at = now
+        _evict_locked(now)
+        return w
+
+
+def forget(uid: str, collection: str, doc_id: str):
+    """Quita un documento borrado localmente de la ventana (si existe)."""
+    with _windows_lock:
+        w = _windows.get(uid)
+    if w is not None:
+        w.forget(collection, doc_id)
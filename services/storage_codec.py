@@ -0,0 +1,93 @@
+# services/storage_codec.py
+"""
+Codificación compacta para lo que guardamos en `page.client_storage`.
+
+En web client_storage es localStorage (~5 MB y solo texto). Los valores
+pequeños (cola offline, borradores, sesión) se guardan como JSON compacto: el
+base64 de msgpack ocupa más que el JSON al que reemplaza. A partir de
+COMPRESS_THRESHOLD caracteres se prueban también msgpack y msgpack+zlib (en
+base64 con un prefijo de versión) y se guarda la forma más corta.
+`decode` sigue aceptando las entradas antiguas (JSON con espacios o ya como
+dict/list), así que la migración ocurre sola en la siguiente escritura.
+"""
+import base64
+import json
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # sin msgpack: JSON compacto como formato binario
+    msgpack = None
+
+COMPRESS_THRESHOLD = 512  # bytes
+ZLIB_LEVEL = 6
+
+PREFIX_PACKED = "m1:"
+PREFIX_ZLIB = "z1:"
+PREFIX_JSON_ZLIB = "zj1:"
+
+
+def _pack(obj) -> bytes:
+    if msgpack is not None:
+        return msgpack.packb(obj, use_bin_type=True)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _unpack(data: bytes, packed: bool):
+    if packed:
+        return msgpack.unpackb(data, raw=False)
+    return json.loads(data.decode("utf-8"))
+
+
+def _b64(prefix: str, raw: bytes) -> str:
+    return prefix + base64.b64encode(raw).decode("ascii")
+
+
+def encode(obj) -> str:
+    """Serializa `obj` a texto compacto apto para client_storage (la forma más corta)."""
+    text = json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+    if len(text) <= COMPRESS_THRESHOLD:
+        return text
+    candidates = [text]
+    if msgpack is not None:
+        raw = _pack(obj)
+        candidates.append(_b64(PREFIX_PACKED, raw))
+        candidates.append(_b64(PREFIX_ZLIB, zlib.compress(raw, ZLIB_LEVEL)))
+    else:
+        candidates.append(_b64(PREFIX_JSON_ZLIB, zlib.compress(text.encode("utf-8"), ZLIB_LEVEL)))
+    return min(candidates, key=len)
+
+
+def decode(value, default=None):
+    """
+    Inverso de `encode`. Acepta también JSON plano (formato anterior) y
+    valores que ya vengan deserializados. Si no se puede leer devuelve `default`.
+    """
+    if value is None or value == "":
+        return default
+    if not isinstance(value, str):
+        return value
+    try:
+        if value.startswith(PREFIX_ZLIB):
+            return _unpack(zlib.decompress(base64.b64decode(value[len(PREFIX_ZLIB):])), True)
+        if value.startswith(PREFIX_JSON_ZLIB):
+            return _unpack(zlib.decompress(base64.b64decode(value[len(PREFIX_JSON_ZLIB):])), False)
+        if value.startswith(PREFIX_PACKED):
+            return _unpack(base64.b64decode(value[len(PREFIX_PACKED):]), True)
+        return json.loads(value)
+    except Exception:
+        return default
+
+
+def is_legacy(value) -> bool:
+    """True si el valor guardado no es lo que `encode` escribiría hoy (hay que reescribirlo)."""
+    if value is None or value == "":
+        return False
+    if not isinstance(value, str):
+        return True
+    if value.startswith((PREFIX_PACKED, PREFIX_ZLIB, PREFIX_JSON_ZLIB)):
+        return False
+    try:
+        return encode(json.loads(value)) != value
+    except ValueError:
+        return False
@@ -2,6 +2,8 @@
 import asyncio
 from services.firebase_service import FirebaseService
 from services import offline_queue
+from services import note_search
+from services import notes_cache
 
 
 async def sync_offline_actions(page):
@@ -24,17 +26,28 @@ async def sync_offline_actions(page):
         try:
             # --- NOTAS OFFLINE ---
             if typ == "note":
-                fb.add_note(
+                note_id = fb.add_note(
                     uid,
                     payload.get("title", ""),
                     payload.get("content", ""),
                 )
+                note_search.on_note_saved(uid, {"id": note_id, **payload})
+                notes_cache.note_changed(page, uid, note_id)
 
             # --- DIAGNÓSTICOS OFFLINE ---
             elif typ == "diagnostic":
                 # Aquí el payload es el mismo que guardamos en diagnostic_page
                 fb.add_diagnostic(uid, payload)
 
+            # --- RECOMENDACIONES OFFLINE ---
+            elif typ == "recommendation":
+                fb.upsert_recommendation_for_date(
+                    uid,
+                    payload.get("date"),
+                    payload.get("text", ""),
+                    payload.get("meta"),
+                )
+
             # Aquí podrías agregar más tipos:
             # elif typ == "otra_cosa":
             #     fb.algo(uid, **payload)
@@ -0,0 +1,30 @@
+import os
+import time
+
+from services.chart_render import ChartRenderCache, chart_key
+
+
+def test_chart_key_depends_on_content_only():
+    a = chart_key({"lun": 1, "mar": 2}, "Notas", "bar", "desktop", "#fff")
+    assert a == chart_key({"lun": 1, "mar": 2}, "Notas", "bar", "desktop", "#fff")
+    assert a != chart_key({"lun": 1, "mar": 3}, "Notas", "bar", "desktop", "#fff")
+    assert a != chart_key({"lun": 1, "mar": 2}, "Notas", "bar", "mobile", "#fff")
+
+
+def test_memory_lru_spills_to_disk_and_reads_back(tmp_path):
+    cache = ChartRenderCache(max_bytes=20, disk_dir=str(tmp_path))
+    for i in range(4):
+        cache.put(f"k{i}", str(i) * 10)
+    assert cache.get("k0") == "0" * 10
+    assert cache.stats()["disk_hits"] == 1
+    assert not [n for n in os.listdir(tmp_path) if n.endswith(".tmp")]
+
+
+def test_disk_spill_is_capped(tmp_path):
+    cache = ChartRenderCache(max_bytes=10, disk_dir=str(tmp_path), disk_max_bytes=25)
+    for i in range(8):
+        cache.put(f"k{i}", "x" * 8)
+        time.sleep(0.01)
+    sizes = [os.path.getsize(os.path.join(tmp_path, n)) for n in os.listdir(tmp_path)]
+    assert sum(sizes) <= 25
+    assert "k6.b64" in os.listdir(tmp_path)  # lo más reciente sobrevive
@@ -0,0 +1,84 @@
+import random
+
+from services.directory_engine import DirectoryEngine
+from services.geo_index import Centroids
+
+CENTROIDS = {
+    "Jalisco": {"*": [20.5, -103.5], "Guadalajara": [20.67, -103.35], "Zapopan": [20.72, -103.39]},
+    "Nuevo Leon": {"*": [25.6, -99.9], "Monterrey": [25.67, -100.31]},
+}
+
+
+def engine(cards):
+    e = DirectoryEngine()
+    e.centroids = Centroids(CENTROIDS)
+    e.load(cards.items())
+    return e
+
+
+def card(name, specialty="Psicología", state="Jalisco", municipality="Guadalajara", level="Licenciatura"):
+    return {"fullName": name, "sortName": name.lower(), "specialty": specialty,
+            "state": state, "municipality": municipality, "level": level}
+
+
+def test_mask_and_facet_counts_follow_upserts_and_removals():
+    e = engine({
+        "a": card("Ana"),
+        "b": card("Beto", specialty="Psiquiatría"),
+        "c": card("Caro", municipality="Zapopan"),
+        "d": card("Dani", state="Nuevo Leon", municipality="Monterrey"),
+    })
+    assert e.ready.is_set()
+    assert e.count(state="Jalisco") == 3
+    assert e.count(state="Jalisco", specialty="Psicología") == 2
+    assert e.facet_counts("municipality", state="Jalisco") == {"Guadalajara": 2, "Zapopan": 1}
+    # facet_counts ignora el filtro de la propia faceta
+    assert e.facet_counts("specialty", specialty="Psiquiatría") == {"Psicología": 3, "Psiquiatría": 1}
+
+    e.upsert("b", card("Beto", specialty="Psicología", municipality="Zapopan"))
+    e.remove("a")
+    e.remove("missing")
+    assert e.facet_counts("municipality", state="Jalisco") == {"Zapopan": 2}
+    assert "Psiquiatría" not in e.facets["specialty"]
+    assert e.count() == 3
+
+    e.upsert("e", card("Eva"))
+    assert e.slots["e"] == 0 and len(e.cards) == 4  # reutiliza el slot libre de "a"
+
+
+def test_query_pages_in_sort_order_across_blocks():
+    rng = random.Random(3)
+    names = [f"n{i:04d}" for i in range(300)]
+    rng.shuffle(names)
+    cards = {f"u{i}": card(n, level="Maestría" if i % 2 else "Licenciatura") for i, n in enumerate(names)}
+    e = engine(cards)
+    for uid in list(cards)[:40]:
+        e.remove(uid)
+    want = sorted(c["sortName"] for uid, c in cards.items()
+                  if uid in e.slots and c["level"] == "Maestría")
+
+    got, offset = [], 0
+    while offset is not None:
+        page, offset = e.query(level="Maestría", offset=offset, limit=25)
+        got.extend(c["sortName"] for c in page)
+    assert got == want
+    assert e.query(level="Doctorado") == ([], None)
+
+
+def test_nearest_reports_km_only_between_exact_centroids():
+    e = engine({
+        "a": card("Ana"),
+        "b": card("Beto", municipality="Zapopan"),
+        "c": card("Caro", municipality="Tlaquepaque"),  # sin centroide propio
+        "d": card("Dani", state="Nuevo Leon", municipality="Monterrey"),
+    })
+    near = e.nearest("Jalisco", "Guadalajara", limit=3, exclude=1 << e.slots["a"])
+    assert [c["uid"] for c in near] == ["b", "c", "d"]
+    assert near[0]["distanceKm"] < 10
+    assert "distanceKm" not in near[1] and near[1]["sameState"] is True
+
+    # origen sin centroide propio: nadie lleva km
+    near = e.nearest("Jalisco", "Tlaquepaque", limit=4)
+    assert all("distanceKm" not in c for c in near)
+    assert {c["uid"]: c["sameState"] for c in near}["d"] is False
+    assert e.nearest("Atlantis") == []
@@ -0,0 +1,54 @@
+from services.directory_engine import DirectoryEngine
+from services.directory_search import TrigramIndex, trigrams
+from services.geo_index import Centroids
+
+
+def engine(cards):
+    e = DirectoryEngine()
+    e.centroids = Centroids()
+    e.load(cards.items())
+    return e
+
+
+def card(name, specialty="Psicología", purpose=""):
+    return {"fullName": name, "sortName": name.lower(), "specialty": specialty, "purpose": purpose}
+
+
+def test_trigrams_fold_pad_and_leave_partial_tail_open():
+    assert trigrams("Ána") == {" an", "ana", "na "}
+    assert trigrams("ana ro", partial_tail=True) == {" an", "ana", "na ", " ro"}
+    assert trigrams("a") == {" a "}
+    assert trigrams("a", partial_tail=True) == set()
+
+
+def test_search_ranks_name_over_purpose_and_respects_mask():
+    e = engine({
+        "a": card("Mariana López"),
+        "b": card("Pedro Ruiz", purpose="Acompaño a Mariana y a su familia"),
+        "c": card("Mario Díaz", specialty="Psiquiatría"),
+        "d": card("Luisa Gómez"),
+    })
+    hits = e.search("marian")
+    # nombre completo (3.0) > 3 de 5 trigramas del nombre (1.8) > propósito completo (1.0)
+    assert [h["uid"] for h in hits] == ["a", "c", "b"]
+    assert [h["score"] for h in hits] == sorted((h["score"] for h in hits), reverse=True)
+    assert [h["uid"] for h in e.search("marian", specialty="Psiquiatría")] == ["c"]
+
+
+def test_search_matches_specialty_and_typos():
+    e = engine({
+        "a": card("Ana", specialty="Psiquiatría"),
+        "b": card("Beto"),
+    })
+    assert [h["uid"] for h in e.search("psiquiatria")] == ["a"]
+    assert [h["uid"] for h in e.search("betto")] == ["b"]
+
+
+def test_remove_clears_postings():
+    idx = TrigramIndex()
+    c = card("Ana", purpose="duelo")
+    idx.add(0, c)
+    idx.add(1, card("Ana"))
+    idx.remove(0, c)
+    assert idx.name[" an"] == 0b10
+    assert idx.purpose == {}
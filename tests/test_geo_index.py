@@ -0,0 +1,66 @@
+import json
+import os
+import random
+
+from services.geo_index import Centroids, GridIndex, haversine_km
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+TABLE = {
+    "Nuevo León": {"*": [25.6, -99.9], "Monterrey": [25.67, -100.31], "San Pedro Garza García": [25.66, -100.4]},
+    "Oaxaca": {"*": [17.0, -96.5]},
+}
+
+
+def test_locate_and_is_exact_fold_names_and_fall_back_to_state():
+    c = Centroids(TABLE)
+    assert c.locate("nuevo leon", "MONTERREY") == (25.67, -100.31)
+    assert c.is_exact("Nuevo Leon", "san pedro garza garcia")
+    assert c.locate("Oaxaca", "Juchitán") == (17.0, -96.5)
+    assert not c.is_exact("Oaxaca", "Juchitán")
+    assert not c.is_exact("Oaxaca", None)
+    assert c.locate("Atlantis", "x") is None
+
+
+def test_haversine_known_distance():
+    # Monterrey - Ciudad de México, ~705 km en línea recta
+    assert 690 < haversine_km((25.67, -100.31), (19.43, -99.13)) < 720
+    assert haversine_km((19.4, -99.1), (19.4, -99.1)) == 0
+
+
+def test_nearest_matches_brute_force_and_respects_mask():
+    rng = random.Random(7)
+    grid = GridIndex()
+    points = {s: (rng.uniform(15, 32), rng.uniform(-117, -87)) for s in range(200)}
+    for s, p in points.items():
+        grid.add(s, p)
+    grid.remove(5)
+    del points[5]
+    mask = sum(1 << s for s in points if s % 3)
+    origin = (20.67, -103.35)
+    got = grid.nearest(origin, mask, k=10)
+    slots = [s for _, m in got for s in range(m.bit_length()) if m >> s & 1]
+    want = sorted((s for s in points if s % 3), key=lambda s: haversine_km(origin, points[s]))[:10]
+    assert slots == want
+    assert [d for d, _ in got] == sorted(d for d, _ in got)
+
+
+def test_nearest_groups_slots_sharing_a_centroid():
+    grid = GridIndex()
+    for s in (0, 1, 2):
+        grid.add(s, (25.67, -100.31))
+    grid.add(3, (19.43, -99.13))
+    grid.add(4, None)
+    got = grid.nearest((25.6, -100.3), 0b11111, k=2)
+    assert [m for _, m in got] == [0b111]
+
+
+def test_bundled_table_is_keyed_by_estados_names():
+    with open(os.path.join(ROOT, "estados.json"), encoding="utf-8") as f:
+        estados = json.load(f)
+    with open(os.path.join(ROOT, "centroides.json"), encoding="utf-8") as f:
+        table = json.load(f)
+    assert set(table) == set(estados)
+    for state, rows in table.items():
+        assert "*" in rows and set(rows) - {"*"} <= set(estados[state])
+        assert all(14 < lat < 33 and -118 < lon < -86 for lat, lon in rows.values())
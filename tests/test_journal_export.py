@@ -0,0 +1,59 @@
+import json
+import os
+import zipfile
+from datetime import datetime
+
+import pytz
+
+from services import journal_export
+
+
+class FakeFirestore:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def iter_collection(self, uid, collection, order_field="createdAt", page_size=500):
+        yield from self.docs.get(collection, [])
+
+
+FB = FakeFirestore({
+    "notes": [{"id": "n1", "title": "Hoy", "content": "Bien, gracias",
+               "createdAt": datetime(2025, 1, 1, tzinfo=pytz.utc)}],
+    "diagnostics": [{"id": "d1", "mood": "feliz", "score": 5}],
+})
+
+
+def test_ndjson_export_goes_to_a_temp_file():
+    path, counts = journal_export.export_to_tempfile(FB, "u", "ndjson")
+    try:
+        with open(path, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+    finally:
+        journal_export.discard(path)
+    assert counts == {"notes": 1, "diagnostics": 1, "recommendations": 0}
+    assert rows[0]["collection"] == "notes" and rows[0]["createdAt"].startswith("2025-01-01")
+    assert not os.path.exists(path)
+
+
+def test_zip_export_has_one_csv_per_collection():
+    path, _ = journal_export.export_to_tempfile(FB, "u", "zip")
+    try:
+        with zipfile.ZipFile(path) as z:
+            names = z.namelist()
+    finally:
+        journal_export.discard(path)
+    assert len(names) == 3 and all(n.endswith(".csv") for n in names)
+
+
+def test_publish_download_uses_configured_assets_and_sweeps_expired(tmp_path):
+    old = tmp_path / "downloads" / "viejo"
+    old.mkdir(parents=True)
+    os.utime(old, (0, 0))
+    journal_export.set_assets_dir(str(tmp_path))
+    assert not old.exists()
+
+    path, _ = journal_export.export_to_tempfile(FB, "u", "csv")
+    url = journal_export.publish_download(path, "diario.csv")
+    assert url.startswith("/downloads/") and url.endswith("/diario.csv")
+    assert (tmp_path / url.lstrip("/")).is_file()
+    assert not os.path.exists(path)
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from services.local_mirror import LocalMirror
+
+T0 = datetime(2025, 3, 1, 12, tzinfo=pytz.utc)
+
+
+class FakeFirestore:
+    """users/{uid}/{collection} en memoria con la interfaz que usa LocalMirror."""
+
+    def __init__(self):
+        self.docs = {}  # (uid, collection) -> {id: doc}
+        self.id_lists = 0
+
+    def put(self, uid, collection, doc_id, **fields):
+        self.docs.setdefault((uid, collection), {})[doc_id] = {**fields, "id": doc_id}
+
+    def list_changed_since(self, uid, collection, field, since=None, fields=None):
+        rows = self.docs.get((uid, collection), {}).values()
+        if since is not None:
+            rows = [d for d in rows if d.get(field) and d[field] >= since]
+        return sorted((dict(d) for d in rows), key=lambda d: d.get(field) or T0)
+
+    def count_docs(self, uid, collection):
+        return len(self.docs.get((uid, collection), {}))
+
+    def list_ids(self, uid, collection):
+        self.id_lists += 1
+        return set(self.docs.get((uid, collection), {}))
+
+
+def test_sync_pulls_only_changes_after_watermark():
+    fb, mirror = FakeFirestore(), LocalMirror(":memory:")
+    fb.put("u", "notes", "a", title="uno", createdAt=T0, updatedAt=T0)
+    fb.put("u", "notes", "b", title="dos", createdAt=T0, updatedAt=T0 + timedelta(minutes=1))
+    assert mirror.sync(fb, "u", "notes") == 2
+    assert mirror.sync(fb, "u", "notes") == 0
+
+    fb.put("u", "notes", "a", title="uno editada", createdAt=T0, updatedAt=T0 + timedelta(minutes=5))
+    assert mirror.sync(fb, "u", "notes") == 1
+    assert mirror.get("u", "notes", "a")["title"] == "uno editada"
+    assert mirror.get("u", "notes", "a")["updatedAt"] == T0 + timedelta(minutes=5)
+
+
+def test_sync_removes_docs_deleted_on_another_device():
+    fb, mirror = FakeFirestore(), LocalMirror(":memory:")
+    for i in range(3):
+        fb.put("u", "notes", f"n{i}", createdAt=T0, updatedAt=T0 + timedelta(seconds=i))
+    mirror.sync(fb, "u", "notes")
+    assert fb.id_lists == 0  # conteos iguales: no se piden ids
+
+    del fb.docs[("u", "notes")]["n1"]
+    assert mirror.sync(fb, "u", "notes") == 1
+    assert [d["id"] for d in mirror.query("u", "notes")] == ["n2", "n0"]
+    assert fb.id_lists == 1
+
+
+def test_edited_diagnostic_is_pulled_again():
+    fb, mirror = FakeFirestore(), LocalMirror(":memory:")
+    fb.put("u", "diagnostics", "d", mood="triste", createdAt=T0, updatedAt=T0)
+    mirror.sync(fb, "u", "diagnostics")
+    fb.put("u", "diagnostics", "d", mood="feliz", createdAt=T0, updatedAt=T0 + timedelta(hours=1))
+    assert mirror.sync(fb, "u", "diagnostics") == 1
+    assert mirror.get("u", "diagnostics", "d")["mood"] == "feliz"
+
+
+def test_query_filters_by_created_range_per_user():
+    fb, mirror = FakeFirestore(), LocalMirror(":memory:")
+    for day in range(5):
+        ts = T0 + timedelta(days=day)
+        fb.put("u", "notes", f"d{day}", createdAt=ts, updatedAt=ts)
+    fb.put("otro", "notes", "x", createdAt=T0, updatedAt=T0)
+    mirror.sync(fb, "u", "notes")
+    mirror.sync(fb, "otro", "notes")
+    docs = mirror.query("u", "notes", "createdAt", T0 + timedelta(days=1), T0 + timedelta(days=3), descending=False)
+    assert [d["id"] for d in docs] == ["d1", "d2", "d3"]
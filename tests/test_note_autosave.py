@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+requests = pytest.importorskip("requests")
+pytest.importorskip("google.api_core")
+
+from services import note_autosave  # noqa: E402
+from services.note_autosave import NoteAutosave, draft_key  # noqa: E402
+
+
+class FakeStorage(dict):
+    def set(self, key, value):
+        self[key] = value
+
+    def contains_key(self, key):
+        return key in self
+
+    def remove(self, key):
+        del self[key]
+
+
+class FakePage:
+    def __init__(self):
+        self.client_storage = FakeStorage()
+        self.tasks = []
+
+    def run_task(self, fn, *args):
+        coro = fn(*args)
+        self.tasks.append(fn.__name__)
+        coro.close()  # las esperas con sleep no se ejecutan aquí
+
+
+class FakeFirebase:
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.calls = []
+
+    def update_note_fields(self, uid, note_id, fields):
+        if self.fail:
+            raise self.fail
+        self.calls.append(("update", note_id, fields))
+
+    def add_note(self, uid, title, content):
+        if self.fail:
+            raise self.fail
+        self.calls.append(("add", title, content))
+        return "n-new"
+
+
+@pytest.fixture(autouse=True)
+def hooks(monkeypatch):
+    seen = []
+    monkeypatch.setattr(note_autosave.note_search, "on_note_saved", lambda uid, doc: seen.append(("search", doc["id"])))
+    monkeypatch.setattr(note_autosave.note_bodies, "invalidate", lambda uid, nid: seen.append(("bodies", nid)))
+    monkeypatch.setattr(note_autosave.notes_cache, "note_changed", lambda page, uid, nid: seen.append(("cache", nid)))
+    return seen
+
+
+def test_flush_sends_only_changed_fields_and_clears_draft(hooks):
+    page, fb = FakePage(), FakeFirebase()
+    saver = NoteAutosave(page, fb, "u", "n1")
+    saver.set_baseline({"title": "Hoy", "content": "Texto"})
+    saver.touch({"content": "Texto nuevo"})
+    saver._write_draft()
+    assert saver.load_draft()["content"] == "Texto nuevo"
+
+    assert asyncio.run(saver.flush()) is True
+    assert fb.calls == [("update", "n1", {"content": "Texto nuevo"})]
+    assert saver.changed_fields() == {}
+    assert draft_key("u", "n1") not in page.client_storage
+    assert hooks == [("search", "n1"), ("bodies", "n1"), ("cache", "n1")]
+    assert asyncio.run(saver.flush()) is True and len(fb.calls) == 1
+
+
+def test_first_flush_of_new_note_creates_it_and_moves_the_draft():
+    page, fb = FakePage(), FakeFirebase()
+    saver = NoteAutosave(page, fb, "u")
+    assert asyncio.run(saver.flush()) is True and fb.calls == []  # nota vacía: nada que crear
+    saver.touch({"title": "Idea", "content": ""})
+    saver._write_draft()
+    assert asyncio.run(saver.flush()) is True
+    assert fb.calls == [("add", "Idea", "")]
+    assert saver.note_id == "n-new"
+    assert draft_key("u", None) not in page.client_storage
+
+
+def test_network_error_keeps_local_draft():
+    page, fb = FakePage(), FakeFirebase(fail=requests.exceptions.ConnectionError("sin red"))
+    saver = NoteAutosave(page, fb, "u", "n1")
+    statuses = []
+    saver.on_status = statuses.append
+    saver.touch({"title": "Hoy"})
+    saver._write_draft()
+    assert asyncio.run(saver.flush()) is False
+    assert saver.offline
+    assert saver.changed_fields() == {"title": "Hoy"}
+    assert draft_key("u", "n1") in page.client_storage
+    assert statuses and "Sin conexión" in statuses[-1]
+
+
+def test_touch_starts_interval_on_first_key_and_schedules_one_flush():
+    page = FakePage()
+    saver = NoteAutosave(page, FakeFirebase(), "u", "n1")
+    assert saver.last_flush == 0.0
+    saver.touch({"content": "a"})
+    first = saver.last_flush
+    saver.touch({"content": "ab"})
+    assert first > 0 and saver.last_flush == first
+    assert page.tasks.count("_scheduled_flush") == 1
+    assert page.tasks.count("_debounced_draft") == 2
+    saver.enabled = False
+    saver.touch({"content": "abc"})
+    assert saver.current["content"] == "ab"
@@ -0,0 +1,53 @@
+from services import note_search
+from services.note_search import NoteSearchIndex, fold, stem, tokenize
+
+
+def note(doc_id, title, content, updated=1.0):
+    return {"id": doc_id, "title": title, "content": content, "updatedAt": updated, "createdAt": updated}
+
+
+def test_fold_stem_and_stopwords():
+    assert fold("Ánimo ÑANDÚ") == "animo nandu"
+    assert stem("trabajando") == stem("trabajo") == "trabaj"
+    assert tokenize("Hoy me sentí muy cansada en el trabajo") == ["hoy", "senti", "cans", "trabaj"]
+
+
+def test_search_matches_stems_and_prefix_of_last_word():
+    idx = NoteSearchIndex("u")
+    idx.ingest([
+        note("a", "Trabajo", "Mucho estrés en la oficina"),
+        note("b", "Paseo", "Caminamos por el parque después de trabajar"),
+        note("c", "Familia", "Comida con mamá"),
+    ])
+    assert [h["id"] for h in idx.search("trabajando")] == ["a", "b"]  # el título pesa más
+    assert [h["id"] for h in idx.search("ofi")] == ["a"]
+    assert [h["id"] for h in idx.search("parque trab")] == ["b"]
+    assert idx.search("vacaciones") == []
+
+
+def test_reindex_and_remove():
+    idx = NoteSearchIndex("u")
+    idx.index(note("a", "Viaje", "playa", updated=1))
+    assert not idx.index(note("a", "Viaje", "playa", updated=1))  # sin cambios
+    idx.index(note("a", "Viaje", "montaña", updated=2))
+    assert idx.search("playa") == []
+    assert [h["id"] for h in idx.search("montana")] == ["a"]
+    assert idx.remove("a") and idx.search("montana") == []
+
+
+def test_projected_docs_are_skipped_without_invalidating():
+    idx = NoteSearchIndex("u")
+    idx.built = True
+    assert not idx.index({"id": "x", "title": "Solo título", "updatedAt": 5})
+    assert idx.built and "x" not in idx.docs
+
+
+def test_registry_is_bounded(monkeypatch):
+    monkeypatch.setattr(note_search, "MAX_INDEXES", 2)
+    monkeypatch.setattr(note_search, "_indexes", type(note_search._indexes)())
+    for uid in ("a", "b", "c"):
+        note_search.get_search_index(uid)
+    assert list(note_search._indexes) == ["b", "c"]
+    # guardar una nota de un usuario sin índice en memoria no crea uno
+    note_search.on_note_saved("a", {"id": "n", "title": "t", "content": "c"})
+    assert "a" not in note_search._indexes
@@ -0,0 +1,38 @@
+from datetime import date, datetime
+
+import pytz
+
+from services.stats_engine import StatsEngine, emotion_label, mood_score
+
+TZ = pytz.timezone("America/Mexico_City")
+
+
+def at(y, m, d, h=12):
+    return TZ.localize(datetime(y, m, d, h)).astimezone(pytz.utc)
+
+
+def test_mood_score_and_label():
+    assert mood_score("Feliz") == 5
+    assert mood_score("muy mal") == 1
+    assert mood_score(4) == 4
+    assert mood_score(None) == 3
+    assert emotion_label("estoy ansioso") == "😰 Ansioso"
+    assert emotion_label("nostalgia") == "Nostalgia"
+
+
+def test_load_uses_local_day_and_skips_docs_without_date():
+    engine = StatsEngine(TZ).load(
+        [{"createdAt": at(2025, 1, 1, 23)}, {"createdAt": at(2025, 1, 2, 1)}, {"title": "sin fecha"}],
+        [{"createdAt": at(2025, 1, 2), "mood": "feliz"}, {"createdAt": at(2025, 1, 2), "mood": "Feliz!"}],
+    )
+    # las 23:00 locales del 1 de enero ya son 2 de enero en UTC, pero cuentan el 1
+    assert engine.daily_counts(date(2025, 1, 1), date(2025, 1, 3)).tolist() == [1, 1, 0]
+    assert engine.diag_score.tolist() == [5.0, 5.0]
+    # dos textos distintos con la misma etiqueta comparten código
+    assert engine.diag_emotion.tolist() == [0, 0]
+    assert engine.emotion_labels == ["😊 Feliz"]
+
+
+def test_daily_counts_ignores_days_outside_range():
+    engine = StatsEngine(TZ).load([{"createdAt": at(2025, 1, d)} for d in (1, 5, 5, 9)], [])
+    assert engine.daily_counts(date(2025, 1, 4), date(2025, 1, 6)).tolist() == [0, 2, 0]
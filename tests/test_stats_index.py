@@ -0,0 +1,74 @@
+from datetime import date, datetime, timedelta
+
+import pytz
+
+from services import stats_index
+from services.stats_index import StatsIndex, auto_granularity, streaks
+
+TZ = pytz.timezone("America/Mexico_City")
+
+
+def at(d: date, h: int = 12):
+    return TZ.localize(datetime(d.year, d.month, d.day, h)).astimezone(pytz.utc)
+
+
+def build(days):
+    idx = StatsIndex(TZ)
+    idx.ingest([{"id": f"n{i}", "createdAt": at(d)} for i, d in enumerate(days)], [])
+    return idx
+
+
+def test_totals_match_per_day_sum_across_month_week_and_day_buckets():
+    start = date(2025, 1, 1)
+    days = [start + timedelta(days=i) for i in range(0, 120, 3)]
+    idx = build(days)
+    for lo, hi in [(date(2025, 1, 1), date(2025, 3, 31)), (date(2025, 1, 15), date(2025, 2, 20)),
+                   (date(2025, 2, 3), date(2025, 2, 9)), (date(2025, 3, 30), date(2025, 4, 2))]:
+        assert idx.totals(lo, hi).notes == sum(1 for d in days if lo <= d <= hi)
+
+
+def test_series_clips_edge_buckets_to_range():
+    idx = build([date(2025, 1, 30), date(2025, 2, 1), date(2025, 2, 28)])
+    series = idx.series(date(2025, 1, 30), date(2025, 2, 28), "month")
+    assert [(s, e, b.notes) for s, e, b in series] == [
+        (date(2025, 1, 30), date(2025, 1, 31), 1),
+        (date(2025, 2, 1), date(2025, 2, 28), 2),
+    ]
+
+
+def test_reconcile_subtracts_remote_deletes_in_range_only():
+    days = [date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 10)]
+    idx = build(days)
+    assert idx.reconcile("notes", ["n0"], date(2025, 1, 1), date(2025, 1, 5)) == 1
+    assert idx.totals(date(2025, 1, 1), date(2025, 1, 31)).notes == 2
+    assert 2 not in [d.day for d, (n, _) in idx.day_cells(date(2025, 1, 1), date(2025, 1, 31)).items()]
+
+
+def test_mood_average_and_emotions():
+    idx = StatsIndex(TZ)
+    d = date(2025, 6, 2)
+    idx.ingest([], [{"id": "a", "createdAt": at(d), "mood": "feliz"},
+                    {"id": "b", "createdAt": at(d), "mood": "triste"}])
+    total = idx.totals(d, d)
+    assert total.mood == 3.5
+    assert total.emotions.most_common(1)[0][1] == 1
+    idx.forget("diagnostics", "b")
+    assert idx.totals(d, d).mood == 5.0
+
+
+def test_streaks_and_granularity():
+    today = date(2025, 3, 10)
+    active = [today - timedelta(days=i) for i in (1, 2, 3, 7, 8)]
+    assert streaks(active, today) == (3, 3)
+    assert streaks([today - timedelta(days=5)], today) == (0, 1)
+    assert auto_granularity(today, today + timedelta(days=6)) == "day"
+    assert auto_granularity(today, today + timedelta(days=60)) == "week"
+    assert auto_granularity(today, today + timedelta(days=200)) == "month"
+
+
+def test_get_index_is_bounded(monkeypatch):
+    monkeypatch.setattr(stats_index, "MAX_INDEXES", 2)
+    monkeypatch.setattr(stats_index, "_indexes", type(stats_index._indexes)())
+    for uid in ("a", "b", "c"):
+        stats_index.get_index(uid, TZ)
+    assert list(stats_index._indexes) == ["b", "c"]
@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+import pytz
+
+from services.stats_index import StatsIndex
+from services.stats_window import StatsWindow
+
+NOW = datetime(2025, 5, 10, 12, tzinfo=pytz.utc)
+TZ = pytz.timezone("America/Mexico_City")
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.docs = {"notes": {}, "diagnostics": {}}
+        self.calls = []
+
+    def put(self, col, doc_id, **fields):
+        self.docs[col][doc_id] = {**fields, "id": doc_id, "content": "cuerpo largo"}
+
+    def _project(self, d, fields):
+        return {k: v for k, v in d.items() if k in fields or k == "id"}
+
+    def list_created_between(self, uid, col, start, end=None, fields=None):
+        self.calls.append(("created", col))
+        return [self._project(d, fields) for d in self.docs[col].values() if d["createdAt"] >= start]
+
+    def list_changed_since(self, uid, col, field, since=None, fields=None):
+        self.calls.append(("changed", col, field))
+        return [self._project(d, fields) for d in self.docs[col].values() if d.get(field) and d[field] >= since]
+
+
+def test_window_keeps_index_fields_only_and_pulls_edits():
+    fb, window = FakeFirestore(), StatsWindow("u", days=30)
+    fb.put("diagnostics", "d1", mood="triste", createdAt=NOW - timedelta(days=2), updatedAt=NOW - timedelta(days=2))
+    fb.put("diagnostics", "old", mood="feliz", createdAt=NOW - timedelta(days=90), updatedAt=NOW)
+    window.refresh(fb, NOW)
+    assert [d["id"] for d in window.items("diagnostics")] == ["d1"]
+    assert "content" not in window.items("diagnostics")[0]
+
+    fb.put("diagnostics", "d1", mood="feliz", createdAt=NOW - timedelta(days=2), updatedAt=NOW + timedelta(minutes=1))
+    # llegan d1 (editado) y "old" (editado, pero creado fuera de la ventana)
+    assert window.refresh(fb, NOW + timedelta(minutes=2))["diagnostics"] == 2
+    assert window.items("diagnostics")[0]["mood"] == "feliz"
+    assert ("changed", "diagnostics", "updatedAt") in fb.calls
+    # lo editado fuera de la ventana no se queda
+    assert [d["id"] for d in window.items("diagnostics")] == ["d1"]
+
+
+def test_index_applies_an_edited_mood_once():
+    idx = StatsIndex(TZ)
+    day = (NOW - timedelta(days=1)).astimezone(TZ).date()
+    doc = {"id": "d1", "mood": "triste", "createdAt": NOW - timedelta(days=1)}
+    assert idx.ingest([], [doc]) == 1
+    assert idx.ingest([], [doc]) == 0
+    assert idx.ingest([], [{**doc, "mood": "feliz"}]) == 1
+    total = idx.totals(day, day)
+    assert (total.mood_n, total.mood) == (1, 5.0)
+    assert dict(total.emotions) == {"😊 Feliz": 1}
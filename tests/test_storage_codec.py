@@ -0,0 +1,45 @@
+import json
+
+from services import storage_codec
+
+QUEUE = [{
+    "type": "note",
+    "uid": "Xb3kQ9pLmN2rT7vW1yZ4aC6eG8iK0o",
+    "payload": {"title": "Día difícil", "content": "Hoy me sentí cansado después del trabajo, pero la caminata ayudó."},
+    "queuedAt": 1735689600.123,
+}]
+DRAFT = {"title": "Idea", "content": "Llamar a mamá", "savedAt": 1735689600.5}
+
+
+def test_small_values_stay_json_and_never_grow():
+    for obj in (QUEUE, DRAFT):
+        legacy = json.dumps(obj)
+        encoded = storage_codec.encode(obj)
+        assert len(encoded) <= len(legacy)
+        assert json.loads(encoded) == obj
+        assert storage_codec.decode(encoded) == obj
+
+
+def test_large_values_use_the_shortest_form():
+    notes = [{**QUEUE[0], "payload": {**QUEUE[0]["payload"], "content": "repetido " * 40}} for _ in range(20)]
+    encoded = storage_codec.encode(notes)
+    plain = json.dumps(notes, ensure_ascii=False, separators=(",", ":"))
+    assert len(encoded) < len(plain)
+    assert encoded.startswith((storage_codec.PREFIX_ZLIB, storage_codec.PREFIX_JSON_ZLIB))
+    assert storage_codec.decode(encoded) == notes
+
+
+def test_decode_accepts_legacy_and_bad_values():
+    legacy = json.dumps(DRAFT)
+    assert storage_codec.decode(legacy) == DRAFT
+    assert storage_codec.decode(DRAFT) == DRAFT
+    assert storage_codec.decode("m1:%%%", default=[]) == []
+    assert storage_codec.decode(None, default={}) == {}
+
+
+def test_is_legacy_only_when_rewrite_changes_the_value():
+    assert storage_codec.is_legacy(json.dumps(DRAFT))       # con espacios
+    assert storage_codec.is_legacy(DRAFT)                   # dict sin serializar
+    assert not storage_codec.is_legacy(storage_codec.encode(DRAFT))
+    assert not storage_codec.is_legacy(storage_codec.encode([QUEUE[0]] * 30))
+    assert not storage_codec.is_legacy(None)
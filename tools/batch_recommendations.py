@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Generate the daily recommendation for every active user ahead of time.
+Usage:
+  python tools/batch_recommendations.py                      # today (America/Mexico_City)
+  python tools/batch_recommendations.py --date 2025-05-01 --workers 4 --rate 30
+  python tools/batch_recommendations.py --resume             # continue from the checkpoint
+This script:
+- enumerates users and reads each user's notes/diagnostics for the day with bounded concurrency
+- calls GeminiService from a worker pool under one global requests-per-minute limit
+- upserts users/{uid}/recommendations/{date} (skips users that already have one unless --overwrite)
+- writes a resumable checkpoint every few users and prints throughput metrics
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+
+import pytz
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from google.cloud.firestore_v1 import base_query as bq  # noqa: E402
+from firebase_admin import firestore  # noqa: E402
+
+from services.firebase_service import FirebaseService  # noqa: E402
+from services.gemini_service import GeminiService  # noqa: E402
+
+DEFAULT_TZ = 'America/Mexico_City'
+CHUNK = 200             # users gathered per round (keeps pending futures bounded)
+CHECKPOINT_EVERY = 20   # completed users between checkpoint writes
+MAX_RETRIES = 3
+SOURCE = 'gemini-2.0-flash'
+
+
+class RateLimiter:
+    """Token bucket shared by every worker thread (global requests/minute)."""
+
+    def __init__(self, per_minute):
+        self.capacity = max(1.0, per_minute / 6.0)  # allow ~10s worth of burst
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.counts = {'scanned': 0, 'active': 0, 'generated': 0, 'exists': 0, 'inactive': 0, 'failed': 0, 'reads': 0}
+        self.latencies = deque(maxlen=500)
+
+    def inc(self, key, n=1):
+        with self.lock:
+            self.counts[key] += n
+
+    def latency(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def summary(self):
+        with self.lock:
+            elapsed = max(1e-6, time.time() - self.started)
+            lat = sorted(self.latencies)
+            p50 = lat[len(lat) // 2] if lat else 0.0
+            p95 = lat[int(len(lat) * 0.95) - 1] if lat else 0.0
+            c = dict(self.counts)
+        return ('scanned={scanned} active={active} generated={generated} exists={exists} '
+                'inactive={inactive} failed={failed} | {rate:.1f} recs/min, {rps:.1f} reads/s, '
+                'gemini p50={p50:.2f}s p95={p95:.2f}s, {elapsed:.0f}s elapsed').format(
+                    rate=c['generated'] / elapsed * 60, rps=c['reads'] / elapsed,
+                    p50=p50, p95=p95, elapsed=elapsed, **c)
+
+
+class Checkpoint:
+    def __init__(self, path, date_key):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {'date': date_key, 'done': {}, 'failed': {}}
+        self._since_save = 0
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('date') != self.data['date']:
+            raise SystemExit('Checkpoint {} is for {}, not {}'.format(self.path, data.get('date'), self.data['date']))
+        self.data = data
+        # failed users get another try on resume
+        self.data['failed'] = {}
+
+    def is_done(self, uid):
+        return uid in self.data['done']
+
+    def mark(self, uid, status, error=None):
+        with self.lock:
+            if error is None:
+                self.data['done'][uid] = status
+                self.data['failed'].pop(uid, None)
+            else:
+                self.data['failed'][uid] = error
+            self._since_save += 1
+            if self._since_save >= CHECKPOINT_EVERY:
+                self._save_locked()
+
+    def save(self):
+        with self.lock:
+            self._save_locked()
+
+    def _save_locked(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+        self._since_save = 0
+
+
+def day_bounds(date_key, tz):
+    d = datetime.strptime(date_key, '%Y-%m-%d')
+    start = tz.localize(datetime(d.year, d.month, d.day))
+    return start.astimezone(pytz.utc), (start + timedelta(days=1)).astimezone(pytz.utc)
+
+
+def iter_users(fb):
+    for d in fb.db.collection('users').select(['username', 'email']).stream():
+        data = d.to_dict() or {}
+        name = data.get('username') or (data.get('email') or '').split('@')[0]
+        yield d.id, name
+
+
+def gather(fb, uid, date_key, start_utc, end_utc, overwrite, metrics):
+    """Reads for one user: existing recommendation, the day's notes and diagnostics."""
+    user = fb.db.collection('users').document(uid)
+    if not overwrite:
+        exists = user.collection('recommendations').document(date_key).get().exists
+        metrics.inc('reads')
+        if exists:
+            return 'exists', [], []
+    qn = (user.collection('notes')
+          .where(filter=bq.FieldFilter('updatedAt', '>=', start_utc))
+          .where(filter=bq.FieldFilter('updatedAt', '<', end_utc))
+          .order_by('updatedAt', direction=firestore.Query.DESCENDING)
+          .limit(30))
+    notes = [{'id': d.id, **(d.to_dict() or {})} for d in qn.stream()]
+    qd = (user.collection('diagnostics')
+          .where(filter=bq.FieldFilter('createdAt', '>=', start_utc))
+          .where(filter=bq.FieldFilter('createdAt', '<', end_utc))
+          .order_by('createdAt', direction=firestore.Query.DESCENDING)
+          .limit(3))
+    diags = [{'id': d.id, **(d.to_dict() or {})} for d in qd.stream()]
+    metrics.inc('reads', 2)
+    return ('active' if notes or diags else 'inactive'), notes, diags
+
+
+def generate(fb, gem, limiter, metrics, uid, name, date_key, notes, diags, dry_run):
+    """Gemini call (rate limited, with backoff on 429/5xx) + upsert."""
+    for attempt in range(1, MAX_RETRIES + 1):
+        limiter.acquire()
+        t0 = time.time()
+        try:
+            text = gem.generate_professional_recommendation(notes, diags, name, 550, 0.8, 0.9, 40)
+            metrics.latency(time.time() - t0)
+            break
+        except requests.exceptions.HTTPError as ex:
+            status = ex.response.status_code if ex.response is not None else 0
+            if status not in (429, 500, 502, 503) or attempt == MAX_RETRIES:
+                raise
+            time.sleep(2 ** attempt)
+    if dry_run:
+        return
+    meta = {'source': SOURCE, 'notesCount': len(notes), 'diagsCount': len(diags), 'batch': True}
+    fb.upsert_recommendation_for_date(uid, date_key, text, meta)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--date', help='Day to generate (YYYY-MM-DD); defaults to today in --tz')
+    p.add_argument('--tz', default=DEFAULT_TZ, help='Time zone that defines the day')
+    p.add_argument('--workers', type=int, default=4, help='Gemini worker threads')
+    p.add_argument('--read-concurrency', type=int, default=8, help='Concurrent Firestore user reads')
+    p.add_argument('--rate', type=float, default=30, help='Global Gemini requests per minute')
+    p.add_argument('--checkpoint', help='Checkpoint file (default: batch-recommendations-<date>.json)')
+    p.add_argument('--resume', action='store_true', help='Skip users already completed in the checkpoint')
+    p.add_argument('--overwrite', action='store_true', help='Regenerate even if the day already has a recommendation')
+    p.add_argument('--max-users', type=int, default=0, help='Stop after scanning this many users (0 = all)')
+    p.add_argument('--dry-run', action='store_true', help='Call Gemini but do not write recommendations')
+    args = p.parse_args()
+
+    tz = pytz.timezone(args.tz)
+    date_key = args.date or datetime.now(tz).strftime('%Y-%m-%d')
+    start_utc, end_utc = day_bounds(date_key, tz)
+
+    checkpoint = Checkpoint(args.checkpoint or 'batch-recommendations-{}.json'.format(date_key), date_key)
+    if args.resume:
+        checkpoint.load()
+        print('Resuming: {} users already done'.format(len(checkpoint.data['done'])))
+
+    fb = FirebaseService()
+    gem = GeminiService()
+    limiter = RateLimiter(args.rate)
+    metrics = Metrics()
+
+    readers = ThreadPoolExecutor(max_workers=args.read_concurrency, thread_name_prefix='read')
+    writers = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix='gemini')
+
+    def finish(fut, uid):
+        try:
+            fut.result()
+            metrics.inc('generated')
+            checkpoint.mark(uid, 'generated')
+        except Exception as ex:
+            metrics.inc('failed')
+            checkpoint.mark(uid, None, error=str(ex)[:200])
+            print('[FAIL] {}: {}'.format(uid, ex))
+
+    def run_chunk(chunk):
+        gathers = {readers.submit(gather, fb, uid, date_key, start_utc, end_utc, args.overwrite, metrics): (uid, name)
+                   for uid, name in chunk}
+        generating = []
+        for fut in as_completed(gathers):
+            uid, name = gathers[fut]
+            try:
+                status, notes, diags = fut.result()
+            except Exception as ex:
+                metrics.inc('failed')
+                checkpoint.mark(uid, None, error=str(ex)[:200])
+                print('[FAIL] read {}: {}'.format(uid, ex))
+                continue
+            if status != 'active':
+                metrics.inc(status)
+                checkpoint.mark(uid, status)
+                continue
+            metrics.inc('active')
+            g = writers.submit(generate, fb, gem, limiter, metrics, uid, name, date_key, notes, diags, args.dry_run)
+            g.add_done_callback(lambda f, u=uid: finish(f, u))
+            generating.append(g)
+        for g in generating:
+            g.exception()  # wait; errors are handled in finish()
+
+    last_report = time.time()
+    chunk = []
+    try:
+        for uid, name in iter_users(fb):
+            if args.max_users and metrics.counts['scanned'] >= args.max_users:
+                break
+            metrics.inc('scanned')
+            if checkpoint.is_done(uid):
+                continue
+            chunk.append((uid, name))
+            if len(chunk) >= CHUNK:
+                run_chunk(chunk)
+                chunk = []
+            if time.time() - last_report >= 30:
+                print('[PROGRESS]', metrics.summary())
+                last_report = time.time()
+        if chunk:
+            run_chunk(chunk)
+    except KeyboardInterrupt:
+        print('Interrupted; saving checkpoint')
+    finally:
+        readers.shutdown(wait=True)
+        writers.shutdown(wait=True)
+        checkpoint.save()
+
+    print('[DONE]', metrics.summary())
+    print('Checkpoint:', checkpoint.path)
+    return 1 if checkpoint.data['failed'] else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Build centroides.json (state/municipality centroids used to rank nearby professionals).
+Usage:
+  python tools/build_centroids.py AGEEML_localidades.csv
+  python tools/build_centroids.py AGEEML_localidades.csv --encoding latin-1 --out centroides.json
+  python tools/build_centroids.py --geonames rg_cities1000.csv geocode.gz
+Inputs (any combination; every file adds localities):
+- INEGI's locality catalog (AGEEML, "Catálogo Único de Claves ... Localidades") as CSV, with
+  NOM_ENT, NOM_MUN, LAT_DECIMAL, LON_DECIMAL and POB_TOTAL columns. Preferred: it names the
+  municipality of every locality, so it covers all of estados.json.
+- GeoNames populated places (CC BY 4.0, geonames.org) via --geonames, either as CSV with
+  lat, lon, name, admin1, admin2[, population, cc] columns (admin2 = municipality; the layout
+  of reverse_geocoder's rg_cities1000.csv) or as a JSON list (optionally .gz) of objects with
+  latitude, longitude, city, state, population and country_code (reverse_geocode's geocode.gz).
+This script:
+- computes each municipality's centroid as the population-weighted mean of its localities
+  (GeoNames often omits the municipality of the seat itself; a same-named locality counts as it)
+- for municipalities no locality names (GeoNames lacks many), uses the municipal seat: the most
+  populated locality of the state whose name matches the municipality (honorifics such as
+  "Heroica Ciudad de" are ignored on both sides, and a name covering at least half the words of
+  the other matches, e.g. "Matías Romero" / "Matías Romero Avendaño")
+- computes each state's centroid ("*") as the mean of its municipal centroids
+- keys everything by the unaccented names used in estados.json and reports names it could not match
+Municipalities left unmatched fall back to their state centroid in the app, which then hides km
+distances for them. Run it offline whenever estados.json changes; the app only reads the file.
+"""
+import argparse
+import csv
+import gzip
+import json
+import os
+import sys
+from collections import defaultdict
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.note_search import fold  # noqa: E402
+
+# INEGI / GeoNames names -> estados.json keys (after folding)
+STATE_ALIASES = {
+    'coahuila de zaragoza': 'coahuila',
+    'michoacan de ocampo': 'michoacan',
+    'veracruz de ignacio de la llave': 'veracruz',
+    'mexico': 'estado de mexico',
+    'mexico city': 'ciudad de mexico',
+    'distrito federal': 'ciudad de mexico',
+}
+
+# Honoríficos que el nombre oficial del municipio lleva y el de la cabecera no
+HONORIFICS = (
+    'heroica ciudad de ', 'heroica villa de ', 'heroica villa ', 'heroica ciudad ', 'heroica ',
+    'ciudad de ', 'ciudad ', 'villa de ', 'villa ',
+)
+NAME_STOPWORDS = {'de', 'del', 'la', 'las', 'los', 'el', 'y'}
+
+
+def _state(name):
+    s = fold(name or '').strip()
+    return STATE_ALIASES.get(s, s)
+
+
+def _float(v, default=None):
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return default
+
+
+def read_ageeml(path, encoding):
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for r in csv.DictReader(f):
+            lat, lon = _float(r.get('LAT_DECIMAL')), _float(r.get('LON_DECIMAL'))
+            if lat is None or lon is None:
+                continue
+            yield {'state': _state(r['NOM_ENT']), 'municipality': fold(r['NOM_MUN']).strip(),
+                   'name': fold(r.get('NOM_LOC') or '').strip(), 'lat': lat, 'lon': lon,
+                   'pop': _float(r.get('POB_TOTAL'))}
+
+
+def read_geonames(path, encoding):
+    if path.endswith(('.gz', '.json')):
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding=encoding) as f:
+            for r in json.load(f):
+                if r.get('country_code', 'MX') != 'MX':
+                    continue
+                yield {'state': _state(r.get('state')), 'municipality': '',
+                       'name': fold(r.get('city') or '').strip(),
+                       'lat': float(r['latitude']), 'lon': float(r['longitude']),
+                       'pop': _float(r.get('population'))}
+        return
+    with open(path, 'r', encoding=encoding, newline='') as f:
+        for r in csv.DictReader(f):
+            if r.get('cc', 'MX') != 'MX':
+                continue
+            lat, lon = _float(r.get('lat')), _float(r.get('lon'))
+            if lat is None or lon is None:
+                continue
+            yield {'state': _state(r.get('admin1')), 'municipality': fold(r.get('admin2') or '').strip(),
+                   'name': fold(r.get('name') or '').strip(), 'lat': lat, 'lon': lon,
+                   'pop': _float(r.get('population'))}
+
+
+def fill_population(points):
+    """Copies population between sources that list the same locality (same state, name, ~0.1°)."""
+    known = {}
+    for p in points:
+        if p['pop']:
+            known[(p['state'], p['name'], round(p['lat'], 1), round(p['lon'], 1))] = p['pop']
+    for p in points:
+        if not p['pop']:
+            p['pop'] = known.get((p['state'], p['name'], round(p['lat'], 1), round(p['lon'], 1)))
+
+
+def assign_seats(points):
+    """Localities without a municipality that share its name are taken as its seat (e.g. Ensenada)."""
+    known = {(p['state'], p['municipality']) for p in points if p['municipality']}
+    for p in points:
+        if p['municipality']:
+            continue
+        for name in (p['name'], _strip_honorifics(p['name'])):
+            if (p['state'], name) in known:
+                p['municipality'] = name
+                break
+
+
+def weighted_centroids(points):
+    """{(state, municipality): (lat, lon)} from localities that name their municipality."""
+    acc = defaultdict(lambda: [0.0, 0.0, 0.0])
+    for p in points:
+        if not p['municipality']:
+            continue
+        w = max(1.0, p['pop'] or 0)
+        a = acc[(p['state'], p['municipality'])]
+        a[0] += p['lat'] * w
+        a[1] += p['lon'] * w
+        a[2] += w
+    return {k: (a[0] / a[2], a[1] / a[2]) for k, a in acc.items()}
+
+
+def _strip_honorifics(name):
+    for h in HONORIFICS:
+        if name.startswith(h) and len(name) > len(h):
+            return name[len(h):]
+    return name
+
+
+def _tokens(name):
+    return {t for t in name.split() if t not in NAME_STOPWORDS}
+
+
+def seat_finder(points):
+    """Returns seat(state, municipality) -> (lat, lon) | None, matching locality names."""
+    by_name = defaultdict(dict)  # state -> {name: point with the largest population}
+    for p in points:
+        for name in {p['name'], _strip_honorifics(p['name'])}:
+            best = by_name[p['state']].get(name)
+            if best is None or (p['pop'] or 0) > (best['pop'] or 0):
+                by_name[p['state']][name] = p
+
+    def seat(state, municipality):
+        names = by_name.get(state, {})
+        m = fold(municipality).strip()
+        for key in (m, _strip_honorifics(m)):
+            if key in names:
+                return names[key]['lat'], names[key]['lon']
+        # "matias romero" ⊂ "matias romero avendano" (o al revés, "parras" ⊂ "parras de la fuente"):
+        # el nombre más corto debe cubrir al menos la mitad de las palabras del más largo
+        want = _tokens(_strip_honorifics(m))
+        best = None
+        for name, p in names.items():
+            have = _tokens(name)
+            short, long_ = (have, want) if len(have) <= len(want) else (want, have)
+            if short and short <= long_ and 2 * len(short) >= len(long_):
+                if best is None or (p['pop'] or 0) > (best['pop'] or 0):
+                    best = p
+        return (best['lat'], best['lon']) if best else None
+
+    return seat
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('catalog', nargs='*', help='INEGI AGEEML localities CSV')
+    p.add_argument('--geonames', nargs='*', default=[], help='GeoNames places (CSV or JSON[.gz])')
+    p.add_argument('--encoding', default='utf-8', help='Input encoding (INEGI downloads are often latin-1)')
+    p.add_argument('--estados', default='estados.json', help='State -> municipalities map used by the app')
+    p.add_argument('--out', default='centroides.json')
+    args = p.parse_args()
+    if not args.catalog and not args.geonames:
+        p.error('give an AGEEML catalog and/or --geonames files')
+
+    with open(args.estados, 'r', encoding='utf-8') as f:
+        estados = json.load(f)
+    points = []
+    for path in args.catalog:
+        points.extend(read_ageeml(path, args.encoding))
+    for path in args.geonames:
+        points.extend(read_geonames(path, args.encoding))
+    fill_population(points)
+    assign_seats(points)
+    centroids = weighted_centroids(points)
+    seat = seat_finder(points)
+
+    out, missing, from_seat = {}, [], 0
+    for state, municipalities in estados.items():
+        rows = {}
+        for m in municipalities:
+            c = centroids.get((_state(state), fold(m)))
+            if c is None:
+                c = seat(_state(state), m)
+                from_seat += c is not None
+            if c is None:
+                missing.append('{} / {}'.format(state, m))
+                continue
+            rows[m] = [round(c[0], 3), round(c[1], 3)]
+        if not rows:
+            missing.append(state)
+            continue
+        star = [round(sum(v[0] for v in rows.values()) / len(rows), 3),
+                round(sum(v[1] for v in rows.values()) / len(rows), 3)]
+        out[state] = {'*': star, **rows}
+
+    tmp = args.out + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('{\n' + ',\n'.join(
+            ' {}: {}'.format(json.dumps(s, ensure_ascii=False), json.dumps(r, ensure_ascii=False, separators=(',', ':')))
+            for s, r in out.items()) + '\n}\n')
+    os.replace(tmp, args.out)
+
+    total = sum(len(v) for v in estados.values())
+    print('Wrote {} ({} states, {}/{} municipalities, {} from municipal seats)'.format(
+        args.out, len(out), sum(len(r) - 1 for r in out.values()), total, from_seat))
+    if missing:
+        print('Unmatched ({}): {}'.format(len(missing), ', '.join(missing[:20]) + (' ...' if len(missing) > 20 else '')))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
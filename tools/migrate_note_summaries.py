@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Backfill `preview` and `length` on existing notes so list views can read index fields only.
+Usage:
+  python tools/migrate_note_summaries.py            # every user
+  python tools/migrate_note_summaries.py --uid UID  # a single user
+  python tools/migrate_note_summaries.py --dry-run
+This script:
+- reads Firebase Admin credentials from the same .env as the app
+- walks users/{uid}/notes and adds the derived fields where they are missing
+- leaves `updatedAt` untouched, so ordering and sync watermarks do not move
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.firebase_service import FirebaseService  # noqa: E402
+
+
+def iter_user_ids(fb):
+    # select([]) only returns document references, no profile data
+    for d in fb.db.collection('users').select([]).stream():
+        yield d.id
+
+
+def count_missing(fb, uid):
+    missing = 0
+    for d in fb.notes_collection(uid).stream():
+        data = d.to_dict() or {}
+        if 'preview' not in data or 'length' not in data:
+            missing += 1
+    return missing
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--uid', action='append', help='Only migrate these users (repeatable)')
+    p.add_argument('--batch-size', type=int, default=400, help='Writes per Firestore batch (max 500)')
+    p.add_argument('--dry-run', action='store_true', help='Only report how many notes would change')
+    args = p.parse_args()
+
+    fb = FirebaseService()
+    uids = args.uid or iter_user_ids(fb)
+
+    started = time.time()
+    users = notes = 0
+    for uid in uids:
+        users += 1
+        if args.dry_run:
+            n = count_missing(fb, uid)
+        else:
+            n = fb.backfill_note_summaries(uid, batch_size=min(args.batch_size, 500))
+        notes += n
+        if n:
+            print('{} {}: {} notes'.format('Would update' if args.dry_run else 'Updated', uid, n))
+
+    print('Done: {} notes across {} users in {:.1f}s'.format(notes, users, time.time() - started))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
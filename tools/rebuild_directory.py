@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Build (or rebuild) the public `directory` collection from existing professional profiles.
+Usage:
+  python tools/rebuild_directory.py
+This script:
+- reads users where professional.type == "profesional"
+- writes one directory/{uid} card per professional with only the public fields
+- deletes directory cards whose uid is no longer a professional (stale cards)
+New and edited profiles keep the directory in sync by themselves; run this once after deploying
+and whenever the card fields change. Composite indexes live in firestore.indexes.json
+(`firebase deploy --only firestore:indexes`).
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from services.firebase_service import FirebaseService  # noqa: E402
+
+
+def main():
+    started = time.time()
+    written, deleted = FirebaseService().rebuild_directory()
+    print('Wrote {} directory cards, deleted {} stale ones in {:.1f}s'.format(
+        written, deleted, time.time() - started))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())